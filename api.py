@@ -0,0 +1,535 @@
+"""Headless JSON API over the NDIS contract, served alongside the Streamlit app.
+
+Exposes the bookings, offers, withdrawal requests and lookups the app's
+viewers show, and the write operations its forms send, for partner systems
+and batch jobs:
+
+    python api.py
+
+Reads come from the live event store once it has caught up with the chain,
+and otherwise from the block cache, exactly as the viewers read them.
+Writes go through the shared transaction submitter and are followed by the
+transaction tracker; they answer 202 with the transaction hash, whose status
+is at ``/transactions/{tx_hash}``. Transactions are sent with
+``eth_sendTransaction``, so the sending account must be unlocked on the node.
+
+Writes need an ``Authorization: Bearer <token>`` header with the token of a
+role allowed to send them. A token proves only the role, so each is bound to
+the accounts it may send from, and the ``from`` account must be one of them
+and hold that role on the contract. Tokens and their accounts come from the
+environment, one set per role as the app's logins do; a write none of whose
+roles has a token bound to an account is not served, so with no tokens set
+the API is read-only.
+"""
+# Import libraries
+import os
+import hmac
+import json
+import asyncio
+from functools import partial
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.exceptions import ContractLogicError, ValidationError
+from eth_utils.exceptions import ValidationError as EthValidationError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Import functions
+from functions.contract import connect_to_contract
+from functions.cache import block_cache, cached_call, cached_batch_call
+from functions.submitter import submitter
+from functions.tracker import tracker
+from functions.subscriber import live_events
+from functions.risk import risk_scorer
+from functions.request_store import SORT_COLUMNS, NO_CLAIMANT, page_requests
+from functions.utils import (
+    PENDING,
+    SERVICE_OFFERED,
+    WAITING_FOR_APPROVAL,
+    APPROVED,
+    REQUESTS_PAGE_SIZE,
+    SERVICE_OPTIONS,
+    SERVICE_CATEGORIES,
+    EMPTY_REQUEST_ID,
+    describe_request,
+    read_requests_page,
+    read_participant_requests_page,
+)
+
+# Address and port the API listens on
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", "8080"))
+
+# Threads making blocking node calls for the event loop
+API_WORKERS = int(os.getenv("API_WORKERS", "32"))
+
+# Largest page of requests a client may ask for
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", "500"))
+
+# Responses kept in the read cache; 0 turns it off
+API_CACHE_ENTRIES = int(os.getenv("API_CACHE_ENTRIES", "10000"))
+
+# Bearer tokens for writes, one per role like the app's logins; a role without a token cannot write
+API_TOKENS = {
+    "NDIA": os.getenv("NDIA_API_TOKEN"),
+    "Participant": os.getenv("PARTICIPANT_API_TOKEN"),
+    "ServiceProvider": os.getenv("SERVICE_PROVIDER_API_TOKEN"),
+}
+
+# Comma-separated accounts each role's token may send from; a token bound to no account cannot write
+API_SENDERS = {
+    role: {Web3.toChecksumAddress(address.strip()) for address in os.getenv(variable, "").split(",") if address.strip()}
+    for role, variable in (
+        ("NDIA", "NDIA_API_SENDERS"),
+        ("Participant", "PARTICIPANT_API_SENDERS"),
+        ("ServiceProvider", "SERVICE_PROVIDER_API_SENDERS"),
+    )
+}
+
+# Roles allowed to send each write, as the contract's modifiers allow them
+WRITE_ROLES = {
+    "deposit": ("NDIA",),
+    "register_account": ("NDIA",),
+    "book_service": ("Participant",),
+    "offer_service": ("ServiceProvider",),
+    "initiate_withdrawal_request": ("Participant", "ServiceProvider"),
+    "approve_withdrawals": ("NDIA",),
+}
+
+# Request statuses by the names used in the API
+STATUSES = {"pending": PENDING, "service_offered": SERVICE_OFFERED, "waiting_for_approval": WAITING_FOR_APPROVAL, "approved": APPROVED}
+STATUS_NAMES = {status: name for name, status in STATUSES.items()}
+
+contract = connect_to_contract()
+
+
+class ResponseCache:
+    """Caches encoded read responses until the chain or the live event store moves on.
+
+    Every entry is stored under the latest block number and live store
+    version at the time it was built; once either changes the entry stops
+    matching and is rebuilt on the next request. Concurrent requests for a
+    response that is being built wait for that one build instead of each
+    reading the node, so a burst of identical requests costs one read.
+    """
+
+    def __init__(self, max_entries=API_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._building = {}
+
+    async def get(self, key, generation, build):
+        """Return ``(response, hit)``, awaiting ``build()`` for the response on a miss."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == generation:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], True
+
+        building = self._building.get((key, generation))
+        if building is not None:
+            self.hits += 1
+            return await asyncio.shield(building), True
+
+        self.misses += 1
+        future = asyncio.ensure_future(build())
+        if not self.max_entries:
+            return await future, False
+        self._building[(key, generation)] = future
+        try:
+            response = await future
+        finally:
+            self._building.pop((key, generation), None)
+        self._entries[key] = (generation, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return response, False
+
+
+def json_response(payload, status=200, headers=None):
+    return web.Response(body=json.dumps(payload).encode(), status=status, content_type="application/json", headers=headers)
+
+
+def bad_request(message):
+    return web.HTTPBadRequest(text=json.dumps({"error": message}), content_type="application/json")
+
+
+def not_found(message):
+    return web.HTTPNotFound(text=json.dumps({"error": message}), content_type="application/json")
+
+
+def unauthorized(message):
+    return web.HTTPUnauthorized(text=json.dumps({"error": message}), content_type="application/json", headers={"WWW-Authenticate": "Bearer"})
+
+
+def forbidden(message):
+    return web.HTTPForbidden(text=json.dumps({"error": message}), content_type="application/json")
+
+
+def error_status(error):
+    """400 for arguments web3 or the contract rejected, 502 for failed node calls the client may retry."""
+    if isinstance(error, (ValidationError, EthValidationError, TypeError)):
+        return 400
+    # web3 raises the node's JSON-RPC errors as ValueError({"code": ..., "message": ...})
+    if isinstance(error, ValueError) and not (error.args and isinstance(error.args[0], dict)):
+        return 400
+    return 502
+
+
+@web.middleware
+async def json_errors(request, handler):
+    """Report errors as JSON: 4xx for invalid requests, 502 for failed node calls."""
+    try:
+        return await handler(request)
+    except web.HTTPException:
+        raise
+    except Exception as e:
+        return json_response({"error": f"{type(e).__name__}: {e}"}, status=error_status(e))
+
+
+def token_role(request, roles):
+    """Return the role in ``roles`` whose token the request's bearer token matches."""
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise unauthorized("Writes need an Authorization: Bearer token")
+    for role, expected in API_TOKENS.items():
+        if expected and hmac.compare_digest(token.encode(), expected.encode()):
+            if role not in roles:
+                raise forbidden(f"{role} tokens cannot send this transaction")
+            return role
+    raise unauthorized("Unknown API token")
+
+
+def holds_role(sender, role):
+    """Check on the contract that ``sender`` is the NDIA, a participant or a service provider."""
+    if role == "NDIA":
+        return cached_call(contract.functions.ndia()) == sender
+    if role == "Participant":
+        return cached_call(contract.functions.ndisParticipant(sender))
+    return cached_call(contract.functions.ndisServiceProvider(sender))
+
+
+def request_record(request_id, request):
+    """Describe a contract ``Request`` record for API clients."""
+    job_number, participant, amount, service_description, status = describe_request(request)
+    assessment = risk_scorer.assessment(request_id)
+    return {
+        "request_id": HexBytes(request_id).hex(),
+        "job_number": job_number,
+        "participant": participant,
+        "amount": amount,
+        "service_category": request[4],
+        "claimant": None if request[6] == NO_CLAIMANT else request[6],
+        "service_description": service_description,
+        "status": STATUS_NAMES.get(status, status),
+        "risk": None if assessment is None else {"score": assessment.score, "flags": list(assessment.flags)},
+    }
+
+
+def page_record(total, offset, limit, request_ids, requests):
+    """A page of requests, with the offset of the next page or None after the last one."""
+    return {
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "next_offset": offset + limit if offset + limit < total else None,
+        "requests": [request_record(request_id, request) for request_id, request in zip(request_ids, requests)],
+    }
+
+
+def page_arguments(request):
+    # Offset and limit query parameters, with the limit capped
+    try:
+        offset = int(request.query.get("offset", 0))
+        limit = int(request.query.get("limit", REQUESTS_PAGE_SIZE))
+    except ValueError:
+        raise bad_request("offset and limit must be whole numbers")
+    if offset < 0 or not 0 < limit <= API_MAX_PAGE_SIZE:
+        raise bad_request(f"offset must be at least 0 and limit between 1 and {API_MAX_PAGE_SIZE}")
+    return offset, limit
+
+
+def filter_arguments(request):
+    # Optional participant, amount range and sort order query parameters, as keyword arguments for LiveEventStore.query
+    filters = {}
+    if "participant" in request.query:
+        filters["participant"] = address_argument(request.query["participant"], "participant")
+    try:
+        for name in ("min_amount", "max_amount"):
+            if name in request.query:
+                filters[name] = int(request.query[name])
+    except ValueError:
+        raise bad_request("min_amount and max_amount must be whole numbers of wei")
+    if "sort" in request.query:
+        if request.query["sort"] not in SORT_COLUMNS:
+            raise bad_request(f"sort must be one of {', '.join(SORT_COLUMNS)}")
+        filters["sort_by"] = request.query["sort"]
+    if "order" in request.query:
+        if request.query["order"] not in ("asc", "desc"):
+            raise bad_request("order must be asc or desc")
+        filters["descending"] = request.query["order"] == "desc"
+    return filters
+
+
+def address_argument(value, name):
+    if not isinstance(value, str) or not Web3.isAddress(value):
+        raise bad_request(f"{name} must be an account address")
+    return Web3.toChecksumAddress(value)
+
+
+def request_id_argument(value, name="request_id"):
+    try:
+        request_id = HexBytes(value)
+    except (TypeError, ValueError):
+        request_id = b""
+    if len(request_id) != 32:
+        raise bad_request(f"{name} must be a 32 byte hex request id")
+    return bytes(request_id)
+
+
+def amount_argument(value, name="amount"):
+    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+        raise bad_request(f"{name} must be a whole number of wei")
+    return value
+
+
+class NdisApi:
+    """Request handlers, sharing a worker pool for blocking node calls and a response cache."""
+
+    def __init__(self, workers=API_WORKERS, cache_entries=API_CACHE_ENTRIES):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+        self.cache = ResponseCache(cache_entries)
+
+    async def run(self, function, *args):
+        """Run a blocking call on the worker pool."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, partial(function, *args))
+
+    async def cached(self, request, read, missing=None):
+        """Answer a read from the response cache, building it with ``read()`` on a worker when stale.
+
+        A ``read`` returning None answers 404 with the ``missing`` message.
+        """
+        generation = (await self.run(block_cache.block_number), live_events().version)
+
+        async def build():
+            payload = await self.run(read)
+            if payload is None:
+                return 404, json.dumps({"error": missing}).encode()
+            return 200, json.dumps(payload).encode()
+
+        (status, body), hit = await self.cache.get(request.path_qs, generation, build)
+        return web.Response(body=body, status=status, content_type="application/json", headers={"X-Cache": "hit" if hit else "miss"})
+
+    async def submit(self, contract_function, transaction):
+        """Send a transaction through the shared submitter and answer 202 with its hash."""
+        try:
+            tx_hash = await self.run(submitter.transact, contract_function, transaction)
+        except (ContractLogicError, ValueError) as e:
+            # Gas estimation replays the call, so reverts are reported before anything is sent
+            raise bad_request(str(e))
+        tx_hash = tracker.track(tx_hash)
+        return json_response({"transaction_hash": tx_hash, "status_url": f"/transactions/{tx_hash}"}, status=202)
+
+    # Reads
+
+    async def health(self, request):
+        store = live_events()
+        return json_response({"live_events_ready": store.ready, "live_events_block": store.last_block, "block_number": await self.run(block_cache.block_number)})
+
+    async def contract_details(self, request):
+        def read():
+            ndia, participant_funds = cached_batch_call(contract.functions.ndia(), contract.functions.participantFunds())
+            return {"address": contract.address, "ndia": ndia, "participant_funds": participant_funds}
+        return await self.cached(request, read)
+
+    async def services(self, request):
+        return json_response([
+            {"service_category": category, "service_description": name, "amount": SERVICE_OPTIONS[name]}
+            for category, name in enumerate(SERVICE_CATEGORIES)
+        ])
+
+    async def requests_page(self, request):
+        status = request.query.get("status", "pending")
+        if status not in STATUSES:
+            raise bad_request(f"status must be one of {', '.join(STATUSES)}")
+        offset, limit = page_arguments(request)
+        filters = filter_arguments(request)
+        store = live_events()
+        if filters and not store.ready:
+            raise web.HTTPServiceUnavailable(
+                text=json.dumps({"error": "Filtering and sorting are available once the live event store has caught up with the chain"}),
+                content_type="application/json",
+            )
+
+        def read():
+            if store.ready:
+                total, page = store.query(STATUSES[status], offset=offset, limit=limit, **filters)
+                request_ids, requests = page_requests(page)
+            else:
+                total, request_ids, requests = read_requests_page(STATUSES[status], offset, limit)
+            return page_record(total, offset, limit, request_ids, requests)
+        return await self.cached(request, read)
+
+    async def participant_requests(self, request):
+        participant = address_argument(request.match_info["address"], "address")
+        offset, limit = page_arguments(request)
+
+        def read():
+            total, request_ids, requests = read_participant_requests_page(participant, offset, limit)
+            return page_record(total, offset, limit, request_ids, requests)
+        return await self.cached(request, read)
+
+    async def job(self, request):
+        job_number = request.match_info["job_number"]
+        if not job_number.isdigit():
+            raise bad_request("Job numbers are whole numbers")
+
+        def read():
+            request_id, record = cached_call(contract.functions.getBookingRequestByJobNumber(int(job_number)))
+            return None if request_id == EMPTY_REQUEST_ID else request_record(request_id, record)
+        return await self.cached(request, read, missing=f"No booking request found for job number {job_number}")
+
+    async def account(self, request):
+        address = address_argument(request.match_info["address"], "address")
+
+        def read():
+            participant, service_provider = cached_batch_call(contract.functions.ndisParticipant(address), contract.functions.ndisServiceProvider(address))
+            return {"address": address, "participant": participant, "service_provider": service_provider}
+        return await self.cached(request, read)
+
+    async def transaction(self, request):
+        try:
+            tx_hash = HexBytes(request.match_info["tx_hash"]).hex()
+        except ValueError:
+            raise bad_request("tx_hash must be a transaction hash")
+        status, detail = tracker.status(tx_hash)
+        receipt = tracker.receipt(tx_hash)
+        return json_response({
+            "transaction_hash": tx_hash,
+            "status": status.lower(),
+            "detail": detail,
+            "block_number": receipt["blockNumber"] if receipt is not None else None,
+        })
+
+    # Writes
+
+    async def body(self, request):
+        try:
+            body = await request.json()
+        except ValueError:
+            raise bad_request("The request body must be a JSON object")
+        if not isinstance(body, dict):
+            raise bad_request("The request body must be a JSON object")
+        return body
+
+    async def sender(self, request, body, *roles):
+        """Return the body's ``from`` account once the bearer token may send from it and the account holds the token's role."""
+        role = token_role(request, roles)
+        sender = address_argument(body.get("from"), "from")
+        if sender not in API_SENDERS[role]:
+            raise forbidden(f"This {role} token cannot send from {sender}")
+        if not await self.run(holds_role, sender, role):
+            raise forbidden(f"{sender} is not registered as {role}")
+        return sender
+
+    async def deposit(self, request):
+        body = await self.body(request)
+        sender = await self.sender(request, body, *WRITE_ROLES["deposit"])
+        return await self.submit(contract.functions.deposit(), {"from": sender, "value": amount_argument(body.get("amount"))})
+
+    async def register_account(self, request):
+        body = await self.body(request)
+        sender = await self.sender(request, body, *WRITE_ROLES["register_account"])
+        address = address_argument(body.get("address"), "address")
+        if not isinstance(body.get("participant"), bool):
+            raise bad_request("participant must be true for a participant account or false for a service provider")
+        return await self.submit(contract.functions.registerAccount(address, body["participant"]), {"from": sender})
+
+    async def book_service(self, request):
+        body = await self.body(request)
+        sender = await self.sender(request, body, *WRITE_ROLES["book_service"])
+        service = body.get("service_description")
+        if service not in SERVICE_OPTIONS:
+            raise bad_request(f"service_description must be one of: {', '.join(SERVICE_CATEGORIES)}")
+        unid_number = str(body.get("participant_unid_number", sender))
+        return await self.submit(
+            contract.functions.bookService(SERVICE_CATEGORIES.index(service), service, SERVICE_OPTIONS[service], unid_number),
+            {"from": sender},
+        )
+
+    async def offer_service(self, request):
+        body = await self.body(request)
+        sender = await self.sender(request, body, *WRITE_ROLES["offer_service"])
+        request_id = request_id_argument(body.get("request_id"))
+        description = str(body.get("service_description", ""))
+        if "participant" in body:
+            participant = address_argument(body["participant"], "participant")
+        else:
+            requester = (await self.run(cached_call, contract.functions.requests(request_id)))[0]
+            if int(requester, 16) == 0:
+                raise not_found("No booking request with this request id")
+            participant = requester
+        return await self.submit(contract.functions.offerService(participant, request_id, description), {"from": sender})
+
+    async def initiate_withdrawal_request(self, request):
+        body = await self.body(request)
+        sender = await self.sender(request, body, *WRITE_ROLES["initiate_withdrawal_request"])
+        request_id = request_id_argument(body.get("request_id"))
+        return await self.submit(contract.functions.initiateWithdrawalRequest(request_id, amount_argument(body.get("amount"))), {"from": sender})
+
+    async def approve_withdrawals(self, request):
+        body = await self.body(request)
+        sender = await self.sender(request, body, *WRITE_ROLES["approve_withdrawals"])
+        request_ids = body.get("request_ids")
+        if not isinstance(request_ids, list) or not request_ids:
+            raise bad_request("request_ids must be a non-empty list of request ids")
+        return await self.submit(contract.functions.approveWithdrawals([request_id_argument(value, "request_ids") for value in request_ids]), {"from": sender})
+
+
+def create_app(workers=API_WORKERS, cache_entries=API_CACHE_ENTRIES):
+    """Build the aiohttp application; the live event store starts following the chain right away."""
+    api = NdisApi(workers, cache_entries)
+    app = web.Application(middlewares=[json_errors])
+    app["api"] = api
+    app.add_routes([
+        web.get("/health", api.health),
+        web.get("/contract", api.contract_details),
+        web.get("/services", api.services),
+        web.get("/requests", api.requests_page),
+        web.get("/jobs/{job_number}", api.job),
+        web.get("/participants/{address}/requests", api.participant_requests),
+        web.get("/accounts/{address}", api.account),
+        web.get("/transactions/{tx_hash}", api.transaction),
+    ])
+    # Only serve the writes some role holds a token bound to an account for
+    writes = {
+        "/deposits": "deposit",
+        "/accounts": "register_account",
+        "/bookings": "book_service",
+        "/offers": "offer_service",
+        "/withdrawal-requests": "initiate_withdrawal_request",
+        "/approvals": "approve_withdrawals",
+    }
+    app.add_routes([
+        web.post(path, getattr(api, name)) for path, name in writes.items()
+        if any(API_TOKENS[role] and API_SENDERS[role] for role in WRITE_ROLES[name])
+    ])
+
+    async def stop_workers(app):
+        api.executor.shutdown(wait=False)
+
+    app.on_cleanup.append(stop_workers)
+    live_events()
+    return app
+
+
+if __name__ == "__main__":
+    web.run_app(create_app(), host=API_HOST, port=API_PORT)
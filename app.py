@@ -1,27 +1,48 @@
 # Import libraries
-import os
-from web3 import Web3
 import streamlit as st
 
 # Import functions
 from functions.ndia import (
     display_contract_details, 
+    display_contract_details_reads,
     deposit_funds, 
     register_account,
+    bulk_register_accounts,
     display_withdrawal_requests, 
-    approve_withdrawal
+    display_withdrawal_requests_reads,
+    approve_withdrawal,
+    approve_withdrawal_reads,
+    settle_withdrawals,
+    settle_withdrawals_reads,
+    display_analytics
 )
 from functions.utils import (
     display_booking_requests, 
+    display_booking_requests_reads,
     booking_requests, 
     service_request_lookup,
-    my_booking_requests_lookup
+    service_request_lookup_reads,
+    my_booking_requests_lookup,
+    my_booking_requests_lookup_reads
 )
 
 from functions.provider import (
     offer_service,
     initiate_withdrawal_request,
-    display_service_offered
+    initiate_withdrawal_request_reads,
+    display_service_offered,
+    display_service_offered_reads,
+    claim_settlements,
+    claim_settlements_reads
+)
+from functions.loader import prefetch_reads
+from functions.connection import get_web3
+from functions.tracker import display_transaction_status
+from functions.subscriber import begin_live_render, follow_live_updates
+from functions.instrumentation import (
+    begin_run,
+    rpc_context,
+    display_rpc_diagnostics
 )
 
 from dotenv import load_dotenv
@@ -31,31 +52,72 @@ load_dotenv()
 # Set page configuration
 st.set_page_config(page_title="NDIS Smart Contract Interaction App", page_icon=":rocket:")
 
+# Panels rendered on each page, in order
+PAGES = {
+    "NDIA": [
+        display_contract_details,
+        deposit_funds,
+        register_account,
+        bulk_register_accounts,
+        display_withdrawal_requests,
+        service_request_lookup,
+        approve_withdrawal,
+        settle_withdrawals,
+        display_analytics,
+    ],
+    "Participants": [
+        booking_requests,
+        my_booking_requests_lookup,
+    ],
+    "ServiceProviders": [
+        display_booking_requests,
+        service_request_lookup,
+        offer_service,
+        display_service_offered,
+        initiate_withdrawal_request,
+        claim_settlements,
+    ],
+}
+
+# Contract reads each panel makes while rendering, loaded concurrently before the page renders
+PANEL_READS = {
+    display_contract_details: display_contract_details_reads,
+    display_withdrawal_requests: display_withdrawal_requests_reads,
+    approve_withdrawal: approve_withdrawal_reads,
+    display_booking_requests: display_booking_requests_reads,
+    service_request_lookup: service_request_lookup_reads,
+    my_booking_requests_lookup: my_booking_requests_lookup_reads,
+    display_service_offered: display_service_offered_reads,
+    initiate_withdrawal_request: initiate_withdrawal_request_reads,
+    settle_withdrawals: settle_withdrawals_reads,
+    claim_settlements: claim_settlements_reads,
+}
+
 # Streamlit app
 def main():
     
-    page = st.sidebar.selectbox("Select Page", ["NDIA", "Participants", "ServiceProviders"])
+    page = st.sidebar.selectbox("Select Page", list(PAGES))
+    begin_run(page)
+    begin_live_render()
+
+    # Start every panel's reads at once, so the panels render from the cache
+    with rpc_context(page, "prefetch"):
+        prefetch_reads([read for panel in PAGES[page] if panel in PANEL_READS for read in PANEL_READS[panel]()])
     
-    if page == "NDIA":
-        display_contract_details()
-        deposit_funds()
-        register_account()
-        display_withdrawal_requests()
-        service_request_lookup()
-        approve_withdrawal()
-    elif page == "Participants":
-        booking_requests() 
-        my_booking_requests_lookup()
-    elif page == "ServiceProviders":
-        display_booking_requests()
-        service_request_lookup()
-        offer_service()
-        display_service_offered()
-        initiate_withdrawal_request()
+    # Tag every RPC call with the page and panel that made it
+    for panel in PAGES[page]:
+        with rpc_context(page, panel.__name__):
+            panel()
+
+    display_transaction_status()
+    display_rpc_diagnostics()
+
+    # Wait for the next contract event and rerun with it
+    follow_live_updates()
 
 if st.sidebar.button("Logout"):
     st.session_state.authenticated = False
-    st.experimental_rerun()
+    st.rerun()
         
 # Main Streamlit app
 if __name__ == "__main__":
@@ -63,7 +125,8 @@ if __name__ == "__main__":
         st.markdown("## Ethereum Node Configuration")
 
     with st.spinner("Connecting to Ethereum node..."):
-        web3 = Web3(Web3.HTTPProvider(os.getenv("WEB3_PROVIDER_URI")))
+        # The shared client answers from its last endpoint health check
+        web3 = get_web3()
         if web3.isConnected():
             st.success("Connected to Ethereum node")
             main()
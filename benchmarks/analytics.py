@@ -0,0 +1,127 @@
+"""Time the NDIA analytics panel's computations on a synthetic event history.
+
+Builds ``--requests`` booked requests (most of them offered, claimed and
+approved) as an export would write them, then times reading the Parquet
+file and working out the request table, spend per category, participant
+and provider totals and approval times. The same totals are also worked
+out with plain Python loops over row tuples, the way the app aggregated
+contract data before, on ``--loop-sample`` requests scaled up:
+
+    python -m benchmarks.analytics --requests 1000000
+"""
+# Import libraries
+import os
+import time
+import argparse
+import tempfile
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+# Import functions
+from functions.analytics import load_events, request_table, spend_by_category, participant_totals, provider_totals, approval_times
+
+CATEGORIES = [f"Category {code}" for code in range(10)]
+
+
+def synthetic_events(request_count, seed=0):
+    """Return an event history of ``request_count`` requests in chain order."""
+    rng = np.random.default_rng(seed)
+    request_ids = np.char.add("0x", np.char.zfill(np.arange(request_count).astype(str), 64))
+    participants = np.char.add("0xp", rng.integers(0, request_count // 10 + 1, request_count).astype(str))
+    providers = np.char.add("0xs", rng.integers(0, 1000, request_count).astype(str))
+    categories = rng.integers(0, len(CATEGORIES), request_count)
+    amounts = rng.integers(1000, 30000, request_count)
+    booked_at = np.sort(rng.integers(0, 10 ** 8, request_count))
+
+    frames = []
+    reached = np.ones(request_count, dtype=bool)
+    delay = np.zeros(request_count, dtype=np.int64)
+    for status, event in enumerate(("ServiceBooked", "ServiceOffered", "WithdrawalRequestInitiated", "Withdrawal")):
+        if status:
+            # Each step is reached by 80% of the requests that reached the previous one
+            reached &= rng.random(request_count) < 0.8
+            delay = delay + rng.integers(600, 7 * 86400, request_count)
+        frames.append(pd.DataFrame({
+            "event": event,
+            "block_number": (booked_at + delay)[reached] // 12,
+            "log_index": 0,
+            "tx_hash": "",
+            "request_id": request_ids[reached],
+            "job_number": np.arange(request_count)[reached] if event in ("ServiceBooked", "Withdrawal") else None,
+            "participant": participants[reached] if event == "ServiceBooked" else None,
+            "account": None if event == "ServiceBooked" else (providers if event != "Withdrawal" else participants)[reached],
+            "amount": amounts[reached] if event != "ServiceOffered" else None,
+            "service_category": categories[reached] if event in ("ServiceBooked", "Withdrawal") else None,
+            "status": status,
+            "timestamp": (booked_at + delay)[reached],
+        }))
+    events = pd.concat(frames, ignore_index=True).sort_values("timestamp", kind="stable", ignore_index=True)
+    # Stored like the export's dictionary-encoded columns
+    for column in ("event", "participant", "account"):
+        events[column] = events[column].astype("category")
+    return events
+
+
+def loop_totals(rows):
+    # Per-category, per-participant and per-provider totals and approval times, one tuple at a time
+    booked, by_category, by_participant, by_provider, approval_seconds = {}, defaultdict(int), defaultdict(int), defaultdict(int), []
+    providers = {}
+    for event, request_id, participant, account, amount, category, timestamp in rows:
+        if event == "ServiceBooked":
+            booked[request_id] = (participant, category, timestamp)
+        elif event == "ServiceOffered":
+            providers[request_id] = account
+        elif event == "Withdrawal" and request_id in booked:
+            participant, category, booked_at = booked[request_id]
+            by_category[CATEGORIES[category]] += amount
+            by_participant[participant] += amount
+            by_provider[providers.get(request_id)] += amount
+            approval_seconds.append(timestamp - booked_at)
+    return by_category, by_participant, by_provider, approval_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000000)
+    parser.add_argument("--loop-sample", type=int, default=100000, help="requests aggregated with Python loops before scaling up")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    events = synthetic_events(args.requests, args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "events.parquet")
+        events.to_parquet(path)
+
+        start = time.perf_counter()
+        loaded = load_events(path)
+        load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    requests = request_table(loaded)
+    table_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    spend_by_category(requests, CATEGORIES)
+    participant_totals(requests)
+    provider_totals(requests)
+    approval_times(requests)
+    summary_seconds = time.perf_counter() - start
+
+    sample = events[events["request_id"].isin(requests.index[:args.loop_sample])]
+    rows = list(sample[["event", "request_id", "participant", "account", "amount", "service_category", "timestamp"]].itertuples(index=False))
+    start = time.perf_counter()
+    loop_totals(rows)
+    loop_seconds = (time.perf_counter() - start) * len(events) / max(len(sample), 1)
+
+    print(f"{len(events)} events, {len(requests)} requests")
+    print(f"{'step':<28}{'seconds':>10}")
+    print(f"{'read Parquet':<28}{load_seconds:>10.2f}")
+    print(f"{'request table':<28}{table_seconds:>10.2f}")
+    print(f"{'panel totals':<28}{summary_seconds:>10.2f}")
+    print(f"{'Python loop totals':<28}{loop_seconds:>10.2f}  (scaled from {len(sample)} events, rows already in memory)")
+
+
+if __name__ == "__main__":
+    main()
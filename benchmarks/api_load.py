@@ -0,0 +1,130 @@
+"""Load test the headless JSON API with hundreds of concurrent clients.
+
+Starts ``api.py`` against a running dev chain, then has ``--clients``
+concurrent clients read request pages, job lookups, participant bookings and
+contract details for ``--duration`` seconds, once with the response cache on
+and once with it off:
+
+    BENCHMARK_PROVIDER_URI=http://127.0.0.1:8545 python -m benchmarks.api_load --clients 300
+
+A fresh contract seeded with ``--bookings`` bookings is used, or a chain
+seeded by ``benchmarks.load_generator`` with ``--chain-state``.
+"""
+# Import libraries
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+import urllib.request
+from collections import Counter
+from pathlib import Path
+
+import aiohttp
+
+# Import functions
+from benchmarks.chain import local_web3, deploy_contract, load_chain_state
+from benchmarks.page_latency import seed_bookings
+
+API_PATH = Path(__file__).resolve().parents[1] / "api.py"
+API_PORT = 8598
+STATUSES = ("pending", "service_offered", "waiting_for_approval", "approved")
+
+
+def start_api(provider_uri, contract_address, cache_entries):
+    """Run ``api.py`` in its own process and wait until it answers."""
+    env = dict(os.environ, WEB3_PROVIDER_URI=provider_uri, SMART_CONTRACT_ADDRESS=contract_address, API_PORT=str(API_PORT), API_CACHE_ENTRIES=str(cache_entries))
+    process = subprocess.Popen([sys.executable, str(API_PATH)], cwd=API_PATH.parent, env=env, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{API_PORT}/health", timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise TimeoutError("api.py did not start")
+
+
+def random_path(rng, participants, job_numbers):
+    # The mix of reads a partner system would make
+    roll = rng.random()
+    if roll < 0.6:
+        return f"/requests?status={rng.choice(STATUSES)}&offset={50 * rng.randrange(3)}&limit=50"
+    if roll < 0.8:
+        return f"/jobs/{rng.choice(job_numbers)}"
+    if roll < 0.95:
+        return f"/participants/{rng.choice(participants)}/requests?limit=50"
+    return "/contract"
+
+
+async def client(session, rng, deadline, participants, job_numbers, latencies, outcomes):
+    while time.perf_counter() < deadline:
+        path = random_path(rng, participants, job_numbers)
+        start = time.perf_counter()
+        try:
+            async with session.get(f"http://127.0.0.1:{API_PORT}{path}") as response:
+                await response.read()
+                outcomes[response.status] += 1
+                if "X-Cache" in response.headers:
+                    outcomes[response.headers["X-Cache"]] += 1
+        except aiohttp.ClientError as e:
+            outcomes[type(e).__name__] += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_clients(clients, duration, participants, job_numbers, seed):
+    latencies, outcomes = [], Counter()
+    connector = aiohttp.TCPConnector(limit=clients)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(
+            client(session, random.Random(seed + index), deadline, participants, job_numbers, latencies, outcomes)
+            for index in range(clients)
+        ))
+    return sorted(latencies), outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=300, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=20, help="seconds each mode runs")
+    parser.add_argument("--bookings", type=int, default=200, help="bookings seeded on a fresh contract")
+    parser.add_argument("--chain-state", help="manifest saved by benchmarks.load_generator to use instead")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    provider_uri = os.getenv("BENCHMARK_PROVIDER_URI")
+    if not provider_uri:
+        raise SystemExit("Set BENCHMARK_PROVIDER_URI to a running dev chain for the API to read from.")
+
+    if args.chain_state:
+        _, contract, manifest = load_chain_state(args.chain_state, provider_uri)
+        participants = manifest["participants"]
+    else:
+        contract = deploy_contract(local_web3(provider_uri))
+        participants = [seed_bookings(contract, args.bookings)]
+    job_numbers = list(range(100, contract.functions.nextJobNumber().call()))
+
+    print(f"{args.clients} clients, {len(job_numbers)} bookings, {args.duration:g} s per mode")
+    print(f"{'mode':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'hit %':>8}{'errors':>8}")
+    for mode, cache_entries in (("cached", 10000), ("uncached", 0)):
+        process = start_api(provider_uri, contract.address, cache_entries)
+        try:
+            latencies, outcomes = asyncio.run(run_clients(args.clients, args.duration, participants, job_numbers, args.seed))
+        finally:
+            process.terminate()
+            process.wait()
+
+        answered = outcomes[200] + outcomes[404]
+        errors = sum(count for outcome, count in outcomes.items() if outcome not in (200, 404, "hit", "miss"))
+        percentiles = [latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000 if latencies else 0 for fraction in (0.5, 0.95, 0.99)]
+        print(f"{mode:<10}{answered / args.duration:>10.0f}" + "".join(f"{value:>10.1f}" for value in percentiles)
+              + f"{100 * outcomes['hit'] / max(answered, 1):>8.1f}{errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Compare gas per account and wall-clock time of single vs bulk account registration.
+
+    python -m benchmarks.bulk_registration --accounts 10000
+"""
+# Import libraries
+import argparse
+import time
+
+# Import functions
+from functions.accounts import register_accounts_in_chunks
+from functions.batch import BatchCall
+from functions.submitter import TransactionSubmitter
+from benchmarks.chain import local_web3, deploy_contract, random_addresses
+
+
+def register_one_by_one(contract, accounts, ndia):
+    # Mirrors the register_account form: pre-checks, then one transaction per account
+    web3 = contract.web3
+    gas_used = 0
+    for index, account in enumerate(accounts):
+        batch = BatchCall(web3)
+        batch.add(contract.functions.ndia())
+        batch.add(contract.functions.ndisParticipant(account))
+        batch.add(contract.functions.ndisServiceProvider(account))
+        batch.execute()
+
+        tx_hash = contract.functions.registerAccount(account, index % 2 == 0).transact({"from": ndia})
+        gas_used += web3.eth.wait_for_transaction_receipt(tx_hash)["gasUsed"]
+    return gas_used
+
+
+def register_in_bulk(contract, accounts, ndia):
+    web3 = contract.web3
+    start_block = web3.eth.block_number
+    flags = [index % 2 == 0 for index in range(len(accounts))]
+    results = list(register_accounts_in_chunks(contract, accounts, flags, ndia, TransactionSubmitter(web3)))
+    assert all(result == "Registered" for _, result in results)
+
+    gas_used = 0
+    for block_number in range(start_block + 1, web3.eth.block_number + 1):
+        for tx_hash in web3.eth.get_block(block_number)["transactions"]:
+            gas_used += web3.eth.get_transaction_receipt(tx_hash)["gasUsed"]
+    return gas_used
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--accounts", type=int, default=10000)
+    args = parser.parse_args()
+
+    rows = []
+    for name, register in (("registerAccount", register_one_by_one), ("registerAccounts", register_in_bulk)):
+        web3 = local_web3()
+        contract = deploy_contract(web3)
+        ndia = web3.eth.accounts[0]
+        accounts = random_addresses(args.accounts, seed=name)
+
+        start = time.perf_counter()
+        gas_used = register(contract, accounts, ndia)
+        elapsed = time.perf_counter() - start
+        rows.append((name, gas_used / args.accounts, elapsed))
+
+    print(f"{'path':<18}{'gas/account':>14}{'seconds':>12}")
+    for name, gas_per_account, elapsed in rows:
+        print(f"{name:<18}{gas_per_account:>14.0f}{elapsed:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Shared helpers to deploy the NDIS contract on eth-tester or a local dev chain.
+
+Compiling needs py-solc-x; the solc binary is installed on first use.
+Set BENCHMARK_PROVIDER_URI to benchmark against a running dev chain
+(Ganache, Anvil, Hardhat) instead of the in-process eth-tester chain.
+A chain seeded by ``benchmarks.load_generator`` is described by a JSON
+manifest, which ``load_chain_state`` reconnects to.
+
+Run as a script, it compiles the contract and writes its ABI where the app
+reads it, so the ABI always comes from solc rather than from hand edits:
+
+    python -m benchmarks.chain            # rewrite contracts/compiled/ndis_smart_contract.json
+    python -m benchmarks.chain --check    # exit 1 if the committed ABI does not match the source
+"""
+# Import libraries
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+
+import solcx
+from eth_account import Account
+from web3 import Web3, EthereumTesterProvider
+
+CONTRACT_PATH = Path(__file__).resolve().parents[1] / "contracts" / "ndis_smart_contract.sol"
+CONTRACT_NAME = "NDISSmartContract"
+ABI_PATH = CONTRACT_PATH.parent / "compiled" / "ndis_smart_contract.json"
+SOLC_VERSION = os.getenv("SOLC_VERSION", "0.8.19")
+
+
+def compile_contract(source_path=CONTRACT_PATH):
+    """Compile the NDIS contract and return its ``(abi, bytecode)``.
+
+    ``source_path`` lets older revisions be compiled for before/after
+    comparisons, e.g. ``git show <rev>:contracts/ndis_smart_contract.sol``.
+    Revisions importing OpenZeppelin need SOLC_REMAPPINGS, e.g.
+    ``@openzeppelin/=node_modules/@openzeppelin/``.
+    """
+    source_path = Path(source_path).resolve()
+    if SOLC_VERSION not in [str(version) for version in solcx.get_installed_solc_versions()]:
+        solcx.install_solc(SOLC_VERSION)
+
+    compiled = solcx.compile_files(
+        [str(source_path)],
+        output_values=["abi", "bin"],
+        solc_version=SOLC_VERSION,
+        optimize=True,
+        import_remappings=os.getenv("SOLC_REMAPPINGS", "").split() or None,
+    )
+    contract_interface = compiled[f"{source_path}:{CONTRACT_NAME}"]
+    return contract_interface["abi"], contract_interface["bin"]
+
+
+def local_web3(provider_uri=None):
+    """Return a Web3 connected to a local dev chain, or to a fresh eth-tester chain."""
+    provider_uri = provider_uri or os.getenv("BENCHMARK_PROVIDER_URI")
+    if provider_uri:
+        return Web3(Web3.HTTPProvider(provider_uri))
+    return Web3(EthereumTesterProvider())
+
+
+def deploy_contract(web3, deployer=None, source_path=CONTRACT_PATH):
+    """Deploy a fresh NDIS contract; the deployer becomes the NDIA account."""
+    abi, bytecode = compile_contract(source_path)
+    deployer = deployer or web3.eth.accounts[0]
+
+    tx_hash = web3.eth.contract(abi=abi, bytecode=bytecode).constructor().transact({"from": deployer})
+    receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
+    return web3.eth.contract(address=receipt["contractAddress"], abi=abi)
+
+
+def random_addresses(count, seed=0):
+    """Return ``count`` distinct deterministic addresses."""
+    return [
+        Web3.toChecksumAddress(Web3.keccak(text=f"ndis-account-{seed}-{index}")[-20:].hex())
+        for index in range(count)
+    ]
+
+
+def synthetic_accounts(count, seed=0):
+    """Return ``count`` deterministic local accounts, with keys that can be derived again from ``seed``."""
+    return [Account.from_key(Web3.keccak(text=f"ndis-key-{seed}-{index}")) for index in range(count)]
+
+
+def save_chain_state(web3, contract, path, **details):
+    """Write a manifest of a seeded chain to ``path`` and return it.
+
+    The manifest records the node, the deployed contract and its ABI plus
+    ``details`` (e.g. the synthetic account seed). On Anvil the node's whole
+    state is dumped next to it as well, so it can be loaded into a fresh node.
+    """
+    manifest = {
+        "provider_uri": web3.provider.endpoint_uri if hasattr(web3.provider, "endpoint_uri") else None,
+        "chain_id": web3.eth.chain_id,
+        "block_number": web3.eth.block_number,
+        "contract_address": contract.address,
+        "abi": contract.abi,
+        "state_dump": None,
+        **details,
+    }
+    try:
+        state = web3.manager.request_blocking("anvil_dumpState", [])
+    except Exception:
+        # Other dev chains keep their state in their own database directory
+        state = None
+    if state:
+        manifest["state_dump"] = f"{Path(path).name}.state"
+        Path(path).with_name(manifest["state_dump"]).write_text(state)
+
+    Path(path).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def load_chain_state(path, provider_uri=None):
+    """Reconnect to a chain seeded by ``save_chain_state`` and return ``(web3, contract, manifest)``.
+
+    If the node no longer has the contract (e.g. Anvil was restarted), the
+    state dump saved with the manifest is loaded into it first.
+    """
+    manifest = json.loads(Path(path).read_text())
+    web3 = local_web3(provider_uri or os.getenv("BENCHMARK_PROVIDER_URI") or manifest["provider_uri"])
+
+    if not web3.eth.get_code(manifest["contract_address"]):
+        if not manifest["state_dump"]:
+            raise RuntimeError(f"The node has no contract at {manifest['contract_address']} and {path} has no state dump to load")
+        state = Path(path).with_name(manifest["state_dump"]).read_text()
+        web3.manager.request_blocking("anvil_loadState", [state])
+
+    return web3, web3.eth.contract(address=manifest["contract_address"], abi=manifest["abi"]), manifest
+
+
+def abi_entries(abi):
+    # Entries in a canonical form, so ABIs listing them in another order compare equal
+    return sorted(json.dumps(entry, sort_keys=True) for entry in abi)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--check", action="store_true", help="only compare the committed ABI with the compiled one")
+    args = parser.parse_args()
+
+    abi, _ = compile_contract()
+    if args.check:
+        if abi_entries(json.loads(ABI_PATH.read_text())) != abi_entries(abi):
+            sys.exit(f"{ABI_PATH} does not match {CONTRACT_PATH.name}; run python -m benchmarks.chain")
+        print(f"{ABI_PATH} matches {CONTRACT_PATH.name}")
+        return
+
+    # Tab-indented like the ABI Remix exports
+    ABI_PATH.write_text(json.dumps(abi, indent="\t"))
+    print(f"Wrote {len(abi)} ABI entries to {ABI_PATH}")
+
+
+if __name__ == "__main__":
+    main()
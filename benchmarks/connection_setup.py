@@ -0,0 +1,85 @@
+"""Measure cold start and per-rerun connection setup: a fresh client per module vs the shared pooled client.
+
+Streamlit runs each rerun in a new script thread. web3's stock HTTPProvider
+caches its requests session per thread, so every rerun opens new TCP
+connections; the shared FailoverHTTPProvider keeps one pool for the process.
+Run against a local dev chain:
+
+    BENCHMARK_PROVIDER_URI=http://127.0.0.1:8545 python -m benchmarks.connection_setup
+"""
+# Import libraries
+import os
+import json
+import time
+import argparse
+import threading
+
+from web3 import Web3
+
+# Import functions
+from functions.connection import CONTRACT_ABI_PATH, FailoverHTTPProvider, load_contract_abi
+
+# Modules that used to build their own client and parse the ABI at import
+CLIENT_MODULES = ("contract", "ethereum", "app")
+CONTRACT_MODULES = ("ndia", "provider", "utils", "indexer")
+
+
+def cold_start_per_module(provider_uri):
+    # One client per module and one ABI parse per connect_to_contract() call
+    for _ in CLIENT_MODULES:
+        web3 = Web3(Web3.HTTPProvider(provider_uri))
+    web3.isConnected()
+    for _ in CONTRACT_MODULES:
+        with open(CONTRACT_ABI_PATH) as f:
+            web3.eth.contract(address=None, abi=json.load(f))
+
+
+def cold_start_shared(provider_uri):
+    web3 = Web3(FailoverHTTPProvider([provider_uri]))
+    web3.isConnected()
+    for _ in CONTRACT_MODULES:
+        web3.eth.contract(address=None, abi=load_contract_abi())
+
+
+def reruns(web3, count, requests_per_rerun):
+    # Each rerun runs on its own thread, as Streamlit's script runner does
+    def rerun():
+        for _ in range(requests_per_rerun):
+            web3.eth.block_number
+
+    start = time.perf_counter()
+    for _ in range(count):
+        thread = threading.Thread(target=rerun)
+        thread.start()
+        thread.join()
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reruns", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=5, help="requests made by each rerun")
+    args = parser.parse_args()
+
+    provider_uri = os.getenv("BENCHMARK_PROVIDER_URI") or os.getenv("WEB3_PROVIDER_URI")
+    if not provider_uri:
+        raise SystemExit("Set BENCHMARK_PROVIDER_URI to a running dev chain.")
+
+    start = time.perf_counter()
+    cold_start_per_module(provider_uri)
+    per_module_cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cold_start_shared(provider_uri)
+    shared_cold = time.perf_counter() - start
+
+    per_thread_rerun = reruns(Web3(Web3.HTTPProvider(provider_uri)), args.reruns, args.requests)
+    pooled_rerun = reruns(Web3(FailoverHTTPProvider([provider_uri])), args.reruns, args.requests)
+
+    print(f"{'client':<26}{'cold start ms':>15}{'ms/rerun':>10}")
+    print(f"{'per-module HTTPProvider':<26}{per_module_cold * 1000:>15.2f}{per_thread_rerun * 1000:>10.2f}")
+    print(f"{'shared pooled client':<26}{shared_cold * 1000:>15.2f}{pooled_rerun * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
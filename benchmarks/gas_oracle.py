@@ -0,0 +1,97 @@
+"""Measure gas quote latency and how closely quotes track the tips of included transactions.
+
+Needs a dev chain with EIP-1559 and manual mining (Anvil, Hardhat). Each
+round sends ``--transactions`` transfers with random tips, mines them into
+one block and compares the quote taken before the block with the tips that
+block actually included:
+
+    BENCHMARK_PROVIDER_URI=http://127.0.0.1:8545 python -m benchmarks.gas_oracle --blocks 50
+"""
+# Import libraries
+import time
+import random
+import argparse
+from statistics import median
+
+from web3.gas_strategies.time_based import medium_gas_price_strategy
+
+# Import functions
+from benchmarks.chain import local_web3, random_addresses
+from functions.gas import GasOracle, SPEED_PERCENTILES
+
+GWEI = 10 ** 9
+
+
+def effective_tip(transaction, base_fee):
+    if "maxPriorityFeePerGas" in transaction:
+        return min(transaction["maxPriorityFeePerGas"], transaction["maxFeePerGas"] - base_fee)
+    return transaction["gasPrice"] - base_fee
+
+
+def time_quotes(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--blocks", type=int, default=50)
+    parser.add_argument("--transactions", type=int, default=20, help="transactions per block")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    web3 = local_web3()
+    sender = web3.eth.accounts[0]
+    payees = random_addresses(args.transactions, args.seed)
+    rng = random.Random(args.seed)
+    # The app learns the head from the read cache's block poller; track it the same way here
+    head = [web3.eth.block_number]
+    oracle = GasOracle(web3, block_number=lambda: head[0])
+
+    web3.provider.make_request("evm_setAutomine", [False])
+    errors = {speed: [] for speed in SPEED_PERCENTILES}
+    covered = {speed: 0 for speed in SPEED_PERCENTILES}
+    included = 0
+    try:
+        for _ in range(args.blocks):
+            quotes = {speed: oracle.suggest(speed) for speed in SPEED_PERCENTILES}
+            base_fee = web3.eth.get_block("latest")["baseFeePerGas"]
+            for payee in payees:
+                tip = int(rng.lognormvariate(0, 0.5) * 2 * GWEI)
+                web3.eth.send_transaction({
+                    "from": sender,
+                    "to": payee,
+                    "value": 1,
+                    "maxPriorityFeePerGas": tip,
+                    "maxFeePerGas": 3 * base_fee + tip,
+                })
+            web3.provider.make_request("evm_mine", [])
+            head[0] = web3.eth.block_number
+
+            block = web3.eth.get_block("latest", full_transactions=True)
+            tips = [effective_tip(transaction, block["baseFeePerGas"]) for transaction in block["transactions"]]
+            if not tips:
+                continue
+            included += len(tips)
+            for speed, quote in quotes.items():
+                quoted_tip = quote.get("maxPriorityFeePerGas", quote.get("gasPrice", 0))
+                errors[speed].append(abs(quoted_tip - median(tips)) / median(tips))
+                covered[speed] += sum(1 for tip in tips if tip <= quoted_tip)
+    finally:
+        web3.provider.make_request("evm_setAutomine", [True])
+
+    web3.eth.set_gas_price_strategy(medium_gas_price_strategy)
+    oracle_latency = time_quotes(oracle.suggest, 1000)
+    strategy_latency = time_quotes(web3.eth.generate_gas_price, 3)
+
+    print(f"quote latency: oracle {oracle_latency * 1e6:.1f} us, medium_gas_price_strategy {strategy_latency * 1000:.1f} ms")
+    print(f"{'speed':<8}{'median tip error':>18}{'tips at or below quote':>24}")
+    for speed in SPEED_PERCENTILES:
+        mean_error = sum(errors[speed]) / len(errors[speed]) if errors[speed] else 0.0
+        print(f"{speed:<8}{mean_error * 100:>17.1f}%{covered[speed] / max(included, 1) * 100:>23.1f}%")
+
+
+if __name__ == "__main__":
+    main()
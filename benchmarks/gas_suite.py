@@ -0,0 +1,118 @@
+"""Gas and wall-time micro-benchmarks for every NDIS contract entry point as state grows.
+
+Deploys contracts/ndis_smart_contract.sol on eth-tester (or BENCHMARK_PROVIDER_URI),
+seeds N booking requests for each size, then measures every entry point once:
+
+    python -m benchmarks.gas_suite --sizes 10 100 1000 --json gas_suite.json
+    python -m benchmarks.gas_suite --baseline gas_suite.json   # show the change against a previous run
+"""
+# Import libraries
+import argparse
+import json
+import time
+
+# Import functions
+from benchmarks.chain import local_web3, deploy_contract
+from benchmarks.lifecycle_gas import booking_arguments
+
+WAITING_FOR_APPROVAL = 2
+PAGE_SIZE = 50
+
+
+def timed(callable_):
+    start = time.perf_counter()
+    result = callable_()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def measure_transaction(contract_function, sender, value=0):
+    web3 = contract_function.web3
+
+    def send():
+        tx_hash = contract_function.transact({"from": sender, "value": value})
+        return web3.eth.wait_for_transaction_receipt(tx_hash)
+
+    receipt, elapsed_ms = timed(send)
+    return receipt, {"gas": receipt["gasUsed"], "ms": elapsed_ms}
+
+
+def measure_view(contract_function):
+    # Views cost no gas on-chain, but their execution gas decides whether eth_call fits the node's gas cap
+    try:
+        gas = contract_function.estimateGas()
+        _, elapsed_ms = timed(contract_function.call)
+    except Exception as error:
+        return {"gas": None, "ms": None, "error": str(error)}
+    return {"gas": gas, "ms": elapsed_ms}
+
+
+def run_size(size):
+    web3 = local_web3()
+    ndia, participant, provider = web3.eth.accounts[:3]
+    contract = deploy_contract(web3, ndia)
+    results = {}
+
+    _, results["deposit"] = measure_transaction(contract.functions.deposit(), ndia, value=10 ** 18)
+    _, results["registerAccount"] = measure_transaction(contract.functions.registerAccount(participant, True), ndia)
+    measure_transaction(contract.functions.registerAccount(provider, False), ndia)
+
+    # Seed the contract with `size` booking requests
+    request_ids = []
+    for _ in range(size):
+        receipt, _ = measure_transaction(contract.functions.bookService(*booking_arguments(contract)), participant)
+        request_ids.append(contract.events.ServiceBooked().processReceipt(receipt)[0]["args"]["requestId"])
+
+    # Measure each lifecycle step on the next request, with `size` requests already stored
+    receipt, results["bookService"] = measure_transaction(contract.functions.bookService(*booking_arguments(contract)), participant)
+    request_id = contract.events.ServiceBooked().processReceipt(receipt)[0]["args"]["requestId"]
+    _, results["offerService"] = measure_transaction(contract.functions.offerService(participant, request_id, "Core Supports"), provider)
+    _, results["initiateWithdrawalRequest"] = measure_transaction(contract.functions.initiateWithdrawalRequest(request_id, 3000), provider)
+    _, results["approveWithdrawal"] = measure_transaction(contract.functions.approveWithdrawal(request_id), ndia)
+
+    results["getBookingRequests"] = measure_view(contract.functions.getBookingRequests())
+    results["getBookingRequestCount"] = measure_view(contract.functions.getBookingRequestCount(WAITING_FOR_APPROVAL))
+    results["getBookingRequestsByStatus"] = measure_view(contract.functions.getBookingRequestsByStatus(0, 0, PAGE_SIZE))
+    return results
+
+
+def print_table(runs, baseline=None):
+    sizes = sorted(runs, key=int)
+    entry_points = list(runs[sizes[0]])
+
+    header = f"{'entry point':<28}" + "".join(f"{'N=' + size + ' gas':>16}{'ms':>9}" for size in sizes)
+    print(header)
+    for entry_point in entry_points:
+        row = f"{entry_point:<28}"
+        for size in sizes:
+            result = runs[size][entry_point]
+            gas = "error" if result["gas"] is None else str(result["gas"])
+            previous = (baseline or {}).get(size, {}).get(entry_point, {}).get("gas")
+            if previous and result["gas"] is not None:
+                gas += f" ({(result['gas'] - previous) / previous:+.0%})"
+            elapsed = "-" if result["ms"] is None else f"{result['ms']:.1f}"
+            row += f"{gas:>16}{elapsed:>9}"
+        print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--json", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from a previous run to compare gas against")
+    args = parser.parse_args()
+
+    runs = {str(size): run_size(size) for size in args.sizes}
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_table(runs, baseline)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(runs, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
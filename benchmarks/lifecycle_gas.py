@@ -0,0 +1,73 @@
+"""Measure the gas used by each step of one request's lifecycle.
+
+Compare the current contract with an older revision:
+
+    git show <rev>:contracts/ndis_smart_contract.sol > /tmp/before.sol
+    python -m benchmarks.lifecycle_gas --source /tmp/before.sol
+    python -m benchmarks.lifecycle_gas
+"""
+# Import libraries
+import argparse
+
+# Import functions
+from benchmarks.chain import CONTRACT_PATH, local_web3, deploy_contract
+
+# Values for bookService arguments, matched by name so older signatures work too
+BOOKING_ARGUMENTS = {
+    "jobNumber": "100",
+    "serviceCategory": 1,
+    "serviceDescription": "Core Supports",
+    "amount": 3000,
+    "participantUnidNumber": "430000001",
+}
+
+
+def function_inputs(contract, name):
+    return [entry for entry in contract.abi if entry.get("type") == "function" and entry["name"] == name][0]["inputs"]
+
+
+def booking_arguments(contract):
+    return [BOOKING_ARGUMENTS[entry["name"]] for entry in function_inputs(contract, "bookService")]
+
+
+def run_lifecycle(contract, ndia, participant, provider):
+    """Drive one request from deposit to approval and return the gas used per step."""
+    web3 = contract.web3
+
+    def transact(contract_function, sender, value=0):
+        tx_hash = contract_function.transact({"from": sender, "value": value})
+        return web3.eth.wait_for_transaction_receipt(tx_hash)
+
+    gas = {}
+    gas["deposit"] = transact(contract.functions.deposit(), ndia, value=10 ** 18)["gasUsed"]
+    gas["registerAccount"] = transact(contract.functions.registerAccount(participant, True), ndia)["gasUsed"]
+    transact(contract.functions.registerAccount(provider, False), ndia)
+
+    receipt = transact(contract.functions.bookService(*booking_arguments(contract)), participant)
+    gas["bookService"] = receipt["gasUsed"]
+    request_id = contract.events.ServiceBooked().processReceipt(receipt)[0]["args"]["requestId"]
+
+    gas["offerService"] = transact(contract.functions.offerService(participant, request_id, "Core Supports"), provider)["gasUsed"]
+    gas["initiateWithdrawalRequest"] = transact(contract.functions.initiateWithdrawalRequest(request_id, 3000), provider)["gasUsed"]
+    gas["approveWithdrawal"] = transact(contract.functions.approveWithdrawal(request_id), ndia)["gasUsed"]
+    return gas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--source", default=str(CONTRACT_PATH), help="Solidity source to measure")
+    args = parser.parse_args()
+
+    web3 = local_web3()
+    ndia, participant, provider = web3.eth.accounts[:3]
+    contract = deploy_contract(web3, ndia, source_path=args.source)
+
+    gas = run_lifecycle(contract, ndia, participant, provider)
+    print(f"{'step':<28}{'gas used':>10}")
+    for step, gas_used in gas.items():
+        print(f"{step:<28}{gas_used:>10}")
+    print(f"{'total':<28}{sum(gas.values()):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Measure how long new contract events take to reach the live event store.
+
+Books ``--count`` services one at a time and times each booking from its
+receipt to the request showing up in the store, polling a log filter every
+``--poll-interval`` seconds, or through ``eth_subscribe`` when
+WEB3_WS_PROVIDER_URI points at the dev chain's websocket endpoint:
+
+    BENCHMARK_PROVIDER_URI=http://127.0.0.1:8545 WEB3_WS_PROVIDER_URI=ws://127.0.0.1:8545 python -m benchmarks.live_updates
+
+The rest of the way to the screen is the ``ndis_event_to_screen_seconds``
+histogram in the app's Prometheus metrics.
+"""
+# Import libraries
+import os
+import time
+import argparse
+from statistics import median, quantiles
+
+# Import functions
+from benchmarks.chain import local_web3, deploy_contract
+from functions.indexer import EventIndexer
+from functions.subscriber import LiveEventStore, EventSubscriber
+
+# RequestStatus.Pending in the contract
+PENDING = 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=100, help="bookings to time")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="seconds between eth_getFilterChanges polls")
+    args = parser.parse_args()
+
+    web3 = local_web3()
+    ndia, participant = web3.eth.accounts[:2]
+    contract = deploy_contract(web3, ndia)
+    web3.eth.wait_for_transaction_receipt(contract.functions.registerAccount(participant, True).transact({"from": ndia}))
+
+    store = LiveEventStore()
+    subscriber = EventSubscriber(store, web3, contract, ws_uri=os.getenv("WEB3_WS_PROVIDER_URI"), poll_interval=args.poll_interval)
+    subscriber.backfill(EventIndexer(web3, contract))
+    subscriber.start()
+
+    delays = []
+    for booked in range(1, args.count + 1):
+        tx_hash = contract.functions.bookService(0, "Support Coordination", 2000, "UNID").transact({"from": participant})
+        web3.eth.wait_for_transaction_receipt(tx_hash)
+        mined = time.perf_counter()
+        version = store.version
+        while store.requests_page(PENDING, 0, 0)[0] < booked:
+            if not store.wait_for_change(version, 10 * args.poll_interval + 10):
+                raise TimeoutError("booking not delivered")
+            version = store.version
+        delays.append(time.perf_counter() - mined)
+
+    mode = "eth_subscribe" if subscriber.ws_uri else f"filter polled every {args.poll_interval} s"
+    print(f"{mode}: {len(delays)} events")
+    print(f"receipt to store: median {median(delays) * 1000:.1f} ms, p95 {quantiles(delays, n=20)[-1] * 1000:.1f} ms, max {max(delays) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Drive the full NDIS request lifecycle at a configurable rate and concurrency to find where it falls over.
+
+Funds and registers ``--participants`` and ``--providers`` synthetic
+accounts (one ``registerAccount`` each, as the register form sends them),
+then runs ``--requests`` lifecycles, book -> offer -> initiate withdrawal
+-> approve, through the same submitter, transaction tracker and log
+decoder the app uses. Up to ``--concurrency`` lifecycles are in flight at
+once and new ones start at ``--rate`` per second (0 starts them as fast as
+workers free up):
+
+    BENCHMARK_PROVIDER_URI=http://127.0.0.1:8545 python -m benchmarks.load_generator --participants 2000 --providers 200 --requests 5000 --rate 50
+
+Reports throughput, latency percentiles per step (sent to seen mined by the
+tracker, as the sidebar sees it) and failure rates. The seeded chain is
+then saved to ``--save-state`` for other benchmarks to reuse, e.g.
+``python -m benchmarks.page_latency --chain-state seeded_chain.json``.
+"""
+# Import libraries
+import os
+import time
+import argparse
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# Import functions
+from benchmarks.chain import local_web3, deploy_contract, synthetic_accounts, save_chain_state
+from benchmarks.lifecycle_gas import BOOKING_ARGUMENTS, booking_arguments
+from functions.decoder import log_decoder
+from functions.submitter import TransactionSubmitter
+from functions.tracker import TransactionTracker, PENDING_STATUS, MINED_STATUS
+
+# Steps of one request's lifecycle, in order
+STEPS = ("bookService", "offerService", "initiateWithdrawalRequest", "approveWithdrawals")
+
+# Seconds between checks of the tracker while a step is pending
+WAIT_INTERVAL = 0.01
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class LoadGenerator:
+    """Runs request lifecycles from many threads and records per-step latency and failures."""
+
+    def __init__(self, contract, ndia, poll_interval, step_timeout):
+        self.contract = contract
+        self.ndia = ndia
+        self.step_timeout = step_timeout
+        self.submitter = TransactionSubmitter(contract.web3)
+        self.tracker = TransactionTracker(contract.web3, poll_interval)
+        self.latencies = defaultdict(list)
+        self.failures = defaultdict(Counter)
+        self.completed = 0
+        self._lock = threading.Lock()
+
+    def send(self, step, contract_function, account=None):
+        """Send one step the way the app does and wait until the tracker sees it mined; returns its receipt or None."""
+        start = time.perf_counter()
+        try:
+            tx_hash = self.tracker.track(self.submitter.transact(contract_function, {"from": self.ndia if account is None else account.address}, account))
+        except Exception as e:
+            # Gas estimation surfaces reverts before sending; nodes refuse sends they cannot take
+            return self._fail(step, str(e).splitlines()[0][:100] or type(e).__name__)
+
+        status, detail = self.tracker.status(tx_hash)
+        while status == PENDING_STATUS:
+            if time.perf_counter() - start > self.step_timeout:
+                return self._fail(step, f"Not mined within {self.step_timeout:g} s")
+            time.sleep(WAIT_INTERVAL)
+            status, detail = self.tracker.status(tx_hash)
+        if status != MINED_STATUS:
+            return self._fail(step, f"{status}: {detail[:100]}")
+
+        with self._lock:
+            self.latencies[step].append(time.perf_counter() - start)
+        return self.tracker.receipt(tx_hash)
+
+    def lifecycle(self, participant, provider):
+        """Take one request from booking to approval, stopping at the first failed step."""
+        start = time.perf_counter()
+        functions = self.contract.functions
+
+        receipt = self.send("bookService", functions.bookService(*booking_arguments(self.contract)), participant)
+        if receipt is None:
+            return
+        request_id = [record.requestId for record in log_decoder.decode_logs(receipt["logs"], self.contract.address) if record.event == "ServiceBooked"][0]
+
+        if self.send("offerService", functions.offerService(participant.address, request_id, BOOKING_ARGUMENTS["serviceDescription"]), provider) is None:
+            return
+        if self.send("initiateWithdrawalRequest", functions.initiateWithdrawalRequest(request_id, BOOKING_ARGUMENTS["amount"]), provider) is None:
+            return
+        receipt = self.send("approveWithdrawals", functions.approveWithdrawals([request_id]))
+        if receipt is None:
+            return
+        if not any(record.event == "Withdrawal" for record in log_decoder.decode_logs(receipt["logs"], self.contract.address)):
+            self._fail("approveWithdrawals", "Approval skipped")
+            return
+
+        with self._lock:
+            self.latencies["lifecycle"].append(time.perf_counter() - start)
+            self.completed += 1
+
+    def send_all(self, step, calls):
+        """Send ``(contract_function, transaction)`` pairs back to back and wait for all of them; plain transfers have no function."""
+        tx_hashes = []
+        for contract_function, transaction in calls:
+            try:
+                if contract_function is None:
+                    tx_hashes.append(self.tracker.track(self.submitter.send(transaction, cache_gas=True)))
+                else:
+                    tx_hashes.append(self.tracker.track(self.submitter.transact(contract_function, transaction, cache_gas=True)))
+            except Exception as e:
+                self._fail(step, str(e).splitlines()[0][:100] or type(e).__name__)
+
+        deadline = time.perf_counter() + self.step_timeout
+        for tx_hash in tx_hashes:
+            status, detail = self.tracker.status(tx_hash)
+            while status == PENDING_STATUS and time.perf_counter() < deadline:
+                time.sleep(WAIT_INTERVAL)
+                status, detail = self.tracker.status(tx_hash)
+            if status != MINED_STATUS:
+                self._fail(step, f"{status}: {detail[:100]}")
+        return len(tx_hashes)
+
+    def _fail(self, step, reason):
+        with self._lock:
+            self.failures[step][reason] += 1
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--participants", type=int, default=1000)
+    parser.add_argument("--providers", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=1000, help="lifecycles to run")
+    parser.add_argument("--concurrency", type=int, default=50, help="lifecycles in flight at once")
+    parser.add_argument("--rate", type=float, default=0, help="lifecycles started per second, 0 for as fast as workers free up")
+    parser.add_argument("--fund", type=int, default=10 ** 17, help="wei sent to each synthetic account for gas")
+    parser.add_argument("--poll-interval", type=float, default=0.1, help="seconds between the tracker's receipt polls")
+    parser.add_argument("--step-timeout", type=float, default=120, help="seconds a step may take to be mined")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic account keys")
+    parser.add_argument("--save-state", default="seeded_chain.json", help="manifest of the seeded chain for other benchmarks")
+    args = parser.parse_args()
+
+    if not os.getenv("BENCHMARK_PROVIDER_URI"):
+        raise SystemExit("Set BENCHMARK_PROVIDER_URI to a running dev chain; the in-process eth-tester chain cannot take concurrent requests.")
+
+    web3 = local_web3()
+    ndia = web3.eth.accounts[0]
+    contract = deploy_contract(web3, ndia)
+    generator = LoadGenerator(contract, ndia, args.poll_interval, args.step_timeout)
+
+    # Fund the synthetic accounts, register them and deposit enough for every withdrawal
+    participants = synthetic_accounts(args.participants, seed=f"participant-{args.seed}")
+    providers = synthetic_accounts(args.providers, seed=f"provider-{args.seed}")
+    accounts = [(account, True) for account in participants] + [(account, False) for account in providers]
+    start = time.perf_counter()
+    generator.send_all("fund", ((None, {"from": ndia, "to": account.address, "value": args.fund}) for account, _ in accounts))
+    generator.send_all("registerAccount", ((contract.functions.registerAccount(account.address, is_participant), {"from": ndia}) for account, is_participant in accounts))
+    generator.send_all("deposit", [(contract.functions.deposit(), {"from": ndia, "value": args.requests * BOOKING_ARGUMENTS["amount"]})])
+    setup_seconds = time.perf_counter() - start
+
+    # Start lifecycles at the target rate; workers take them as they free up
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = []
+        for index in range(args.requests):
+            if args.rate:
+                delay = start + index / args.rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            futures.append(executor.submit(generator.lifecycle, participants[index % len(participants)], providers[index % len(providers)]))
+        for future in futures:
+            future.result()
+    run_seconds = time.perf_counter() - start
+
+    print(f"setup: {len(accounts)} accounts funded and registered in {setup_seconds:.1f} s ({len(accounts) / setup_seconds:.1f} accounts/s)")
+    print(f"run: {generator.completed} of {args.requests} lifecycles completed in {run_seconds:.1f} s: "
+          f"{generator.completed / run_seconds:.2f} lifecycles/s, {sum(len(generator.latencies[step]) for step in STEPS) / run_seconds:.1f} tx/s")
+    print(f"{'step':<28}{'mined':>8}{'failed':>8}{'fail %':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for step in STEPS + ("lifecycle",):
+        latencies = sorted(generator.latencies[step])
+        failed = args.requests - generator.completed if step == "lifecycle" else sum(generator.failures[step].values())
+        row = f"{step:<28}{len(latencies):>8}{failed:>8}{100 * failed / max(len(latencies) + failed, 1):>8.1f}"
+        if latencies:
+            row += "".join(f"{percentile(latencies, fraction) * 1000:>10.0f}" for fraction in (0.5, 0.95, 0.99, 1))
+        print(row)
+    for step, reasons in generator.failures.items():
+        for reason, count in reasons.most_common(3):
+            print(f"  {step}: {count} x {reason}")
+
+    # Save the seeded chain for other benchmarks
+    request_counts = {status: contract.functions.getBookingRequestCount(status).call() for status in range(4)}
+    manifest = save_chain_state(
+        web3, contract, args.save_state,
+        ndia=ndia,
+        participant_key_seed=f"participant-{args.seed}",
+        provider_key_seed=f"provider-{args.seed}",
+        participants=[account.address for account in participants],
+        providers=[account.address for account in providers],
+        request_counts=request_counts,
+    )
+    dumped = f", state dumped to {manifest['state_dump']}" if manifest["state_dump"] else ""
+    print(f"seeded chain saved to {args.save_state}{dumped}")
+
+
+if __name__ == "__main__":
+    main()
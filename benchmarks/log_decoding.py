@@ -0,0 +1,119 @@
+"""Compare decoding raw NDIS contract logs with web3's per-entry event processing and with LogDecoder.
+
+Builds ``--count`` synthetic ``eth_getLogs`` results, a mix of
+ServiceBooked, ServiceOffered, WithdrawalRequestInitiated and Withdrawal
+logs, and decodes them both ways. No chain is needed:
+
+    python -m benchmarks.log_decoding --count 1000000
+
+web3's path (result formatting plus ``processLog``) is slow enough that it
+is timed on ``--web3-sample`` logs and scaled up to ``--count``.
+"""
+# Import libraries
+import time
+import random
+import argparse
+
+from eth_abi import encode_abi
+from web3 import Web3
+from web3._utils.method_formatters import log_entry_formatter
+
+# Import functions
+from benchmarks.chain import random_addresses
+from functions.connection import load_contract_abi
+from functions.decoder import LogDecoder, event_topic
+
+EVENTS = ("ServiceBooked", "ServiceOffered", "WithdrawalRequestInitiated", "Withdrawal")
+CONTRACT_ADDRESS = "0x5FbDB2315678afecb367f032d93F642f64180aa3"
+
+
+def synthetic_logs(count, seed=0, distinct=10000):
+    """Return ``count`` raw logs as a node sends them, with hex string fields.
+
+    ABI encoding is slow, so ``distinct`` topic and data payloads are encoded
+    and reused across logs with their own block and transaction fields.
+    """
+    abi = [entry for entry in load_contract_abi() if entry.get("type") == "event" and entry["name"] in EVENTS]
+    rng = random.Random(seed)
+    accounts = random_addresses(100, seed)
+    values = {
+        "address": lambda: rng.choice(accounts),
+        "bytes32": lambda: rng.getrandbits(256).to_bytes(32, "big"),
+        "uint256": lambda: rng.randrange(10 ** 6),
+        "uint32": lambda: rng.randrange(2 ** 32),
+        "uint8": lambda: rng.randrange(4),
+        "string": lambda: rng.choice(["Core Supports", "Assistive Technology", "Transport Supports", "4301234567"]),
+    }
+
+    payloads = []
+    for index in range(min(count, distinct)):
+        event = abi[index % len(abi)]
+        args = [values[i["type"]]() for i in event["inputs"]]
+        topics = [event_topic(event)] + [
+            "0x" + bytes(12).hex() + value[2:].lower()
+            for i, value in zip(event["inputs"], args) if i["indexed"]
+        ]
+        data = encode_abi(
+            [i["type"] for i in event["inputs"] if not i["indexed"]],
+            [value for i, value in zip(event["inputs"], args) if not i["indexed"]],
+        )
+        payloads.append((topics, "0x" + data.hex()))
+
+    logs = []
+    for index in range(count):
+        topics, data = payloads[index % len(payloads)]
+        logs.append({
+            "address": CONTRACT_ADDRESS,
+            "topics": topics,
+            "data": data,
+            "blockNumber": hex(1 + index // 100),
+            "transactionHash": "0x" + rng.getrandbits(256).to_bytes(32, "big").hex(),
+            "transactionIndex": hex(index % 100),
+            "blockHash": "0x" + (1 + index // 100).to_bytes(32, "big").hex(),
+            "logIndex": hex(index % 100),
+            "removed": False,
+        })
+    return logs
+
+
+def decode_with_web3(contract, logs):
+    # What the app did before: format each log, look its event up by topic, then processLog
+    names = {event_topic(entry): entry["name"] for entry in contract.abi if entry.get("type") == "event"}
+    return [contract.events[names[log["topics"][0]]]().processLog(log_entry_formatter(log)) for log in logs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=1000000)
+    parser.add_argument("--web3-sample", type=int, default=20000, help="logs decoded through web3 before scaling up")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    logs = synthetic_logs(args.count, args.seed)
+    print(f"built {len(logs)} synthetic logs in {time.perf_counter() - start:.1f} s")
+
+    contract = Web3().eth.contract(address=CONTRACT_ADDRESS, abi=load_contract_abi())
+    sample = logs[:min(args.web3_sample, len(logs))]
+    start = time.perf_counter()
+    entries = decode_with_web3(contract, sample)
+    web3_seconds = (time.perf_counter() - start) * len(logs) / len(sample)
+
+    start = time.perf_counter()
+    decoder = LogDecoder(load_contract_abi(), EVENTS)
+    records = decoder.decode_logs(logs)
+    decoder_seconds = time.perf_counter() - start
+
+    # Both paths must agree on every decoded argument
+    for entry, record in zip(entries, records):
+        if dict(entry["args"]) != record.args:
+            raise AssertionError(f"decoders disagree on {entry['event']}: {dict(entry['args'])} != {record.args}")
+
+    print(f"{'path':<12}{'seconds':>10}{'logs/s':>14}")
+    print(f"{'web3':<12}{web3_seconds:>10.1f}{len(logs) / web3_seconds:>14,.0f}" + ("" if len(sample) == len(logs) else f"  (scaled from {len(sample)} logs)"))
+    print(f"{'LogDecoder':<12}{decoder_seconds:>10.1f}{len(logs) / decoder_seconds:>14,.0f}")
+    print(f"speedup: {web3_seconds / decoder_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Compare NDIA page load latency: panels reading one after another vs the concurrent prefetch.
+
+A proxy that delays every request by ``--latency`` milliseconds is put in
+front of a running dev chain (Anvil, Ganache, Hardhat), so the numbers show
+what a remote node would feel like. A fresh contract is deployed and seeded
+with a few bookings first, or a chain seeded by ``benchmarks.load_generator``
+is reused with ``--chain-state``:
+
+    BENCHMARK_PROVIDER_URI=http://127.0.0.1:8545 python -m benchmarks.page_latency --latency 100
+"""
+# Import libraries
+import os
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+# Import functions
+from benchmarks.chain import local_web3, deploy_contract, load_chain_state
+from benchmarks.lifecycle_gas import booking_arguments
+
+PROXY_PORT = 8599
+WAITING_FOR_APPROVAL = 2
+PENDING = 0
+PAGE_SIZE = 50
+
+
+def start_latency_proxy(upstream_uri, latency, port=PROXY_PORT):
+    """Serve a JSON-RPC proxy that forwards to ``upstream_uri`` after ``latency`` seconds."""
+    local = threading.local()
+
+    class LatencyProxy(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            time.sleep(latency)
+            if not hasattr(local, "session"):
+                local.session = requests.Session()
+            response = local.session.post(upstream_uri, data=body, headers={"Content-Type": "application/json"})
+
+            self.send_response(response.status_code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(response.content)))
+            self.end_headers()
+            self.wfile.write(response.content)
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 128
+
+    server = Server(("127.0.0.1", port), LatencyProxy)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def ndia_page_panels(contract, account):
+    # The view calls made by one render of the NDIA page, grouped by panel
+    return [
+        [contract.functions.ndia(), contract.functions.participantFunds()],
+        [contract.functions.ndisParticipant(account), contract.functions.ndisServiceProvider(account)],
+        [contract.functions.getBookingRequestCount(WAITING_FOR_APPROVAL), contract.functions.getBookingRequestsByStatus(WAITING_FOR_APPROVAL, 0, PAGE_SIZE)],
+        [contract.functions.getBookingRequestByJobNumber(100)],
+        [contract.functions.getBookingRequestCount(PENDING), contract.functions.getBookingRequestsByStatus(PENDING, 0, PAGE_SIZE)],
+        [contract.functions.nextJobNumber()],
+    ]
+
+
+def seed_bookings(contract, count):
+    web3 = contract.web3
+    ndia, participant = web3.eth.accounts[0], web3.eth.accounts[1]
+    contract.functions.registerAccount(participant, True).transact({"from": ndia})
+    for _ in range(count):
+        contract.functions.bookService(*booking_arguments(contract)).transact({"from": participant})
+    return participant
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=int, default=100, help="added latency per request in milliseconds")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--bookings", type=int, default=20, help="bookings seeded before measuring")
+    parser.add_argument("--chain-state", help="manifest saved by benchmarks.load_generator to measure against instead")
+    args = parser.parse_args()
+
+    upstream_uri = os.getenv("BENCHMARK_PROVIDER_URI")
+    if not upstream_uri:
+        raise SystemExit("Set BENCHMARK_PROVIDER_URI to a running dev chain; the latency proxy forwards to it.")
+
+    if args.chain_state:
+        _, deployed, manifest = load_chain_state(args.chain_state, upstream_uri)
+        participant = manifest["participants"][0]
+    else:
+        deployed = deploy_contract(local_web3(upstream_uri))
+        participant = seed_bookings(deployed, args.bookings)
+    start_latency_proxy(upstream_uri, args.latency / 1000)
+
+    # The app modules read WEB3_PROVIDER_URI at import time
+    os.environ["WEB3_PROVIDER_URI"] = f"http://127.0.0.1:{PROXY_PORT}"
+    from functions.contract import w3
+    from functions.cache import block_cache
+    from functions.loader import AsyncPrefetcher
+
+    contract = w3.eth.contract(address=deployed.address, abi=deployed.abi)
+    prefetcher = AsyncPrefetcher(provider_uri=os.environ["WEB3_PROVIDER_URI"])
+
+    # Each panel waits on its own reads, as the page did before the prefetch stage
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        block_cache.invalidate()
+        for panel_reads in ndia_page_panels(contract, participant):
+            block_cache.batch_call(*panel_reads)
+    sequential_time = (time.perf_counter() - start) / args.repeat
+
+    # Every read starts up front, then the panels render from the cache
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        block_cache.invalidate()
+        panels = ndia_page_panels(contract, participant)
+        prefetcher.prefetch([read for panel_reads in panels for read in panel_reads])
+        for panel_reads in panels:
+            block_cache.batch_call(*panel_reads)
+    prefetch_time = (time.perf_counter() - start) / args.repeat
+
+    print(f"latency {args.latency} ms per request, {sum(len(p) for p in ndia_page_panels(contract, participant))} reads per page")
+    print(f"{'mode':<12}{'ms/page':>10}")
+    print(f"{'sequential':<12}{sequential_time * 1000:>10.1f}")
+    print(f"{'prefetch':<12}{prefetch_time * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
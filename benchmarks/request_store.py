@@ -0,0 +1,109 @@
+"""Compare memory and page time of the columnar request store with a dict of Request tuples.
+
+Fills both with ``--requests`` synthetic requests, then times one page of
+the requests waiting for approval, by job number and filtered by amount and
+sorted by amount, the way the viewers ask for them:
+
+    python -m benchmarks.request_store --requests 1000000
+
+The dict of tuples is how the live event store kept requests before, and
+its pages are worked out the same way it did: filter and sort every request
+in Python on each render. The memory of a whole live event store, fed the
+same requests as ``ServiceBooked`` logs ``--per-block`` to a block, is
+reported too; it adds the events still within reach of a reorg.
+"""
+# Import libraries
+import time
+import random
+import argparse
+import tracemalloc
+
+# Import functions
+from functions.request_store import RequestColumns, NO_CLAIMANT
+from functions.subscriber import LiveEventStore
+
+WAITING_FOR_APPROVAL = 2
+PAGE_SIZE = 500
+
+
+def synthetic_requests(count, participants, seed=0):
+    rng = random.Random(seed)
+    addresses = [f"0x{index:040x}" for index in range(participants)]
+    for index in range(count):
+        yield index.to_bytes(32, "big"), (rng.choice(addresses), rng.randrange(1000, 30000), 100 + index, rng.randrange(4), rng.randrange(10), 0, NO_CLAIMANT)
+
+
+def booking_logs(requests, per_block):
+    """``ServiceBooked`` events for ``requests``, as ``(args, block_number, key)``."""
+    for index, (request_id, (participant, amount, job_number, status, service_category, _, _)) in enumerate(requests):
+        block_number = index // per_block
+        args = {"requestId": request_id, "participant": participant, "amount": amount, "jobNumber": job_number, "status": status, "serviceCategory": service_category}
+        yield args, block_number, (f"0x{block_number:064x}", index % per_block)
+
+
+def dict_page(requests, status, min_amount=None, sort_by_amount=False, offset=0, limit=PAGE_SIZE):
+    matching = sorted(
+        ((request_id, request) for request_id, request in requests.items()
+         if request[3] == status and (min_amount is None or request[1] >= min_amount)),
+        key=lambda item: item[1][1] if sort_by_amount else item[1][2],
+    )
+    return len(matching), matching[offset:offset + limit]
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000000)
+    parser.add_argument("--participants", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--per-block", type=int, default=10, help="bookings per block fed to the live event store")
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    requests = dict(synthetic_requests(args.requests, args.participants))
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    columns = RequestColumns()
+    for request_id, request in synthetic_requests(args.requests, args.participants):
+        columns.upsert(request_id, request)
+    column_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    store = LiveEventStore()
+    for event_args, block_number, key in booking_logs(synthetic_requests(args.requests, args.participants), args.per_block):
+        store.apply("ServiceBooked", event_args, block_number, key)
+    store_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    queries = {
+        "by job number": (
+            lambda: dict_page(requests, WAITING_FOR_APPROVAL),
+            lambda: columns.query(WAITING_FOR_APPROVAL, limit=PAGE_SIZE),
+        ),
+        "amount >= 20000, by amount": (
+            lambda: dict_page(requests, WAITING_FOR_APPROVAL, 20000, True, offset=PAGE_SIZE),
+            lambda: columns.query(WAITING_FOR_APPROVAL, min_amount=20000, sort_by="amount", offset=PAGE_SIZE, limit=PAGE_SIZE),
+        ),
+    }
+
+    print(f"{args.requests} requests, {args.participants} participants")
+    print(f"{'memory':<30}{'dict of tuples':>16}{'columnar':>12}{'live store':>12}")
+    print(f"{'MiB':<30}{dict_bytes / 2 ** 20:>16.1f}{column_bytes / 2 ** 20:>12.1f}{store_bytes / 2 ** 20:>12.1f}")
+    print(f"{'bytes per request':<30}{dict_bytes / args.requests:>16.0f}{column_bytes / args.requests:>12.0f}{store_bytes / args.requests:>12.0f}")
+    print(f"{'page of ' + str(PAGE_SIZE) + ' (ms)':<30}{'dict of tuples':>16}{'columnar':>12}")
+    for name, (dict_query, column_query) in queries.items():
+        assert dict_query()[0] == column_query()[0]
+        print(f"{name:<30}{timed(dict_query, args.repeat) * 1000:>16.1f}{timed(column_query, args.repeat) * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
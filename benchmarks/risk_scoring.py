@@ -0,0 +1,93 @@
+"""Measure risk scoring throughput, memory and detection on a synthetic event stream.
+
+Streams ``--requests`` booking lifecycles (ServiceBooked, ServiceOffered,
+WithdrawalRequestInitiated) through the scorer in ``functions/risk.py``,
+with a share of them turned into over-booked claims, duplicate bills
+and claims from a few providers claiming far faster than the rest:
+
+    python -m benchmarks.risk_scoring --requests 1000000
+
+The stream is generated lazily, so the only state kept is the scorer's,
+whose table sizes are reported at the end.
+"""
+# Import libraries
+import time
+import random
+import argparse
+from collections import Counter
+
+# Import functions
+from functions.risk import RiskScorer, OVER_BOOKED, REPEATED_CLAIM, HIGH_VELOCITY
+
+
+def synthetic_stream(request_count, participants, providers, anomaly_rate, seed=0):
+    """Yield ``(event, args, block_number, injected)`` tuples; ``injected`` names the planted anomaly."""
+    rng = random.Random(seed)
+    participant_ids = [f"0x{index:040x}" for index in range(participants)]
+    provider_ids = [f"0x{index + participants:040x}" for index in range(providers)]
+    rogue_providers = provider_ids[:max(1, providers // 1000)]
+    block_number = 0
+
+    for index in range(request_count):
+        block_number += rng.randrange(2)
+        request_id = index.to_bytes(32, "big")
+        participant = rng.choice(participant_ids)
+        amount = rng.choice((1000, 2000, 2500, 3000, 4000, 10000, 15000, 20000, 30000))
+        roll = rng.random()
+        injected = None
+        if roll < anomaly_rate:
+            injected = OVER_BOOKED
+        elif roll < 2 * anomaly_rate:
+            injected = HIGH_VELOCITY
+        provider = rng.choice(rogue_providers if injected == HIGH_VELOCITY else provider_ids)
+
+        yield "ServiceBooked", {"requestId": request_id, "participant": participant, "amount": amount}, block_number, None
+        yield "ServiceOffered", {"requestId": request_id, "serviceProvider": provider}, block_number, None
+        claimed = amount * 2 if injected == OVER_BOOKED else amount
+        yield "WithdrawalRequestInitiated", {"requestId": request_id, "recipient": provider, "amount": claimed}, block_number, injected
+
+        if roll > 1 - anomaly_rate:
+            # The same provider bills the participant again for the same service
+            duplicate_id = (request_count + index).to_bytes(32, "big")
+            yield "ServiceBooked", {"requestId": duplicate_id, "participant": participant, "amount": amount}, block_number, None
+            yield "ServiceOffered", {"requestId": duplicate_id, "serviceProvider": provider}, block_number, None
+            yield "WithdrawalRequestInitiated", {"requestId": duplicate_id, "recipient": provider, "amount": amount}, block_number, REPEATED_CLAIM
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000000)
+    parser.add_argument("--participants", type=int, default=100000)
+    parser.add_argument("--providers", type=int, default=5000)
+    parser.add_argument("--anomaly-rate", type=float, default=0.01, help="share of requests given each kind of anomaly")
+    parser.add_argument("--max-requests", type=int, default=100000, help="requests the scorer keeps state for")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    scorer = RiskScorer(max_requests=args.max_requests)
+    planted, caught, flagged_clean = Counter(), Counter(), Counter()
+    events = 0
+
+    start = time.perf_counter()
+    for event, event_args, block_number, injected in synthetic_stream(args.requests, args.participants, args.providers, args.anomaly_rate, args.seed):
+        assessment = scorer.observe(event, event_args, block_number)
+        events += 1
+        if assessment is None:
+            continue
+        if injected:
+            planted[injected] += 1
+            caught[injected] += injected in assessment.flags
+        for flag in assessment.flags:
+            if flag != injected:
+                flagged_clean[flag] += 1
+    seconds = time.perf_counter() - start
+
+    print(f"{events} events in {seconds:.1f} s: {events / seconds:,.0f} events/s")
+    print(f"state kept: {len(scorer._requests)} requests, {len(scorer._claimants)} claimants, {len(scorer._participants)} participants")
+    print(f"{'anomaly':<28}{'planted':>10}{'flagged':>10}{'other flags raised':>20}")
+    for flag in (OVER_BOOKED, REPEATED_CLAIM, HIGH_VELOCITY):
+        print(f"{flag:<28}{planted[flag]:>10}{caught[flag]:>10}{flagged_clean[flag]:>20}")
+
+
+if __name__ == "__main__":
+    main()
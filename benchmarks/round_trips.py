@@ -0,0 +1,69 @@
+"""Count the node round trips made by the NDIA page reads, one call at a time vs batched.
+
+Run against a local dev chain with the contract deployed:
+
+    WEB3_PROVIDER_URI=http://127.0.0.1:8545 SMART_CONTRACT_ADDRESS=0x... python -m benchmarks.round_trips
+"""
+# Import libraries
+import time
+
+# Import functions
+from functions.contract import w3, connect_to_contract
+from functions.batch import BatchCall
+
+WAITING_FOR_APPROVAL = 2
+PAGE_SIZE = 50
+
+
+def ndia_page_reads(contract, account):
+    # The view calls made by one render of the NDIA page
+    return [
+        contract.functions.ndia(),
+        contract.functions.participantFunds(),
+        contract.functions.ndia(),
+        contract.functions.ndisParticipant(account),
+        contract.functions.ndisServiceProvider(account),
+        contract.functions.getBookingRequestCount(WAITING_FOR_APPROVAL),
+        contract.functions.getBookingRequestsByStatus(WAITING_FOR_APPROVAL, 0, PAGE_SIZE),
+    ]
+
+
+def count_requests_middleware(counter):
+    def middleware(make_request, web3):
+        def middleware_fn(method, params):
+            counter.append(method)
+            return make_request(method, params)
+        return middleware_fn
+    return middleware
+
+
+def main(repeat=20):
+    contract = connect_to_contract()
+    account = w3.eth.accounts[0]
+
+    sent = []
+    w3.middleware_onion.add(count_requests_middleware(sent), name="count_requests")
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for contract_function in ndia_page_reads(contract, account):
+            contract_function.call()
+    sequential_time = (time.perf_counter() - start) / repeat
+    sequential_trips = len(sent) / repeat
+    w3.middleware_onion.remove("count_requests")
+
+    batch = BatchCall(w3)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for contract_function in ndia_page_reads(contract, account):
+            batch.add(contract_function)
+        batch.execute()
+    batched_time = (time.perf_counter() - start) / repeat
+    batched_trips = batch.round_trips / repeat
+
+    print(f"{'mode':<12}{'round trips/page':>18}{'ms/page':>10}")
+    print(f"{'sequential':<12}{sequential_trips:>18.1f}{sequential_time * 1000:>10.2f}")
+    print(f"{'batched':<12}{batched_trips:>18.1f}{batched_time * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Compare the gas and transactions it takes to pay N withdrawal requests per-request, in batches and by Merkle settlement.
+
+For each size, three fresh contracts are seeded with N requests waiting for
+approval, their withdrawals initiated by ``--providers`` providers. Then:
+
+- approveWithdrawal: the NDIA approves each request in its own transaction
+- approveWithdrawals: the NDIA approves them ``--batch-size`` at a time
+- settlement: the NDIA commits one Merkle root and each provider claims
+  its requests with a proof
+
+    python -m benchmarks.settlement_gas --sizes 10 100 1000
+
+Settlement moves the per-request cost from the NDIA to the claimants, so
+the NDIA's gas and transactions are reported apart from the totals.
+"""
+# Import libraries
+import argparse
+
+# Import functions
+from benchmarks.chain import local_web3, deploy_contract
+from benchmarks.gas_suite import measure_transaction
+from benchmarks.lifecycle_gas import BOOKING_ARGUMENTS, booking_arguments
+from functions.merkle import SettlementTree
+
+MODES = ("approveWithdrawal", "approveWithdrawals", "settlement")
+
+
+def seed_withdrawals(contract, ndia, participant, providers, size):
+    """Take ``size`` requests to waiting for approval, each initiated by the next provider; returns ``(request_id, provider, amount)``."""
+    measure_transaction(contract.functions.deposit(), ndia, value=size * BOOKING_ARGUMENTS["amount"])
+    measure_transaction(contract.functions.registerAccount(participant, True), ndia)
+    for provider in providers:
+        measure_transaction(contract.functions.registerAccount(provider, False), ndia)
+
+    withdrawals = []
+    for index in range(size):
+        provider = providers[index % len(providers)]
+        receipt, _ = measure_transaction(contract.functions.bookService(*booking_arguments(contract)), participant)
+        request_id = contract.events.ServiceBooked().processReceipt(receipt)[0]["args"]["requestId"]
+        measure_transaction(contract.functions.offerService(participant, request_id, BOOKING_ARGUMENTS["serviceDescription"]), provider)
+        measure_transaction(contract.functions.initiateWithdrawalRequest(request_id, BOOKING_ARGUMENTS["amount"]), provider)
+        withdrawals.append((request_id, provider, BOOKING_ARGUMENTS["amount"]))
+    return withdrawals
+
+
+def pay(contract, ndia, withdrawals, mode, batch_size):
+    """Pay every withdrawal in ``mode``; returns the NDIA's and every sender's transactions and gas."""
+    ndia_gas, other_gas, ndia_transactions, other_transactions = [], [], 0, 0
+    if mode == "approveWithdrawal":
+        for request_id, _, _ in withdrawals:
+            ndia_gas.append(measure_transaction(contract.functions.approveWithdrawal(request_id), ndia)[1]["gas"])
+    elif mode == "approveWithdrawals":
+        for start in range(0, len(withdrawals), batch_size):
+            batch = [request_id for request_id, _, _ in withdrawals[start:start + batch_size]]
+            ndia_gas.append(measure_transaction(contract.functions.approveWithdrawals(batch), ndia)[1]["gas"])
+    else:
+        tree = SettlementTree(withdrawals)
+        ndia_gas.append(measure_transaction(contract.functions.commitSettlement(tree.root, [request_id for request_id, _, _ in tree.claims]), ndia)[1]["gas"])
+        for request_id, provider, _ in withdrawals:
+            other_gas.append(measure_transaction(contract.functions.claim(tree.root, request_id, tree.proof(request_id)), provider)[1]["gas"])
+
+    paid = sum(1 for request_id, _, _ in withdrawals if contract.functions.requests(request_id).call()[3] == 3)
+    assert paid == len(withdrawals), f"{mode} paid {paid} of {len(withdrawals)} withdrawals"
+    return {
+        "ndia_transactions": len(ndia_gas),
+        "ndia_gas": sum(ndia_gas),
+        "transactions": len(ndia_gas) + len(other_gas),
+        "gas": sum(ndia_gas) + sum(other_gas),
+        "max_gas": max(ndia_gas + other_gas),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--providers", type=int, default=5, help="providers initiating the withdrawals")
+    parser.add_argument("--batch-size", type=int, default=200, help="requests per approveWithdrawals transaction")
+    args = parser.parse_args()
+
+    print(f"{'N':>6}  {'mode':<20}{'NDIA txs':>10}{'NDIA gas':>12}{'all txs':>10}{'all gas':>12}{'gas/request':>13}{'max tx gas':>12}")
+    for size in args.sizes:
+        for mode in MODES:
+            web3 = local_web3()
+            ndia, participant, *providers = web3.eth.accounts[:2 + args.providers]
+            contract = deploy_contract(web3, ndia)
+            withdrawals = seed_withdrawals(contract, ndia, participant, providers, size)
+            result = pay(contract, ndia, withdrawals, mode, args.batch_size)
+            print(f"{size:>6}  {mode:<20}{result['ndia_transactions']:>10}{result['ndia_gas']:>12}{result['transactions']:>10}"
+                  f"{result['gas']:>12}{result['gas'] / size:>13.0f}{result['max_gas']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Measure sustained transaction throughput: one transact() and wait at a time vs the pipelined submitter.
+
+Sends ``--count`` NDIA deposits and ``--count`` payouts (plain transfers
+to random accounts) each way, on eth-tester or the dev chain in
+BENCHMARK_PROVIDER_URI:
+
+    BENCHMARK_PROVIDER_URI=http://127.0.0.1:8545 python -m benchmarks.submitter_throughput --count 500
+
+``--payouts-only`` sends just the payouts, which need no compiled contract.
+"""
+# Import libraries
+import time
+import argparse
+
+# Import functions
+from benchmarks.chain import local_web3, deploy_contract, random_addresses
+from functions.submitter import TransactionSubmitter
+
+
+def sequential(web3, contract, ndia, payees):
+    for payee in payees:
+        if contract is not None:
+            tx_hash = contract.functions.deposit().transact({"from": ndia, "value": 1})
+            web3.eth.wait_for_transaction_receipt(tx_hash)
+        tx_hash = web3.eth.send_transaction({"from": ndia, "to": payee, "value": 1})
+        web3.eth.wait_for_transaction_receipt(tx_hash)
+
+
+def pipelined(web3, contract, ndia, payees):
+    submitter = TransactionSubmitter(web3)
+    tx_hashes = submitter.submit_many((contract.functions.deposit(), {"from": ndia, "value": 1}) for _ in payees) if contract is not None else []
+    tx_hashes += [submitter.send({"from": ndia, "to": payee, "value": 1}, cache_gas=True) for payee in payees]
+    receipts = submitter.wait_for_receipts(tx_hashes, poll_interval=0.05)
+    return sum(1 for receipt in receipts.values() if receipt is None or receipt["status"] == 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=200, help="deposits and payouts sent per mode")
+    parser.add_argument("--payouts-only", action="store_true", help="send only the payouts, without deploying the contract")
+    args = parser.parse_args()
+
+    web3 = local_web3()
+    ndia = web3.eth.accounts[0]
+    contract = None if args.payouts_only else deploy_contract(web3, ndia)
+    payees = random_addresses(args.count)
+    sent = args.count if args.payouts_only else 2 * args.count
+
+    start = time.perf_counter()
+    sequential(web3, contract, ndia, payees)
+    sequential_rate = sent / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    failed = pipelined(web3, contract, ndia, payees)
+    pipelined_rate = sent / (time.perf_counter() - start)
+
+    print(f"{'mode':<12}{'tx/s':>10}")
+    print(f"{'sequential':<12}{sequential_rate:>10.1f}")
+    print(f"{'pipelined':<12}{pipelined_rate:>10.1f}")
+    if failed:
+        print(f"{failed} pipelined transactions failed or were replaced")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,6 @@
 // SPDX-License-Identifier: MIT
 pragma solidity ^0.8.7;
 
-import "@openzeppelin/contracts/utils/math/SafeMath.sol";
-
 /**
  * @title NDISSmartContract
  * @dev A smart contract to manage funds and withdrawals for NDIS (National Disability Insurance Scheme).
@@ -13,26 +11,47 @@ contract NDISSmartContract {
 
     enum RequestStatus { Pending, ServiceOffered, WaitingForAppraval, Approved }
 
-    // Struct to represent a request
+    // Struct to represent a request, packed into two storage slots.
+    // Free-text details (service description, participant unique id) are only emitted in ServiceBooked.
     struct Request {
-        string jobNumber;
-        address payable requester;
-        uint amount; 
-        string participantUnidNumber; 
-        string serviceDescription; 
-        RequestStatus status;
+        address payable requester;  // slot 0
+        uint64 amount;              // slot 0, the booked amount until a withdrawal is requested, then the claimed amount
+        uint32 jobNumber;           // slot 0
+        RequestStatus status;       // slot 1
+        uint8 serviceCategory;      // slot 1
+        uint32 statusIndex;         // slot 1, position of the request within its status set
+        address payable claimant;   // slot 1, the account that requested the withdrawal and is paid on approval
+        uint32 settlementPeriod;    // slot 1, the settlement the withdrawal was last committed in (0 if none)
     }
 
     // Mapping to store requests
     mapping(bytes32 => Request) public requests;
     bytes32[] public requestIds;
 
+    // Request ids partitioned by status
+    mapping(RequestStatus => bytes32[]) private requestIdsByStatus;
+
+    // Secondary indexes for lookups by job number and by participant
+    uint32 public nextJobNumber = 100;
+    mapping(uint32 => bytes32) private requestIdByJobNumber;
+    mapping(address => bytes32[]) private participantRequestIds;
+
     address public ndia; // NDIS Agency's address
     uint public participantFunds;
     // Mapping to store participant and service provider addresses
     mapping(address => bool) public ndisParticipant;
     mapping(address => bool) public ndisServiceProvider;
 
+    // Settlement period of each committed Merkle root of approved withdrawals (0 if never committed).
+    // Closed roots keep their period, so they cannot be committed again.
+    mapping(bytes32 => uint32) public settlementPeriods;
+    mapping(uint32 => bool) public settlementClosed;
+    uint32 public settlementCount;
+
+    // Amounts committed in settlements and not claimed yet, in all and per root; approvals cannot spend them
+    uint public committedUnclaimed;
+    mapping(bytes32 => uint) public settlementUnclaimed;
+
     // Constructor to set the NDIS Agency's address
     constructor() {
         ndia = msg.sender;
@@ -63,16 +82,28 @@ contract NDISSmartContract {
     // Event to log account registration details
     event AccountRegistered(address indexed account, bool isParticipantAccount);
 
+    // Event to log accounts skipped by a bulk registration because they are already registered
+    event AccountRegistrationSkipped(address indexed account);
+
     // Event to log service booking details
-    event ServiceBooked(string jobNumber, address indexed participant, bytes32 requestId, string serviceDescription, uint amount, RequestStatus status);
+    event ServiceBooked(uint32 jobNumber, address indexed participant, bytes32 requestId, uint8 serviceCategory, string serviceDescription, string participantUnidNumber, uint amount, RequestStatus status);
 
     // Event to log service approval details
     event ServiceOffered(address indexed serviceProvider, address indexed participant, bytes32 requestId, string serviceDescription, RequestStatus status);
 
     // Event to log withdrawal details
-    event Withdrawal(address indexed recipient, bytes32 requestId, uint amount, string participantUnidNumber, string serviceDescription, RequestStatus status);
+    event Withdrawal(address indexed recipient, bytes32 requestId, uint amount, uint32 jobNumber, uint8 serviceCategory, RequestStatus status);
     event WithdrawalRequestInitiated(address indexed recipient, bytes32 requestId, uint amount, RequestStatus status);
 
+    // Event to log requests skipped by a batch approval, with the status that made them ineligible
+    event WithdrawalApprovalSkipped(bytes32 requestId, RequestStatus status);
+
+    // Event to log a committed settlement with the number and total amount of the withdrawals it approves
+    event SettlementCommitted(uint32 period, bytes32 root, uint claimCount, uint total);
+
+    // Event to log a closed settlement with the amount its unclaimed withdrawals no longer hold back
+    event SettlementClosed(uint32 period, bytes32 root, uint released);
+
     /**
     * NDIS Functions 
     */
@@ -86,14 +117,22 @@ contract NDISSmartContract {
     function registerAccount(address payable account, bool isParticipantAccount) external onlyNDIA {
         require(!ndisParticipant[account] && !ndisServiceProvider[account], "Account already registered.");
 
-        if (isParticipantAccount) {
-            ndisParticipant[account] = true;
-        } else {
-            ndisServiceProvider[account] = true;
-        }
+        storeAccount(account, isParticipantAccount);
+    }
 
-        // Emit event to log account registration details
-        emit AccountRegistered(account, isParticipantAccount);
+    // Function to register many accounts at once, skipping any that are already registered
+    function registerAccounts(address[] calldata accounts, bool[] calldata isParticipantAccounts) external onlyNDIA {
+        require(accounts.length == isParticipantAccounts.length, "Accounts and account types must have the same length.");
+
+        for (uint i = 0; i < accounts.length; i++) {
+            address account = accounts[i];
+            if (ndisParticipant[account] || ndisServiceProvider[account]) {
+                emit AccountRegistrationSkipped(account);
+                continue;
+            }
+
+            storeAccount(account, isParticipantAccounts[i]);
+        }
     }
 
     // Function to approve a withdrawal request
@@ -101,41 +140,106 @@ contract NDISSmartContract {
         // Check if the request exists
         require(requests[requestId].status != RequestStatus.Approved, "Request already approved");
         require(requests[requestId].status == RequestStatus.WaitingForAppraval, "Request is waiting for approval");
+        require(!inOpenSettlement(requests[requestId]), "Request is in a committed settlement.");
+        require(requests[requestId].amount <= availableBalance(), "Insufficient funds!");
 
-        // Mark the service as approved
-        requests[requestId].status = RequestStatus.Approved;
+        payWithdrawal(requestId);
 
-        // Transfer the approved amount to the recipient
-        requests[requestId].requester.transfer(requests[requestId].amount);
+        updateParticipantFunds();
+    }
+
+    // Function to approve many withdrawal requests at once, skipping ineligible ones
+    function approveWithdrawals(bytes32[] calldata withdrawalRequestIds) external onlyNDIA {
+        for (uint i = 0; i < withdrawalRequestIds.length; i++) {
+            bytes32 requestId = withdrawalRequestIds[i];
+            Request storage request = requests[requestId];
+
+            if (request.status != RequestStatus.WaitingForAppraval || inOpenSettlement(request) || request.amount > availableBalance()) {
+                emit WithdrawalApprovalSkipped(requestId, request.status);
+                continue;
+            }
 
-        emit Withdrawal(requests[requestId].requester, requestId, requests[requestId].amount, requests[requestId].participantUnidNumber, requests[requestId].serviceDescription, requests[requestId].status);
+            payWithdrawal(requestId);
+        }
 
+        // Funds accounting is updated once for the whole batch
         updateParticipantFunds();
     }
 
+    // Function to approve a settlement period's withdrawals at once by committing the Merkle root of their claims.
+    // The requests are marked as settled and their total is summed here, so it always matches what they can claim.
+    function commitSettlement(bytes32 root, bytes32[] calldata settledRequestIds) external onlyNDIA {
+        require(root != bytes32(0) && settlementPeriods[root] == 0, "Settlement already committed.");
+
+        uint32 period = settlementCount + 1;
+        uint total = 0;
+        for (uint i = 0; i < settledRequestIds.length; i++) {
+            Request storage request = requests[settledRequestIds[i]];
+            require(request.status == RequestStatus.WaitingForAppraval, "Request is not waiting for approval");
+            require(!inOpenSettlement(request), "Request is in a committed settlement.");
+
+            // The period shares the slot of the request's status, so marking it is a single storage write
+            request.settlementPeriod = period;
+            total += request.amount;
+        }
+        // Funds promised to earlier settlements are held back until they are claimed
+        require(committedUnclaimed + total <= address(this).balance, "Insufficient funds!");
+
+        settlementCount = period;
+        settlementPeriods[root] = period;
+        settlementUnclaimed[root] = total;
+        committedUnclaimed += total;
+
+        emit SettlementCommitted(period, root, settledRequestIds.length, total);
+    }
+
+    // Function to close a settlement, so its unclaimed withdrawals can no longer be claimed and stop holding funds back
+    function closeSettlement(bytes32 root) external onlyNDIA {
+        uint32 period = settlementPeriods[root];
+        require(period != 0, "Unknown settlement.");
+        require(!settlementClosed[period], "Settlement already closed.");
+
+        uint released = settlementUnclaimed[root];
+        committedUnclaimed -= released;
+        delete settlementUnclaimed[root];
+        // Its unclaimed requests can be approved or settled again
+        settlementClosed[period] = true;
+
+        emit SettlementClosed(period, root, released);
+    }
+
     /**
     * Participant Functions 
     */
 
     // Function for participants to book services
-    function bookService(string memory jobNumber, string memory serviceDescription, uint amount, string memory participantUnidNumber) external onlyNdisParticipant {
+    function bookService(uint8 serviceCategory, string calldata serviceDescription, uint amount, string calldata participantUnidNumber) external onlyNdisParticipant {
+        require(amount <= type(uint64).max, "Amount too large.");
         address payable requester = payable(msg.sender);
-        bytes32 requestId = keccak256(abi.encodePacked(requester, serviceDescription, amount, participantUnidNumber, block.timestamp));
+        // Job numbers are assigned on-chain so they stay unique across every client
+        uint32 jobNumber = nextJobNumber;
+        nextJobNumber++;
+        bytes32 requestId = keccak256(abi.encodePacked(requester, jobNumber));
 
         // Create a service request and add it to the mapping
         requests[requestId] = Request({
-            jobNumber: jobNumber,
             requester: requester,
-            amount: amount,
-            participantUnidNumber: participantUnidNumber,
-            serviceDescription: serviceDescription,
-            status: RequestStatus.Pending
+            amount: uint64(amount),
+            jobNumber: jobNumber,
+            status: RequestStatus.Pending,
+            serviceCategory: serviceCategory,
+            statusIndex: uint32(requestIdsByStatus[RequestStatus.Pending].length),
+            claimant: payable(address(0)),
+            settlementPeriod: 0
         });
 
         requestIds.push(requestId);
+        requestIdsByStatus[RequestStatus.Pending].push(requestId);
+        requestIdByJobNumber[jobNumber] = requestId;
+        participantRequestIds[requester].push(requestId);
 
         // Emit event to log service booking details
-        emit ServiceBooked(jobNumber, msg.sender, requestId, serviceDescription, amount, RequestStatus.Pending);
+        emit ServiceBooked(jobNumber, msg.sender, requestId, serviceCategory, serviceDescription, participantUnidNumber, amount, RequestStatus.Pending);
     }
 
     /**
@@ -147,7 +251,7 @@ contract NDISSmartContract {
         require(requests[requestId].status == RequestStatus.Pending, "Request not pending");
 
         // Mark the service as offered
-        requests[requestId].status = RequestStatus.ServiceOffered;
+        setRequestStatus(requestId, RequestStatus.ServiceOffered);
 
         // Emit event to log service approval details
         emit ServiceOffered(msg.sender, participant, requestId, serviceDescription, RequestStatus.ServiceOffered);
@@ -158,14 +262,42 @@ contract NDISSmartContract {
         address payable recipient = payable(msg.sender);
         require(requests[requestId].status == RequestStatus.ServiceOffered, "Service Rendered");
         require(participantFunds >= amount, "Insufficient funds!");
+        require(amount <= type(uint64).max, "Amount too large.");
+
+        // The claimant shares the slot the status change writes anyway
+        Request storage request = requests[requestId];
+        request.claimant = recipient;
+        request.amount = uint64(amount);
 
         // Mark the service as waiting for approval
-        requests[requestId].status = RequestStatus.WaitingForAppraval;
+        setRequestStatus(requestId, RequestStatus.WaitingForAppraval);
 
         // Emit event to log service approval details
         emit WithdrawalRequestInitiated(recipient, requestId, amount, RequestStatus.WaitingForAppraval);
     }
 
+    // Function to pay a settled withdrawal to its claimant with a Merkle proof of its claim
+    function claim(bytes32 root, bytes32 requestId, bytes32[] calldata proof) external {
+        uint32 period = settlementPeriods[root];
+        require(period != 0, "Unknown settlement.");
+        require(!settlementClosed[period], "Settlement closed.");
+        Request storage request = requests[requestId];
+        require(request.status == RequestStatus.WaitingForAppraval, "Request is not waiting for approval");
+        require(request.settlementPeriod == period, "Request is not in this settlement.");
+
+        // A claim is the request id, its claimant and the claimed amount, as the NDIA reviewed them
+        bytes32 leaf = keccak256(abi.encodePacked(requestId, request.claimant, uint(request.amount)));
+        require(verifySettlementProof(proof, root, leaf), "Invalid settlement proof.");
+
+        require(settlementUnclaimed[root] >= request.amount, "Settlement has too little left for this claim.");
+        settlementUnclaimed[root] -= request.amount;
+        committedUnclaimed -= request.amount;
+
+        payWithdrawal(requestId);
+
+        updateParticipantFunds();
+    }
+
     /**
     * Retrieve info and default functions 
     */
@@ -179,6 +311,32 @@ contract NDISSmartContract {
         return result;
     }
 
+    // Function to count the booking requests currently in a given status
+    function getBookingRequestCount(RequestStatus status) external view returns (uint) {
+        return requestIdsByStatus[status].length;
+    }
+
+    // Function to retrieve one page of the booking requests in a given status
+    function getBookingRequestsByStatus(RequestStatus status, uint offset, uint limit) external view returns (bytes32[] memory ids, Request[] memory page) {
+        return requestsPage(requestIdsByStatus[status], offset, limit);
+    }
+
+    // Function to look up a booking request by its job number (returns a zero id if unknown)
+    function getBookingRequestByJobNumber(uint32 jobNumber) external view returns (bytes32 requestId, Request memory request) {
+        requestId = requestIdByJobNumber[jobNumber];
+        request = requests[requestId];
+    }
+
+    // Function to count the booking requests made by a participant
+    function getParticipantRequestCount(address participant) external view returns (uint) {
+        return participantRequestIds[participant].length;
+    }
+
+    // Function to retrieve one page of the booking requests made by a participant
+    function getParticipantRequests(address participant, uint offset, uint limit) external view returns (bytes32[] memory ids, Request[] memory page) {
+        return requestsPage(participantRequestIds[participant], offset, limit);
+    }
+
     // Receive function to handle incoming Ether
     receive() external payable {
         updateParticipantFunds();
@@ -189,8 +347,85 @@ contract NDISSmartContract {
         // Handle unexpected incoming Ether if necessary
     }
 
+    // Internal function to approve a request and transfer the claimed amount to its claimant
+    function payWithdrawal(bytes32 requestId) internal {
+        Request storage request = requests[requestId];
+
+        // Mark the service as approved
+        setRequestStatus(requestId, RequestStatus.Approved);
+
+        // Transfer the approved amount to the account that requested the withdrawal
+        request.claimant.transfer(request.amount);
+
+        emit Withdrawal(request.claimant, requestId, request.amount, request.jobNumber, request.serviceCategory, request.status);
+    }
+
+    // Internal function to check whether a request is held by a settlement that is still open
+    function inOpenSettlement(Request storage request) internal view returns (bool) {
+        return request.settlementPeriod != 0 && !settlementClosed[request.settlementPeriod];
+    }
+
+    // Internal function to return the balance not held back for committed settlements
+    function availableBalance() internal view returns (uint) {
+        return address(this).balance - committedUnclaimed;
+    }
+
+    // Internal function to record a participant or service provider account
+    function storeAccount(address account, bool isParticipantAccount) internal {
+        if (isParticipantAccount) {
+            ndisParticipant[account] = true;
+        } else {
+            ndisServiceProvider[account] = true;
+        }
+
+        // Emit event to log account registration details
+        emit AccountRegistered(account, isParticipantAccount);
+    }
+
+    // Internal function to copy one page of an id list and its requests into memory
+    function requestsPage(bytes32[] storage pageRequestIds, uint offset, uint limit) internal view returns (bytes32[] memory ids, Request[] memory page) {
+        uint size = offset < pageRequestIds.length ? pageRequestIds.length - offset : 0;
+        if (size > limit) {
+            size = limit;
+        }
+
+        ids = new bytes32[](size);
+        page = new Request[](size);
+        for (uint i = 0; i < size; i++) {
+            ids[i] = pageRequestIds[offset + i];
+            page[i] = requests[ids[i]];
+        }
+    }
+
+    // Internal function to move a request into another status set (swap-and-pop from the old one)
+    function setRequestStatus(bytes32 requestId, RequestStatus status) internal {
+        Request storage request = requests[requestId];
+        bytes32[] storage previous = requestIdsByStatus[request.status];
+        uint32 index = request.statusIndex;
+        bytes32 lastRequestId = previous[previous.length - 1];
+        previous[index] = lastRequestId;
+        requests[lastRequestId].statusIndex = index;
+        previous.pop();
+
+        // Status and status index share a slot, so this is a single storage write
+        request.status = status;
+        request.statusIndex = uint32(requestIdsByStatus[status].length);
+        requestIdsByStatus[status].push(requestId);
+    }
+
+    // Internal function to check a Merkle proof; pairs are hashed in sorted order, so proofs need no left/right flags
+    function verifySettlementProof(bytes32[] calldata proof, bytes32 root, bytes32 leaf) internal pure returns (bool) {
+        bytes32 node = leaf;
+        for (uint i = 0; i < proof.length; i++) {
+            bytes32 sibling = proof[i];
+            node = node < sibling ? keccak256(abi.encodePacked(node, sibling)) : keccak256(abi.encodePacked(sibling, node));
+        }
+        return node == root;
+    }
+
     // Internal function to update participantFunds
     function updateParticipantFunds() internal {
-        participantFunds = SafeMath.add(address(this).balance, participantFunds);
+        // Solidity 0.8 arithmetic reverts on overflow, as SafeMath.add did
+        participantFunds = address(this).balance + participantFunds;
     }
 }
@@ -0,0 +1,120 @@
+# Import libraries
+import csv
+import io
+
+from web3 import Web3
+from web3.logs import DISCARD
+
+# Fraction of the block gas limit one bulk registration transaction may use
+BLOCK_GAS_FRACTION = 0.8
+
+# Number of accounts tried in the first registerAccounts transaction
+INITIAL_CHUNK_SIZE = 500
+
+# Accepted spellings of the account type column
+PARTICIPANT_VALUES = {"true", "1", "yes", "participant"}
+SERVICE_PROVIDER_VALUES = {"false", "0", "no", "provider", "serviceprovider", "service provider"}
+
+
+def parse_accounts_csv(text):
+    """Parse ``address,is_participant`` rows into checksummed accounts and flags.
+
+    A header row is skipped, and so is every repeat of an address after its
+    first row. Returns ``(accounts, is_participant_accounts, invalid_rows)``
+    where ``invalid_rows`` holds ``(line_number, reason)``.
+    """
+    accounts, is_participant_accounts, invalid_rows = [], [], []
+    # Checksummed address -> line it was first read from
+    first_lines = {}
+
+    for line_number, row in enumerate(csv.reader(io.StringIO(text)), start=1):
+        if not row or not row[0].strip():
+            continue
+        address = row[0].strip()
+        account_type = row[1].strip().lower() if len(row) > 1 else ""
+
+        if line_number == 1 and address.lower() == "address":
+            continue
+        if not Web3.isAddress(address):
+            invalid_rows.append((line_number, f"Invalid address: {address}"))
+            continue
+        if account_type in PARTICIPANT_VALUES:
+            is_participant = True
+        elif account_type in SERVICE_PROVIDER_VALUES:
+            is_participant = False
+        else:
+            invalid_rows.append((line_number, f"Unknown account type: {row[1] if len(row) > 1 else ''}"))
+            continue
+
+        address = Web3.toChecksumAddress(address)
+        if address in first_lines:
+            invalid_rows.append((line_number, f"Duplicate address: {address} (first on line {first_lines[address]})"))
+            continue
+        first_lines[address] = line_number
+
+        accounts.append(address)
+        is_participant_accounts.append(is_participant)
+
+    return accounts, is_participant_accounts, invalid_rows
+
+
+def register_accounts_in_chunks(contract, accounts, is_participant_accounts, sender, submitter, on_sent=None, chunk_size=INITIAL_CHUNK_SIZE):
+    """Register accounts through ``registerAccounts`` in gas-limit-sized chunks.
+
+    The first chunk is sized from the estimate for a single account, and
+    each chunk is estimated before it is sent and shrunk until it fits in
+    ``BLOCK_GAS_FRACTION`` of the block gas limit; it is sent with the
+    submitter's gas margin on top of its estimate. Chunks are sent back to
+    back through ``submitter``, which fills in nonces and fees, and each
+    hash is handed to ``on_sent(tx_hash, chunk)``, e.g. to track it. Then
+    yields one ``(address, result)`` pair per account as the receipts come
+    in, where result is "Registered", "Already registered" or "Failed".
+    """
+    web3 = contract.web3
+    block_gas_limit = web3.eth.get_block("latest")["gasLimit"]
+    gas_budget = int(block_gas_limit * BLOCK_GAS_FRACTION)
+
+    # A chunk over the block gas limit makes the node fail the estimate rather than return it
+    if accounts:
+        account_gas = contract.functions.registerAccounts(accounts[:1], is_participant_accounts[:1]).estimateGas({"from": sender})
+        chunk_size = max(1, min(chunk_size, gas_budget // account_gas))
+
+    sent = []
+    start = 0
+    while start < len(accounts):
+        chunk = accounts[start:start + chunk_size]
+        chunk_flags = is_participant_accounts[start:start + chunk_size]
+        function = contract.functions.registerAccounts(chunk, chunk_flags)
+
+        try:
+            gas = function.estimateGas({"from": sender})
+        except ValueError:
+            # The node could not fit the chunk in a block; halve it unless it is a single account
+            if len(chunk) == 1:
+                raise
+            chunk_size = len(chunk) // 2
+            continue
+        if gas > gas_budget and len(chunk) > 1:
+            # Scale the chunk down to what fits in the budget and try again
+            chunk_size = max(1, len(chunk) * gas_budget // gas)
+            continue
+
+        gas = min(int(gas * submitter.gas_margin), block_gas_limit)
+        tx_hash = submitter.transact(function, {"from": sender, "gas": gas})
+        if on_sent is not None:
+            on_sent(tx_hash, chunk)
+        sent.append((tx_hash, chunk))
+        start += len(chunk)
+
+    for tx_hash, chunk in sent:
+        receipt = submitter.wait_for_receipts([tx_hash])[Web3.toHex(tx_hash)]
+        if receipt is None or receipt["status"] == 0:
+            for account in chunk:
+                yield account, "Failed"
+        else:
+            registered = {
+                entry["args"]["account"]
+                for entry in contract.events.AccountRegistered().processReceipt(receipt, errors=DISCARD)
+            }
+            for account in chunk:
+                yield account, "Registered" if account in registered else "Already registered"
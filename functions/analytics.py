@@ -0,0 +1,125 @@
+# Import libraries
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Import function from export
+from functions.export import EXPORT_PATH
+
+# Analytics already worked out, keyed by export file and modification time
+_analytics = {}
+
+
+def load_events(path=EXPORT_PATH):
+    """Read an event history written by ``export_events``."""
+    # Amounts are nullable uint64; as pandas' default float64 the largest ones would lose their last digits
+    return pq.read_table(path).to_pandas(types_mapper={pa.uint64(): pd.UInt64Dtype()}.get)
+
+
+def request_table(events):
+    """Return one row per booked request, indexed by request id, with its lifecycle joined in.
+
+    Request ids are replaced by integer codes once, and every step is then a
+    vectorized filter, de-duplication or join on those codes, so building
+    the table stays linear in the number of events. Events must be in
+    chain order, as ``export_events`` writes them.
+    """
+    codes, request_ids = pd.factorize(events["request_id"])
+    events = events.assign(request=codes)
+
+    def latest(event, columns):
+        # The last event of a kind per request, in chain order
+        rows = events[events["event"] == event].drop_duplicates("request", keep="last")
+        return rows.set_index("request")[list(columns)].rename(columns=columns)
+
+    requests = latest("ServiceBooked", {
+        "job_number": "job_number",
+        "participant": "participant",
+        "service_category": "service_category",
+        "amount": "booked_amount",
+        "block_number": "booked_block",
+        "timestamp": "booked_at",
+    })
+    requests = requests.join(latest("ServiceOffered", {"account": "provider", "timestamp": "offered_at"}))
+    requests = requests.join(latest("WithdrawalRequestInitiated", {"account": "claimed_by", "amount": "claimed_amount"}))
+    requests = requests.join(latest("Withdrawal", {"amount": "paid_amount", "block_number": "approved_block", "timestamp": "approved_at"}))
+
+    # The status of the latest event of each request is its current status
+    requests = requests.join(events.drop_duplicates("request", keep="last").set_index("request")["status"])
+    requests["paid_amount"] = requests["paid_amount"].fillna(0)
+    requests.index = pd.Index(request_ids[requests.index], name="request_id")
+
+    # Columns other events leave empty are read back as floats; steps not reached yet stay missing
+    return requests.astype({
+        "job_number": "int64",
+        "service_category": "int64",
+        "booked_amount": "uint64",
+        "paid_amount": "uint64",
+        "status": "int64",
+        "offered_at": "Int64",
+        "claimed_amount": "UInt64",
+        "approved_block": "Int64",
+        "approved_at": "Int64",
+    })
+
+
+def _summable(requests):
+    # A few uint64 wei amounts already overflow an integer sum, so totals are summed as floats
+    return requests.astype({"booked_amount": "float64", "paid_amount": "float64"})
+
+
+def spend_by_category(requests, categories):
+    """Booked and paid amounts per service category; ``categories`` lists category names by code."""
+    totals = _summable(requests).groupby("service_category", observed=True).agg(
+        requests=("job_number", "size"),
+        approved=("approved_block", "count"),
+        booked=("booked_amount", "sum"),
+        paid=("paid_amount", "sum"),
+    )
+    totals.index = [categories[code] if code < len(categories) else f"Service category {code}" for code in totals.index]
+    return totals.sort_values("paid", ascending=False)
+
+
+def participant_totals(requests):
+    """Requests, booked and paid amounts per participant, biggest spenders first."""
+    return _summable(requests).groupby("participant", observed=True).agg(
+        requests=("job_number", "size"),
+        booked=("booked_amount", "sum"),
+        paid=("paid_amount", "sum"),
+    ).sort_values("paid", ascending=False)
+
+
+def provider_totals(requests):
+    """Services offered and amounts paid per service provider, busiest first."""
+    return _summable(requests).dropna(subset=["provider"]).groupby("provider", observed=True).agg(
+        offered=("job_number", "size"),
+        approved=("approved_block", "count"),
+        paid=("paid_amount", "sum"),
+    ).sort_values("paid", ascending=False)
+
+
+def approval_times(requests):
+    """Blocks and seconds from booking to approval of every approved request."""
+    approved = requests.dropna(subset=["approved_block"])
+    return pd.DataFrame({
+        "blocks": (approved["approved_block"] - approved["booked_block"]).astype("int64"),
+        "seconds": (approved["approved_at"] - approved["booked_at"]).astype("int64"),
+    }, index=approved.index)
+
+
+def cached_analytics(categories, path=EXPORT_PATH):
+    """Return the request table and every panel total of an export, worked out again only when the file changes."""
+    key = (os.path.abspath(path), os.path.getmtime(path), tuple(categories))
+    if key not in _analytics:
+        requests = request_table(load_events(path))
+        _analytics.clear()
+        _analytics[key] = {
+            "requests": requests,
+            "spend_by_category": spend_by_category(requests, categories),
+            "participant_totals": participant_totals(requests),
+            "provider_totals": provider_totals(requests),
+            "approval_times": approval_times(requests),
+        }
+    return _analytics[key]
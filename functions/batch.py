@@ -0,0 +1,138 @@
+# Import libraries
+import json
+import time
+import itertools
+
+import requests
+from web3 import HTTPProvider
+from web3._utils.abi import get_abi_output_types, map_abi_data
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+
+# Import function from contract
+from functions.contract import w3
+from functions.connection import FailoverHTTPProvider
+from functions.instrumentation import record_rpc
+
+# Shared HTTP session so batches reuse one keep-alive connection
+_session = requests.Session()
+_request_ids = itertools.count()
+
+
+def encode_call(contract_function):
+    """Return the ``eth_call`` transaction parameters of a contract view call."""
+    return {
+        "to": contract_function.address,
+        "data": contract_function._encode_transaction_data(),
+    }
+
+
+def decode_result(web3, contract_function, raw):
+    """Decode raw ``eth_call`` output exactly as ``contract_function.call()`` would."""
+    output_types = get_abi_output_types(contract_function.abi)
+    decoded = web3.codec.decode_abi(output_types, bytes(raw))
+    normalized = map_abi_data(BASE_RETURN_NORMALIZERS, output_types, decoded)
+    return normalized[0] if len(normalized) == 1 else normalized
+
+
+class BatchCall:
+    """Collects contract view calls and sends them to the node in one round trip.
+
+    Calls are added with ``add`` and resolved together by ``execute``, which
+    returns the decoded results in the order they were added, exactly as
+    ``contract_function.call()`` would have returned them. Over HTTP the
+    calls go out as a single JSON-RPC batch; other providers (e.g.
+    eth-tester) fall back to one call per entry.
+    """
+
+    def __init__(self, web3=None, block_identifier="latest"):
+        self.w3 = web3 or w3
+        self.block_identifier = block_identifier
+        self.round_trips = 0
+        self._calls = []
+
+    def add(self, contract_function):
+        self._calls.append(contract_function)
+        return self
+
+    def execute(self):
+        calls, self._calls = self._calls, []
+        if not calls:
+            return []
+
+        if isinstance(self.w3.provider, HTTPProvider):
+            raw_results = self._send_batch(calls)
+        else:
+            raw_results = []
+            for contract_function in calls:
+                self.round_trips += 1
+                raw_results.append(self.w3.eth.call(encode_call(contract_function), self.block_identifier))
+
+        return [decode_result(self.w3, contract_function, raw) for contract_function, raw in zip(calls, raw_results)]
+
+    def _send_batch(self, calls):
+        block = self.block_identifier
+        if isinstance(block, int):
+            block = hex(block)
+
+        self.round_trips += 1
+        responses = batch_request(self.w3, [("eth_call", [encode_call(contract_function), block]) for contract_function in calls])
+
+        raw_results = []
+        for item in responses:
+            if "error" in item:
+                raise ValueError(item["error"])
+            raw_results.append(bytes.fromhex(item["result"][2:]))
+        return raw_results
+
+
+def batch_request(web3, requests):
+    """Send ``(method, params)`` pairs to an HTTP node as one JSON-RPC batch.
+
+    Returns the raw response objects (with ``result`` or ``error``) in the
+    order the requests were given. A node that rejects the batch itself
+    (e.g. batching disabled or too many requests) raises its error as a
+    ``ValueError``, like web3 does for a single failed request.
+    """
+    payload = [
+        {"jsonrpc": "2.0", "id": next(_request_ids), "method": method, "params": params}
+        for method, params in requests
+    ]
+    methods = {method for method, params in requests}
+    record_as = f"batch_{methods.pop()}" if len(methods) == 1 else "batch"
+
+    body = json.dumps(payload)
+    start = time.perf_counter()
+    try:
+        if isinstance(web3.provider, FailoverHTTPProvider):
+            # Reuse the shared client's pooled session and endpoint failover
+            response = web3.provider.post(body)
+        else:
+            response = _session.post(
+                web3.provider.endpoint_uri,
+                data=body,
+                **web3.provider.get_request_kwargs(),
+            )
+            response.raise_for_status()
+    except Exception as e:
+        record_rpc(record_as, time.perf_counter() - start, len(body), 0, f"{type(e).__name__}: {e}")
+        raise
+
+    replies = response.json()
+    if not isinstance(replies, list):
+        # Nodes that refuse the batch as a whole answer with a single error object instead of a list
+        error = replies.get("error", replies) if isinstance(replies, dict) else replies
+        record_rpc(record_as, time.perf_counter() - start, len(body), len(response.content), f"ValueError: {error}")
+        raise ValueError(error)
+    record_rpc(record_as, time.perf_counter() - start, len(body), len(response.content))
+
+    # Responses in a batch may come back in any order
+    responses = {item["id"]: item for item in replies}
+    return [responses[request["id"]] for request in payload]
+
+
+def batch_call(*contract_functions, web3=None):
+    """Resolve several contract view calls in a single round trip."""
+    batch = BatchCall(web3)
+    for contract_function in contract_functions:
+        batch.add(contract_function)
+    return batch.execute()
@@ -0,0 +1,156 @@
+# Import libraries
+import os
+import time
+import threading
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Import function from contract
+from functions.contract import w3
+from functions.batch import BatchCall
+
+# Maximum number of contract read results kept across all sessions
+DEFAULT_MAX_ENTRIES = int(os.getenv("READ_CACHE_MAX_ENTRIES", "1024"))
+
+# Seconds between checks of the chain head by the background poller
+DEFAULT_BLOCK_POLL_INTERVAL = float(os.getenv("BLOCK_POLL_INTERVAL", "1.0"))
+
+# JSON-RPC methods that submit one of our own transactions
+SEND_METHODS = ("eth_sendTransaction", "eth_sendRawTransaction")
+
+
+class BlockCache:
+    """LRU cache of contract view call results, keyed by call and block number.
+
+    The chain head is followed by a background thread, so reading from the
+    cache never touches the node while no new block has landed. Results are
+    stored under the block they were read at; once the head moves on, the
+    old entries simply stop matching and age out of the LRU. Sending one of
+    our own transactions drops every entry and makes the next read check the
+    head again straight away.
+    """
+
+    def __init__(self, web3=None, max_entries=DEFAULT_MAX_ENTRIES, block_poll_interval=DEFAULT_BLOCK_POLL_INTERVAL):
+        self.w3 = web3 or w3
+        self.max_entries = max_entries
+        self.block_poll_interval = block_poll_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._block_number = None
+        self._poller = None
+
+    def block_number(self):
+        """Return the latest known block number, fetching it only when unknown."""
+        self._start_poller()
+        if self._block_number is None:
+            self._refresh_block_number()
+        return self._block_number
+
+    def invalidate(self):
+        """Drop every cached result and re-check the head on the next read."""
+        with self._lock:
+            self._entries.clear()
+            self._block_number = None
+
+    def call(self, contract_function):
+        """Return the result of one view call, reading it from the node only on a miss."""
+        return self.batch_call(contract_function)[0]
+
+    def batch_call(self, *contract_functions):
+        """Return the results of several view calls, fetching all misses in one round trip."""
+        block_number = self.block_number()
+        results, missing = self.lookup(contract_functions, block_number)
+
+        if missing:
+            # Pin the reads to the block they are cached under
+            batch = BatchCall(self.w3, block_identifier="latest" if block_number is None else block_number)
+            for contract_function in missing:
+                batch.add(contract_function)
+            fetched = batch.execute()
+            self.store(block_number, zip(missing, fetched))
+            results.update((self._key(contract_function, block_number), result) for contract_function, result in zip(missing, fetched))
+
+        return [results[self._key(contract_function, block_number)] for contract_function in contract_functions]
+
+    def lookup(self, contract_functions, block_number):
+        """Split view calls into cached results (by key) and the distinct calls still missing."""
+        results, missing, missing_keys = {}, [], set()
+        with self._lock:
+            for contract_function in contract_functions:
+                key = self._key(contract_function, block_number)
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    results[key] = self._entries[key]
+                    self.hits += 1
+                elif key not in missing_keys:
+                    missing.append(contract_function)
+                    missing_keys.add(key)
+                    self.misses += 1
+        return results, missing
+
+    def store(self, block_number, fetched):
+        """Cache ``(contract_function, result)`` pairs read at ``block_number``."""
+        with self._lock:
+            # Skip storing if a transaction invalidated the cache meanwhile
+            if block_number is None or self._block_number != block_number:
+                return
+            for contract_function, result in fetched:
+                self._entries[self._key(contract_function, block_number)] = result
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _key(self, contract_function, block_number):
+        return (contract_function.address, contract_function._encode_transaction_data(), block_number)
+
+    def _refresh_block_number(self):
+        try:
+            block_number = self.w3.eth.block_number
+        except Exception:
+            # Leave the head unknown so reads go back to the node once it answers again
+            block_number = None
+        with self._lock:
+            self._block_number = block_number
+
+    def _start_poller(self):
+        if self._poller is not None and self._poller.is_alive():
+            return
+        with self._lock:
+            if self._poller is not None and self._poller.is_alive():
+                return
+            self._poller = threading.Thread(target=self._poll_block_number, name="block-cache-poller", daemon=True)
+            self._poller.start()
+
+    def _poll_block_number(self):
+        while True:
+            time.sleep(self.block_poll_interval)
+            self._refresh_block_number()
+
+
+def cache_invalidation_middleware(make_request, web3):
+    """Web3 middleware that invalidates the read cache whenever we send a transaction."""
+    def middleware(method, params):
+        response = make_request(method, params)
+        if method in SEND_METHODS:
+            block_cache.invalidate()
+        return response
+    return middleware
+
+
+# Read cache shared by every session of the app
+block_cache = BlockCache()
+w3.middleware_onion.add(cache_invalidation_middleware, "cache_invalidation")
+
+
+def cached_call(contract_function):
+    """Resolve one contract view call through the shared block cache."""
+    return block_cache.call(contract_function)
+
+
+def cached_batch_call(*contract_functions):
+    """Resolve several contract view calls through the shared block cache."""
+    return block_cache.batch_call(*contract_functions)
@@ -0,0 +1,198 @@
+# Import libraries
+import os
+import json
+import time
+import threading
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from web3 import Web3, HTTPProvider
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Import function from instrumentation
+from functions.instrumentation import rpc_metrics_middleware, record_rpc
+
+# Location of the compiled contract ABI
+CONTRACT_ABI_PATH = Path('./contracts/compiled/ndis_smart_contract.json')
+
+# Keep-alive connections kept open per endpoint, shared by every session
+RPC_POOL_SIZE = int(os.getenv("RPC_POOL_SIZE", "32"))
+
+# Seconds before endpoint health and latency are measured again
+RPC_HEALTH_CHECK_INTERVAL = float(os.getenv("RPC_HEALTH_CHECK_INTERVAL", "30"))
+
+# Seconds to wait for a node before trying the next endpoint
+RPC_REQUEST_TIMEOUT = float(os.getenv("RPC_REQUEST_TIMEOUT", "10"))
+HEALTH_CHECK_TIMEOUT = 2
+
+# Weight of the newest request in each endpoint's moving average latency
+LATENCY_SMOOTHING = 0.2
+
+
+def provider_endpoints():
+    """Return the RPC endpoints from WEB3_PROVIDER_URIS (comma separated) or WEB3_PROVIDER_URI."""
+    uris = os.getenv("WEB3_PROVIDER_URIS") or os.getenv("WEB3_PROVIDER_URI") or ""
+    return [uri.strip() for uri in uris.split(",") if uri.strip()]
+
+
+def pooled_session(pool_size=RPC_POOL_SIZE):
+    """Return a requests session keeping up to ``pool_size`` connections open per host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class FailoverHTTPProvider(HTTPProvider):
+    """HTTP provider spreading one pooled keep-alive session over several endpoints.
+
+    Requests go to the healthy endpoint with the lowest moving average
+    latency. An endpoint that fails to answer is marked down and the request
+    is retried on the next one; down endpoints go to the back of the queue
+    until a health check or a later request finds them answering again.
+    ``endpoint_uri`` always names the endpoint currently preferred.
+    """
+
+    def __init__(self, endpoint_uris, request_kwargs=None, session=None, health_check_interval=RPC_HEALTH_CHECK_INTERVAL):
+        endpoint_uris = list(endpoint_uris)
+        super().__init__(endpoint_uris[0] if endpoint_uris else None, request_kwargs)
+        self.endpoint_uris = endpoint_uris or [self.endpoint_uri]
+        self.session = session or pooled_session()
+        self.health_check_interval = health_check_interval
+        self._lock = threading.Lock()
+        self._latency = {uri: None for uri in self.endpoint_uris}
+        self._down = set()
+        self._last_health_check = 0.0
+
+    def get_request_kwargs(self):
+        kwargs = dict(super().get_request_kwargs())
+        kwargs.setdefault("timeout", RPC_REQUEST_TIMEOUT)
+        return kwargs
+
+    def make_request(self, method, params):
+        response = self.post(self.encode_rpc_request(method, params))
+        return self.decode_rpc_response(response.content)
+
+    def isConnected(self):
+        # Answered from the last health check, so reruns do not ping the node
+        self._check_health_if_due()
+        return len(self._down) < len(self.endpoint_uris)
+
+    def is_connected(self):
+        return self.isConnected()
+
+    def post(self, data):
+        """POST a JSON-RPC payload, failing over between endpoints, and return the response."""
+        if len(self.endpoint_uris) > 1:
+            self._check_health_if_due()
+
+        last_error = None
+        for uri in self._endpoints_by_preference():
+            start = time.perf_counter()
+            try:
+                response = self.session.post(uri, data=data, **self.get_request_kwargs())
+                response.raise_for_status()
+            except requests.RequestException as e:
+                self._mark_down(uri)
+                last_error = e
+                continue
+            self._mark_up(uri, time.perf_counter() - start)
+            return response
+        raise last_error
+
+    def check_health(self):
+        """Ping every endpoint, recording which answer and how fast."""
+        payload = self.encode_rpc_request("web3_clientVersion", [])
+        for uri in self.endpoint_uris:
+            start = time.perf_counter()
+            try:
+                response = self.session.post(uri, data=payload, **{**self.get_request_kwargs(), "timeout": HEALTH_CHECK_TIMEOUT})
+                response.raise_for_status()
+            except requests.RequestException as e:
+                # Health checks bypass the middleware stack, so record them directly
+                record_rpc("web3_clientVersion", time.perf_counter() - start, len(payload), 0, f"{type(e).__name__}: {e}")
+                self._mark_down(uri)
+                continue
+            seconds = time.perf_counter() - start
+            record_rpc("web3_clientVersion", seconds, len(payload), len(response.content))
+            self._mark_up(uri, seconds)
+        with self._lock:
+            self._last_health_check = time.monotonic()
+
+    def _check_health_if_due(self):
+        if time.monotonic() - self._last_health_check < self.health_check_interval:
+            return
+        with self._lock:
+            if time.monotonic() - self._last_health_check < self.health_check_interval:
+                return
+            # Claim this round so concurrent sessions do not all run it
+            self._last_health_check = time.monotonic()
+        self.check_health()
+
+    def _endpoints_by_preference(self):
+        with self._lock:
+            up = [uri for uri in self.endpoint_uris if uri not in self._down]
+            down = [uri for uri in self.endpoint_uris if uri in self._down]
+            # Unmeasured endpoints keep their configured order ahead of measured ones
+            up.sort(key=lambda uri: self._latency[uri] or 0.0)
+        # Down endpoints are a last resort, in case every endpoint is down
+        return up + down
+
+    def _mark_up(self, uri, seconds):
+        with self._lock:
+            self._down.discard(uri)
+            previous = self._latency[uri]
+            self._latency[uri] = seconds if previous is None else previous + LATENCY_SMOOTHING * (seconds - previous)
+            self.endpoint_uri = min(
+                (endpoint for endpoint in self.endpoint_uris if endpoint not in self._down),
+                key=lambda endpoint: self._latency[endpoint] or 0.0,
+            )
+
+    def _mark_down(self, uri):
+        with self._lock:
+            self._down.add(uri)
+            up = [endpoint for endpoint in self.endpoint_uris if endpoint not in self._down]
+            if up:
+                self.endpoint_uri = min(up, key=lambda endpoint: self._latency[endpoint] or 0.0)
+
+
+_lock = threading.Lock()
+_web3 = None
+_abis = {}
+_contracts = {}
+
+
+def get_web3():
+    """Return the process-wide Web3 client, creating it on first use."""
+    global _web3
+    if _web3 is None:
+        with _lock:
+            if _web3 is None:
+                web3 = Web3(FailoverHTTPProvider(provider_endpoints()))
+                web3.middleware_onion.add(rpc_metrics_middleware, "rpc_metrics")
+                _web3 = web3
+    return _web3
+
+
+def load_contract_abi(path=CONTRACT_ABI_PATH):
+    """Return the parsed contract ABI, reading the JSON file only once per process."""
+    path = Path(path)
+    if path not in _abis:
+        with open(path) as f:
+            _abis[path] = json.load(f)
+    return _abis[path]
+
+
+def get_contract(address=None):
+    """Return the shared contract object for ``address`` (default SMART_CONTRACT_ADDRESS)."""
+    address = address or os.getenv("SMART_CONTRACT_ADDRESS")
+    if address not in _contracts:
+        web3 = get_web3()
+        with _lock:
+            if address not in _contracts:
+                _contracts[address] = web3.eth.contract(address=address, abi=load_contract_abi())
+    return _contracts[address]
@@ -1,33 +1,15 @@
-import os
-import json
-from web3 import Web3
-from pathlib import Path
 import streamlit as st
 
-from dotenv import load_dotenv
+from functions.connection import get_web3, get_contract
 
-load_dotenv()
-
-# Define and connect a new Web3 provider
-w3 = Web3(Web3.HTTPProvider(os.getenv("WEB3_PROVIDER_URI")))
+# Process-wide Web3 client, shared with every other module
+w3 = get_web3()
 
 # Define the load_contract function
 def connect_to_contract():
     try:
-        # Load NDIS Contracts ABI
-        with open(Path('./contracts/compiled/ndis_smart_contract.json')) as f:
-            ndis_smart_contract_abi = json.load(f)
+        # The ABI is parsed and the contract object built once per process
+        return get_contract()
     except FileNotFoundError:
         st.error("Smart contract ABI file not found. Please ensure the file path is correct.")
         st.stop()
-
-    # Set the contract address (this is the address of the deployed contract)
-    contract_address = os.getenv("SMART_CONTRACT_ADDRESS")
-
-    # Get the contract
-    contract = w3.eth.contract(
-        address=contract_address,
-        abi=ndis_smart_contract_abi
-    )
-    # Return the contract from the function
-    return contract
\ No newline at end of file
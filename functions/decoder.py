@@ -0,0 +1,208 @@
+# Import libraries
+from collections import namedtuple
+from functools import lru_cache
+
+from eth_abi import decode_abi, is_encodable_type
+from eth_utils.abi import collapse_if_tuple
+from web3 import Web3, HTTPProvider
+from web3._utils.abi import map_abi_data
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+
+# Import function from connection
+from functions.connection import load_contract_abi
+from functions.batch import batch_request
+
+# Fields every decoded record carries after the event's own arguments
+LOG_FIELDS = ("blockNumber", "transactionHash", "blockHash", "logIndex")
+
+
+def event_signature(event_abi):
+    """Canonical signature of an event, e.g. ``"Withdrawal(address,bytes32,uint256,uint32,uint8,uint8)"``."""
+    return "{}({})".format(event_abi["name"], ",".join(collapse_if_tuple(i) for i in event_abi["inputs"]))
+
+
+def event_topic(event_abi):
+    """keccak256 of the event signature: the first topic of every log the event emits."""
+    return Web3.keccak(text=event_signature(event_abi)).hex()
+
+
+def _to_bytes(value):
+    # Raw JSON-RPC results hold hex strings, web3-formatted ones hold bytes
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+    return bytes(value)
+
+
+def _to_int(value):
+    return int(value, 16) if isinstance(value, str) else value
+
+
+def _to_hex(value):
+    return value if isinstance(value, str) else "0x" + bytes(value).hex()
+
+
+@lru_cache(maxsize=65536)
+def _checksum_address(raw):
+    # Checksumming costs a keccak; the same few accounts appear in most logs
+    return Web3.toChecksumAddress("0x" + raw.hex())
+
+
+def _word_decoder(abi_type):
+    # Decoder of a 32-byte word holding a static ABI value
+    if "[" in abi_type or abi_type.startswith("("):
+        return None
+    if abi_type == "address":
+        return lambda word: _checksum_address(word[12:])
+    if abi_type == "bool":
+        return lambda word: word[31] != 0
+    if abi_type.startswith("uint"):
+        return lambda word: int.from_bytes(word, "big")
+    if abi_type.startswith("int"):
+        return lambda word: int.from_bytes(word, "big", signed=True)
+    if abi_type.startswith("bytes") and abi_type != "bytes":
+        size = int(abi_type[5:])
+        return lambda word: word[:size]
+    return None
+
+
+def _field_decoder(abi_type, offset):
+    # Decoder of one non-indexed argument starting at ``offset`` in the log data, or None for arrays and tuples
+    decode_word = _word_decoder(abi_type)
+    if decode_word is not None:
+        end = offset + 32
+        return lambda data: decode_word(data[offset:end])
+    if abi_type in ("string", "bytes"):
+        def decode_dynamic(data):
+            start = int.from_bytes(data[offset:offset + 32], "big")
+            length = int.from_bytes(data[start:start + 32], "big")
+            value = data[start + 32:start + 32 + length]
+            return value.decode("utf-8") if abi_type == "string" else value
+        return decode_dynamic
+    return None
+
+
+def _abi_field_decoders(inputs):
+    # Arrays and tuples can take more than one word of the data's head, so eth_abi decodes the whole data instead
+    types = [collapse_if_tuple(i) for i in inputs]
+    for abi_type in types:
+        if not is_encodable_type(abi_type):
+            raise TypeError(f"Unsupported event argument type {abi_type}")
+
+    # Every argument of a log reads the same data, so decode it once
+    @lru_cache(maxsize=1)
+    def decode_data(data):
+        return map_abi_data(BASE_RETURN_NORMALIZERS, types, decode_abi(types, data))
+
+    return [lambda data, position=position: decode_data(data)[position] for position in range(len(types))]
+
+
+def _topic_decoder(abi_type, index):
+    # Indexed strings, bytes, arrays and tuples are stored as their hash, so keep the topic as is
+    decode_word = _word_decoder(abi_type) or (lambda word: word)
+    return lambda topics: decode_word(topics[index])
+
+
+def _record_args(record):
+    return {name: getattr(record, name) for name in record.arg_names}
+
+
+class LogDecoder:
+    """Decodes contract logs straight from their topics and data.
+
+    Built once from the contract ABI: every event gets its topic hash and a
+    list of decoders, one per argument, reading fixed offsets of the log
+    data, so decoding a log is a dictionary lookup plus a few slices. Events
+    with array or tuple arguments decode their data with eth_abi instead. Logs
+    are accepted both raw from ``eth_getLogs`` (hex strings) and as web3
+    formats them, and come out as compact named tuples with the event's
+    arguments followed by ``LOG_FIELDS``.
+    """
+
+    def __init__(self, abi, events=None):
+        self.names = {}
+        self.record_types = {}
+        self._decoders = {}
+
+        for entry in abi:
+            if entry.get("type") != "event" or entry.get("anonymous") or (events is not None and entry["name"] not in events):
+                continue
+            topic = event_topic(entry)
+            inputs = entry["inputs"]
+            arg_names = tuple(i["name"] for i in inputs)
+            record_type = type(entry["name"], (namedtuple(entry["name"], arg_names + LOG_FIELDS),), {
+                "__slots__": (),
+                "event": entry["name"],
+                "arg_names": arg_names,
+                "args": property(_record_args),
+            })
+
+            topic_decoders = []
+            for i in inputs:
+                if i["indexed"]:
+                    topic_decoders.append((arg_names.index(i["name"]), _topic_decoder(i["type"], len(topic_decoders) + 1)))
+
+            data_inputs = [i for i in inputs if not i["indexed"]]
+            field_decoders = [_field_decoder(i["type"], 32 * position) for position, i in enumerate(data_inputs)]
+            if None in field_decoders:
+                field_decoders = _abi_field_decoders(data_inputs)
+            data_decoders = [(arg_names.index(i["name"]), decode) for i, decode in zip(data_inputs, field_decoders)]
+
+            self.names[topic] = entry["name"]
+            self.record_types[entry["name"]] = record_type
+            self._decoders[_to_bytes(topic)] = (record_type, len(inputs), topic_decoders, data_decoders)
+
+    def topics(self, events=None):
+        """Topic hashes of ``events`` (default all), for ``eth_getLogs`` and log filters."""
+        return [topic for topic, name in self.names.items() if events is None or name in events]
+
+    def decode(self, log):
+        """Decode one log, or return None if it is not one of the decoder's events."""
+        topics = [_to_bytes(topic) for topic in log["topics"]]
+        decoder = self._decoders.get(topics[0]) if topics else None
+        if decoder is None:
+            return None
+
+        record_type, arg_count, topic_decoders, data_decoders = decoder
+        data = _to_bytes(log["data"])
+        values = [None] * arg_count
+        for index, decode in topic_decoders:
+            values[index] = decode(topics)
+        for index, decode in data_decoders:
+            values[index] = decode(data)
+        return record_type(
+            *values,
+            _to_int(log["blockNumber"]),
+            _to_hex(log["transactionHash"]),
+            _to_hex(log["blockHash"]),
+            _to_int(log["logIndex"]),
+        )
+
+    def decode_logs(self, logs, address=None):
+        """Decode a batch of logs, skipping other events and, given ``address``, other contracts."""
+        if address is not None:
+            address = address.lower()
+        decode = self.decode
+        records = []
+        for log in logs:
+            if address is not None and log["address"].lower() != address:
+                continue
+            record = decode(log)
+            if record is not None:
+                records.append(record)
+        return records
+
+
+def get_raw_logs(web3, log_filter):
+    """Run ``eth_getLogs`` without web3's per-log result formatting; ``LogDecoder`` reads the raw logs."""
+    if not isinstance(web3.provider, HTTPProvider):
+        return web3.eth.get_logs(log_filter)
+    params = {key: hex(value) if isinstance(value, int) else value for key, value in log_filter.items()}
+    response, = batch_request(web3, [("eth_getLogs", [params])])
+    if "error" in response:
+        # Same exception web3 raises for RPC errors, e.g. a block range with too many results
+        raise ValueError(response["error"])
+    return response["result"]
+
+
+# Decoder for every event of the NDIS contract, shared by the indexer, subscriber and panels
+log_decoder = LogDecoder(load_contract_abi())
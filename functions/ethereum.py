@@ -1,15 +1,16 @@
 import os
 from eth_account import Account
 from eth_account.signers.local import LocalAccount
-from web3 import Web3, EthereumTesterProvider
 from web3.middleware import construct_sign_and_send_raw_middleware
-from web3.gas_strategies.time_based import medium_gas_price_strategy
 
 from dotenv import load_dotenv
 
+from functions.connection import get_web3
+from functions.submitter import submitter
+
 load_dotenv()
 
-w3 = Web3(Web3.HTTPProvider(os.getenv("WEB3_PROVIDER_URI")))
+w3 = get_web3()
 
 # Create a function called `generate_account` that automates the Ethereum
 # account creation process
@@ -19,7 +20,10 @@ def get_account():
     assert private_key.startswith("0x"), "Private key must start with 0x hex prefix"
 
     account: LocalAccount = Account.from_key(private_key)
-    w3.middleware_onion.add(construct_sign_and_send_raw_middleware(account))
+    # The client is shared, so add the signing middleware only once per account
+    middleware_name = f"sign_and_send_raw_{account.address}"
+    if middleware_name not in w3.middleware_onion:
+        w3.middleware_onion.add(construct_sign_and_send_raw_middleware(account), middleware_name)
     return account
 
     
@@ -40,30 +44,17 @@ def get_balance():
 # Create a function called `send_transaction` that creates a raw transaction, signs it, and sends it. Return the confirmation hash from the transaction
 def send_transaction(account, receiver, ether):
     """Send an authorized transaction."""
-    # Set a medium gas price strategy
-    w3.eth.setGasPriceStrategy(medium_gas_price_strategy)
-
     # Convert eth amount to Wei
     wei_value = w3.toWei(ether, "ether")
 
-    # Calculate gas estimate
-    gas_estimate = w3.eth.estimateGas({"to": receiver, "from": account.address, "value": wei_value})
-
-    # Construct a raw transaction
+    # Construct a raw transaction; the nonce is tracked locally, the fees
+    # come from the gas oracle and the gas estimate is reused for later
+    # transfers to the same receiver
     raw_tx = {
         "to": receiver,
-        "from": account.address,
         "value": wei_value,
-        "gas": gas_estimate,
-        "gasPrice": 45516,
-        "nonce": w3.eth.getTransactionCount(account.address)
     }
 
-    # Sign the raw transaction with ethereum account
-    signed_tx = account.signTransaction(raw_tx)
-
-    # Send the signed transactions
-    return w3.eth.sendRawTransaction(signed_tx.rawTransaction)
-
-print(os.getenv("SMART_CONTRACT_ADDRESS"))
+    # Sign the raw transaction with ethereum account and send it
+    return submitter.send(raw_tx, account, cache_gas=True)
 
@@ -0,0 +1,82 @@
+# Import libraries
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from web3 import HTTPProvider
+
+# Import function from contract
+from functions.contract import w3
+from functions.batch import batch_request
+from functions.indexer import get_indexer
+
+# Where the NDIA analytics panel writes and reads the event history
+EXPORT_PATH = os.getenv("EXPORT_PATH", "ndis_events.parquet")
+
+# Rows read from the event index and written per Parquet row group
+EXPORT_BATCH_ROWS = 100000
+
+# Blocks whose timestamps are fetched per JSON-RPC batch
+TIMESTAMP_BATCH_SIZE = 500
+
+# Columns of the exported event history; repeated strings are dictionary encoded
+# and come back from Parquet as pandas categoricals
+EVENT_SCHEMA = pa.schema([
+    ("event", pa.dictionary(pa.int8(), pa.string())),
+    ("block_number", pa.int64()),
+    ("log_index", pa.int32()),
+    ("tx_hash", pa.string()),
+    ("request_id", pa.string()),
+    ("job_number", pa.int64()),
+    ("participant", pa.dictionary(pa.int32(), pa.string())),
+    ("account", pa.dictionary(pa.int32(), pa.string())),
+    ("amount", pa.uint64()),
+    ("service_category", pa.int16()),
+    ("status", pa.int8()),
+    ("timestamp", pa.int64()),
+])
+
+# Block timestamps never change once final, so they are fetched once per process
+_block_timestamps = {}
+
+
+def block_timestamps(block_numbers, web3=None):
+    """Return ``{block_number: timestamp}``, fetching unknown blocks in JSON-RPC batches."""
+    web3 = web3 or w3
+    missing = sorted(set(block_numbers) - set(_block_timestamps))
+    for start in range(0, len(missing), TIMESTAMP_BATCH_SIZE):
+        chunk = missing[start:start + TIMESTAMP_BATCH_SIZE]
+        if isinstance(web3.provider, HTTPProvider):
+            responses = batch_request(web3, [("eth_getBlockByNumber", [hex(number), False]) for number in chunk])
+            for number, response in zip(chunk, responses):
+                _block_timestamps[number] = int(response["result"]["timestamp"], 16)
+        else:
+            for number in chunk:
+                _block_timestamps[number] = web3.eth.get_block(number)["timestamp"]
+    return {number: _block_timestamps[number] for number in block_numbers}
+
+
+def export_events(path=EXPORT_PATH, indexer=None, web3=None):
+    """Stream every indexed NDIS event into a Parquet file and return the number of rows written.
+
+    The index is synced first, then read and written ``EXPORT_BATCH_ROWS``
+    rows at a time, so memory use stays flat however long the history is.
+    The file is written next to ``path`` and moved into place at the end,
+    so readers never see a partial export.
+    """
+    indexer = indexer or get_indexer()
+    indexer.sync()
+
+    rows_written = 0
+    partial_path = f"{path}.partial"
+    with pq.ParquetWriter(partial_path, EVENT_SCHEMA, compression="zstd") as writer:
+        for rows in indexer.iter_rows(EXPORT_BATCH_ROWS):
+            columns = [list(column) for column in zip(*rows)]
+            # The index keeps uint64 amounts as decimal text; Arrow parses them straight into uint64
+            columns[8] = pa.array(columns[8], pa.string()).cast(pa.uint64())
+            timestamps = block_timestamps(set(columns[1]), web3)
+            columns.append([timestamps[number] for number in columns[1]])
+            writer.write_batch(pa.record_batch(columns, schema=EVENT_SCHEMA))
+            rows_written += len(rows)
+    os.replace(partial_path, path)
+    return rows_written
@@ -0,0 +1,118 @@
+# Import libraries
+import os
+import threading
+import weakref
+from collections import deque
+from statistics import median
+
+# Import function from contract
+from functions.contract import w3
+from functions.cache import block_cache
+
+# Number of recent blocks the fee suggestions are based on
+FEE_HISTORY_WINDOW = int(os.getenv("FEE_HISTORY_WINDOW", "20"))
+
+# Priority fee percentile of each block's transactions used per speed
+SPEED_PERCENTILES = {"slow": 10, "medium": 50, "fast": 90}
+
+# Priority fee suggested when the window holds no transactions at all
+MIN_PRIORITY_FEE = int(os.getenv("MIN_PRIORITY_FEE", str(10 ** 9)))
+
+
+class GasOracle:
+    """Suggests transaction fees from a rolling window of recent blocks.
+
+    The window is kept up to date with ``eth_feeHistory``, asking only for
+    the blocks produced since the last update, and the suggestions for every
+    speed are worked out once per new block, so ``suggest`` answers from
+    memory. On chains without EIP-1559 (or nodes without ``eth_feeHistory``)
+    it falls back to ``eth_gasPrice``, fetched once per block.
+    """
+
+    def __init__(self, web3=None, window=FEE_HISTORY_WINDOW, block_number=None):
+        self.w3 = web3 or w3
+        self.window = window
+        self.legacy = False
+        self._block_number = block_number or (lambda: self.w3.eth.block_number)
+        self._lock = threading.Lock()
+        self._blocks = deque(maxlen=window)
+        self._last_block = None
+        self._next_base_fee = None
+        self._suggestions = {}
+
+    def suggest(self, speed="medium"):
+        """Return the fee fields for a transaction, e.g. ``{"maxFeePerGas": ..., "maxPriorityFeePerGas": ...}``."""
+        head = self._block_number()
+        if head is None or head != self._last_block:
+            self.update(head)
+        return dict(self._suggestions[speed])
+
+    def update(self, head=None):
+        """Pull the fee history of blocks produced since the last update."""
+        with self._lock:
+            head = self.w3.eth.block_number if head is None else head
+            if head == self._last_block and self._suggestions:
+                return
+
+            if not self.legacy:
+                try:
+                    self._extend_history(head)
+                except (ValueError, NotImplementedError):
+                    # The node has no eth_feeHistory; price like a pre-London chain
+                    self.legacy = True
+
+            if self.legacy or self._next_base_fee is None:
+                gas_price = self.w3.eth.gas_price
+                self._suggestions = {speed: {"gasPrice": gas_price} for speed in SPEED_PERCENTILES}
+            else:
+                self._suggestions = {speed: self._eip1559_fees(percentile) for speed, percentile in SPEED_PERCENTILES.items()}
+            self._last_block = head
+
+    def _extend_history(self, head):
+        since = self._last_block if self._last_block is not None else head - self.window
+        block_count = min(max(head - since, 1), self.window)
+        history = self.w3.eth.fee_history(block_count, head, list(SPEED_PERCENTILES.values()))
+
+        base_fees = history["baseFeePerGas"]
+        if not base_fees or not any(base_fees):
+            self.legacy = True
+            return
+
+        rewards = history.get("reward") or [[0] * len(SPEED_PERCENTILES)] * len(history["gasUsedRatio"])
+        for offset, (gas_used_ratio, block_rewards) in enumerate(zip(history["gasUsedRatio"], rewards)):
+            self._blocks.append({
+                "number": history["oldestBlock"] + offset,
+                "base_fee": base_fees[offset],
+                "gas_used_ratio": gas_used_ratio,
+                "rewards": dict(zip(SPEED_PERCENTILES.values(), block_rewards)),
+            })
+        # The last base fee is the one the next block will charge
+        self._next_base_fee = base_fees[-1]
+
+    def _eip1559_fees(self, percentile):
+        # Empty blocks report zero rewards, which say nothing about the going tip
+        tips = [block["rewards"][percentile] for block in self._blocks if block["gas_used_ratio"] > 0]
+        priority_fee = int(median(tips)) if tips else MIN_PRIORITY_FEE
+        return {
+            "maxPriorityFeePerGas": priority_fee,
+            # Two base fees of headroom keep the transaction valid through six full blocks
+            "maxFeePerGas": 2 * self._next_base_fee + priority_fee,
+        }
+
+
+_oracles = weakref.WeakKeyDictionary()
+_oracles_lock = threading.Lock()
+
+
+def gas_oracle_for(web3):
+    """Return the gas oracle kept for ``web3``, creating it on first use."""
+    with _oracles_lock:
+        if web3 not in _oracles:
+            # The shared client's head comes from the read cache's block poller
+            block_number = block_cache.block_number if web3 is w3 else None
+            _oracles[web3] = GasOracle(web3, block_number=block_number)
+        return _oracles[web3]
+
+
+# Gas oracle of the shared client, used by every transaction the app sends
+gas_oracle = gas_oracle_for(w3)
@@ -0,0 +1,255 @@
+# Import libraries
+import os
+import json
+import sqlite3
+import threading
+
+from web3 import Web3
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Import function from contract
+from functions.contract import w3, connect_to_contract
+from functions.decoder import log_decoder, get_raw_logs
+
+# Events mirrored into the local index
+INDEXED_EVENTS = (
+    "AccountRegistered",
+    "ServiceBooked",
+    "ServiceOffered",
+    "WithdrawalRequestInitiated",
+    "Withdrawal",
+)
+
+# Number of blocks requested per eth_getLogs call
+DEFAULT_CHUNK_SIZE = 2000
+
+# Number of chunk checkpoints kept to find the common ancestor after a reorg
+CHECKPOINT_HISTORY = 128
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    event TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    block_hash TEXT NOT NULL,
+    tx_hash TEXT NOT NULL,
+    log_index INTEGER NOT NULL,
+    request_id TEXT,
+    job_number TEXT,
+    participant TEXT,
+    account TEXT,
+    amount TEXT,
+    args TEXT NOT NULL,
+    PRIMARY KEY (block_hash, log_index)
+);
+CREATE INDEX IF NOT EXISTS events_by_event ON events (event, block_number);
+CREATE INDEX IF NOT EXISTS events_by_request ON events (request_id);
+CREATE INDEX IF NOT EXISTS events_by_job ON events (job_number);
+CREATE INDEX IF NOT EXISTS events_by_participant ON events (participant);
+CREATE INDEX IF NOT EXISTS events_by_account ON events (account);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    block_number INTEGER PRIMARY KEY,
+    block_hash TEXT NOT NULL
+);
+"""
+
+
+def _to_json_value(value):
+    # Store bytes as 0x-prefixed hex so lookups can match the UI's request id strings
+    if isinstance(value, (bytes, bytearray)):
+        return "0x" + bytes(value).hex()
+    return value
+
+
+class EventIndexer:
+    """Incrementally mirrors the NDIS contract events into a local SQLite database.
+
+    Logs are pulled in bounded block ranges and committed together with a
+    checkpoint of the last indexed block, so each sync only fetches blocks
+    produced since the previous one. The checkpoint's hash is read before
+    the range's logs are fetched, and a range whose last block or preceding
+    checkpoint changed during the fetch is fetched again. If the hash of the
+    last checkpoint no longer matches the chain, the index is rolled back to
+    the newest checkpoint that still does and re-synced from there.
+    """
+
+    def __init__(self, web3, contract, db_path=":memory:", start_block=0, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.w3 = web3
+        self.contract = contract
+        self.start_block = start_block
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(SCHEMA)
+        if "amount" not in [column["name"] for column in self._db.execute("PRAGMA table_info(events)")]:
+            # Indexes written before amounts had their own column are rebuilt from the chain
+            self._db.executescript("DROP TABLE events; DROP TABLE checkpoints;" + SCHEMA)
+
+    @property
+    def last_indexed_block(self):
+        row = self._db.execute("SELECT MAX(block_number) FROM checkpoints").fetchone()
+        return row[0] if row[0] is not None else self.start_block - 1
+
+    def sync(self):
+        """Index every block up to the current head and return the new checkpoint."""
+        with self._lock:
+            self._rollback_reorged_blocks()
+
+            head = self.w3.eth.block_number
+            from_block = self.last_indexed_block + 1
+            while from_block <= head:
+                to_block = min(from_block + self.chunk_size - 1, head)
+                block_hash = self._block_hash(to_block)
+                try:
+                    logs = self._fetch_logs(from_block, to_block)
+                except ValueError:
+                    # Node refused the range (too many results); retry with a smaller one
+                    if to_block == from_block:
+                        raise
+                    self.chunk_size = max(1, self.chunk_size // 2)
+                    continue
+
+                # The logs belong to the checkpoint's chain only if neither end of the range moved during the fetch
+                if self._block_hash(to_block) != block_hash or not self._checkpoint_on_chain(from_block - 1):
+                    self._rollback_reorged_blocks()
+                    head = self.w3.eth.block_number
+                    from_block = self.last_indexed_block + 1
+                    continue
+
+                self._store_chunk(logs, to_block, block_hash)
+                from_block = to_block + 1
+
+            return self.last_indexed_block
+
+    def events(self, event, request_id=None, job_number=None, participant=None, account=None, limit=None):
+        """Return the decoded arguments of indexed events, oldest first."""
+        query = "SELECT args, block_number, block_hash, tx_hash, log_index FROM events WHERE event = ?"
+        params = [event]
+        for column, value in (
+            ("request_id", request_id),
+            ("job_number", job_number),
+            ("participant", participant),
+            ("account", account),
+        ):
+            if value is not None:
+                query += f" AND {column} = ?"
+                params.append(value.lower() if column in ("participant", "account", "request_id") else str(value))
+        query += " ORDER BY block_number, log_index"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+
+        results = []
+        for row in rows:
+            args = json.loads(row["args"])
+            args["blockNumber"] = row["block_number"]
+            args["blockHash"] = row["block_hash"]
+            args["transactionHash"] = row["tx_hash"]
+            args["logIndex"] = row["log_index"]
+            results.append(args)
+        return results
+
+    def iter_rows(self, batch_size=100000):
+        """Yield every indexed event in chain order, ``batch_size`` rows at a time, as flat tuples.
+
+        Columns: event, block_number, log_index, tx_hash, request_id,
+        job_number, participant, account, amount, service_category, status.
+        Amounts are uint64 wei, which can overflow SQLite's signed integers,
+        so they come back as decimal text.
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "SELECT event, block_number, log_index, tx_hash, request_id, CAST(job_number AS INTEGER), participant, account, "
+                "amount, json_extract(args, '$.serviceCategory'), json_extract(args, '$.status') "
+                "FROM events ORDER BY block_number, log_index"
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [tuple(row) for row in rows]
+
+    def _fetch_logs(self, from_block, to_block):
+        # A single eth_getLogs call covers every indexed event in the range
+        return get_raw_logs(self.w3, {
+            "address": self.contract.address,
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            "topics": [log_decoder.topics(INDEXED_EVENTS)],
+        })
+
+    def _block_hash(self, block_number):
+        return Web3.toHex(self.w3.eth.get_block(block_number)["hash"])
+
+    def _checkpoint_on_chain(self, block_number):
+        # True when the checkpoint at ``block_number`` (if any) is still part of the chain
+        row = self._db.execute("SELECT block_hash FROM checkpoints WHERE block_number = ?", (block_number,)).fetchone()
+        return row is None or self._block_hash(block_number) == row[0]
+
+    def _store_chunk(self, logs, to_block, block_hash):
+        rows = []
+        for record in log_decoder.decode_logs(logs):
+            if record.event not in INDEXED_EVENTS:
+                continue
+            args = {key: _to_json_value(value) for key, value in record.args.items()}
+            rows.append((
+                record.event,
+                record.blockNumber,
+                record.blockHash,
+                record.transactionHash,
+                record.logIndex,
+                args.get("requestId"),
+                str(args["jobNumber"]) if "jobNumber" in args else None,
+                (args.get("participant") or "").lower() or None,
+                (args.get("account") or args.get("recipient") or args.get("serviceProvider") or "").lower() or None,
+                str(args["amount"]) if "amount" in args else None,
+                json.dumps(args),
+            ))
+
+        with self._db:
+            self._db.executemany("INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._db.execute("INSERT OR REPLACE INTO checkpoints VALUES (?, ?)", (to_block, block_hash))
+            self._db.execute(
+                "DELETE FROM checkpoints WHERE block_number NOT IN "
+                "(SELECT block_number FROM checkpoints ORDER BY block_number DESC LIMIT ?)",
+                (CHECKPOINT_HISTORY,),
+            )
+
+    def _rollback_reorged_blocks(self):
+        checkpoints = self._db.execute(
+            "SELECT block_number, block_hash FROM checkpoints ORDER BY block_number DESC"
+        ).fetchall()
+
+        head = self.w3.eth.block_number if checkpoints else None
+        for block_number, block_hash in checkpoints:
+            if block_number <= head and self._block_hash(block_number) == block_hash:
+                break
+        else:
+            # No checkpoint survived (or none exist yet): index from scratch
+            block_number = self.start_block - 1
+
+        if checkpoints and block_number < checkpoints[0][0]:
+            with self._db:
+                self._db.execute("DELETE FROM events WHERE block_number > ?", (block_number,))
+                self._db.execute("DELETE FROM checkpoints WHERE block_number > ?", (block_number,))
+
+
+_indexer = None
+
+
+def get_indexer():
+    """Return the process-wide indexer, shared by every Streamlit session."""
+    global _indexer
+    if _indexer is None:
+        _indexer = EventIndexer(
+            w3,
+            connect_to_contract(),
+            db_path=os.getenv("INDEXER_DB_PATH", "ndis_events.sqlite"),
+            start_block=int(os.getenv("INDEXER_START_BLOCK", "0")),
+        )
+    return _indexer
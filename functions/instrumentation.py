@@ -0,0 +1,224 @@
+# Import libraries
+import json
+import time
+import itertools
+import threading
+from collections import deque, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import streamlit as st
+
+# Upper bounds (seconds) of the RPC latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Number of individual RPC records kept for the diagnostics sidebar
+RECENT_RECORDS = 5000
+
+# Page, panel and rerun the current Streamlit script thread is rendering
+_page = ContextVar("rpc_page", default="")
+_panel = ContextVar("rpc_panel", default="")
+_run = ContextVar("rpc_run", default=0)
+_run_ids = itertools.count(1)
+
+_lock = threading.Lock()
+_recent = deque(maxlen=RECENT_RECORDS)
+_totals = defaultdict(lambda: {
+    "count": 0,
+    "errors": 0,
+    "seconds": 0.0,
+    "request_bytes": 0,
+    "response_bytes": 0,
+    "buckets": [0] * len(LATENCY_BUCKETS),
+})
+_event_latency = {"count": 0, "seconds": 0.0, "buckets": [0] * len(LATENCY_BUCKETS)}
+_subscriber = {"state": "not started", "since": None, "errors": 0, "last_error": None, "last_error_at": None}
+
+
+def begin_run(page):
+    """Start tagging RPC calls of a new script rerun with its page."""
+    _page.set(page)
+    _panel.set("")
+    run_id = next(_run_ids)
+    _run.set(run_id)
+    return run_id
+
+
+@contextmanager
+def rpc_context(page, panel):
+    """Tag every RPC call made inside the block with a page and panel."""
+    page_token, panel_token = _page.set(page), _panel.set(panel)
+    try:
+        yield
+    finally:
+        _page.reset(page_token)
+        _panel.reset(panel_token)
+
+
+def record_rpc(method, seconds, request_bytes=0, response_bytes=0, error=None):
+    """Record one request to the node under the current page and panel."""
+    page, panel = _page.get(), _panel.get()
+    with _lock:
+        _recent.append({
+            "run": _run.get(),
+            "page": page,
+            "panel": panel,
+            "method": method,
+            "seconds": seconds,
+            "request_bytes": request_bytes,
+            "response_bytes": response_bytes,
+            "error": error,
+        })
+
+        totals = _totals[(page, panel, method)]
+        totals["count"] += 1
+        totals["errors"] += 1 if error else 0
+        totals["seconds"] += seconds
+        totals["request_bytes"] += request_bytes
+        totals["response_bytes"] += response_bytes
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                totals["buckets"][index] += 1
+                break
+
+
+def record_event_latency(seconds):
+    """Record the time from a contract event reaching the app to the rerun showing it."""
+    with _lock:
+        _event_latency["count"] += 1
+        _event_latency["seconds"] += seconds
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                _event_latency["buckets"][index] += 1
+                break
+
+
+def record_subscriber_state(state, error=None):
+    """Record what the live event subscriber is doing, and the error that stopped it if any."""
+    with _lock:
+        _subscriber["state"] = state
+        _subscriber["since"] = time.time()
+        if error is not None:
+            _subscriber["errors"] += 1
+            _subscriber["last_error"] = f"{type(error).__name__}: {error}"
+            _subscriber["last_error_at"] = _subscriber["since"]
+
+
+def _payload_size(payload):
+    return len(json.dumps(payload, default=str))
+
+
+def rpc_metrics_middleware(make_request, web3):
+    """Web3 middleware recording method, duration, payload sizes and errors of every request."""
+    def middleware(method, params):
+        start = time.perf_counter()
+        try:
+            response = make_request(method, params)
+        except Exception as e:
+            record_rpc(method, time.perf_counter() - start, _payload_size(params), 0, f"{type(e).__name__}: {e}")
+            raise
+
+        error = response.get("error") if isinstance(response, dict) else None
+        record_rpc(method, time.perf_counter() - start, _payload_size(params), _payload_size(response), json.dumps(error) if error else None)
+        return response
+    return middleware
+
+
+def metrics_json():
+    """Return the accumulated RPC totals as a JSON-serialisable list."""
+    with _lock:
+        return [
+            {"page": page, "panel": panel, "method": method, **totals, "buckets": list(zip(LATENCY_BUCKETS, totals["buckets"]))}
+            for (page, panel, method), totals in _totals.items()
+        ]
+
+
+def prometheus_text():
+    """Return the accumulated RPC totals in the Prometheus text exposition format."""
+    entries = [(entry, 'page="{page}",panel="{panel}",method="{method}"'.format(**entry)) for entry in metrics_json()]
+
+    # Every sample of a metric family has to follow its own HELP and TYPE lines
+    lines = [
+        "# HELP ndis_rpc_requests_total Requests sent to the Ethereum node.",
+        "# TYPE ndis_rpc_requests_total counter",
+    ]
+    lines += [f"ndis_rpc_requests_total{{{labels}}} {entry['count']}" for entry, labels in entries]
+
+    lines.append("# HELP ndis_rpc_errors_total Requests to the Ethereum node that failed.")
+    lines.append("# TYPE ndis_rpc_errors_total counter")
+    lines += [f"ndis_rpc_errors_total{{{labels}}} {entry['errors']}" for entry, labels in entries]
+
+    lines.append("# HELP ndis_rpc_payload_bytes_total JSON payload bytes sent to and received from the node.")
+    lines.append("# TYPE ndis_rpc_payload_bytes_total counter")
+    for entry, labels in entries:
+        lines.append(f'ndis_rpc_payload_bytes_total{{{labels},direction="request"}} {entry["request_bytes"]}')
+        lines.append(f'ndis_rpc_payload_bytes_total{{{labels},direction="response"}} {entry["response_bytes"]}')
+
+    lines.append("# HELP ndis_rpc_request_duration_seconds Latency of requests to the Ethereum node.")
+    lines.append("# TYPE ndis_rpc_request_duration_seconds histogram")
+    for entry, labels in entries:
+        cumulative = 0
+        for bound, count in entry["buckets"]:
+            cumulative += count
+            lines.append(f'ndis_rpc_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'ndis_rpc_request_duration_seconds_bucket{{{labels},le="+Inf"}} {entry["count"]}')
+        lines.append(f"ndis_rpc_request_duration_seconds_sum{{{labels}}} {entry['seconds']}")
+        lines.append(f"ndis_rpc_request_duration_seconds_count{{{labels}}} {entry['count']}")
+
+    lines.append("# HELP ndis_event_to_screen_seconds Time from a contract event reaching the app to the rerun showing it.")
+    lines.append("# TYPE ndis_event_to_screen_seconds histogram")
+    with _lock:
+        event_latency = {**_event_latency, "buckets": list(_event_latency["buckets"])}
+    cumulative = 0
+    for bound, count in zip(LATENCY_BUCKETS, event_latency["buckets"]):
+        cumulative += count
+        lines.append(f'ndis_event_to_screen_seconds_bucket{{le="{bound}"}} {cumulative}')
+    lines.append(f'ndis_event_to_screen_seconds_bucket{{le="+Inf"}} {event_latency["count"]}')
+    lines.append(f"ndis_event_to_screen_seconds_sum {event_latency['seconds']}")
+    lines.append(f"ndis_event_to_screen_seconds_count {event_latency['count']}")
+
+    lines.append("# HELP ndis_subscriber_errors_total Errors that made the live event subscriber set itself up again.")
+    lines.append("# TYPE ndis_subscriber_errors_total counter")
+    with _lock:
+        lines.append(f"ndis_subscriber_errors_total {_subscriber['errors']}")
+    return "\n".join(lines) + "\n"
+
+
+# Function to display RPC diagnostics in the sidebar
+def display_rpc_diagnostics():
+    run_id = _run.get()
+    with _lock:
+        this_run = [record for record in _recent if record["run"] == run_id]
+
+    with st.sidebar.expander("RPC Diagnostics"):
+        st.write(f"This rerun: {len(this_run)} RPC calls, {sum(r['seconds'] for r in this_run) * 1000:.1f} ms")
+
+        per_panel = defaultdict(lambda: {"Calls": 0, "ms": 0.0, "Errors": 0})
+        for record in this_run:
+            row = per_panel[record["panel"] or "(page setup)"]
+            row["Calls"] += 1
+            row["ms"] += record["seconds"] * 1000
+            row["Errors"] += 1 if record["error"] else 0
+        if per_panel:
+            st.table([{"Panel": panel, **row} for panel, row in sorted(per_panel.items(), key=lambda item: -item[1]["ms"])])
+
+        totals = sorted(metrics_json(), key=lambda entry: -entry["seconds"])[:10]
+        if totals:
+            st.write("Hottest panels since startup:")
+            st.table([
+                {"Page": entry["page"], "Panel": entry["panel"], "Method": entry["method"], "Calls": entry["count"], "Total ms": round(entry["seconds"] * 1000, 1)}
+                for entry in totals
+            ])
+
+        with _lock:
+            subscriber = dict(_subscriber)
+        since = "" if subscriber["since"] is None else f" for {time.time() - subscriber['since']:.0f} s"
+        st.write(f"Live event subscriber: {subscriber['state']}{since}, {subscriber['errors']} errors")
+        if subscriber["last_error"]:
+            st.caption(f"Last error {time.time() - subscriber['last_error_at']:.0f} s ago: {subscriber['last_error']}")
+
+        if _event_latency["count"]:
+            st.write(f"Event to screen: {_event_latency['seconds'] / _event_latency['count'] * 1000:.0f} ms on average over {_event_latency['count']} events")
+
+        st.download_button("Download Prometheus metrics", prometheus_text(), file_name="ndis_rpc_metrics.prom")
+        st.download_button("Download JSON metrics", json.dumps(metrics_json(), indent=2), file_name="ndis_rpc_metrics.json")
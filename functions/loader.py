@@ -0,0 +1,112 @@
+# Import libraries
+import os
+import json
+import time
+import asyncio
+import threading
+
+from web3 import AsyncHTTPProvider
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Import function from contract
+from functions.contract import w3
+from functions.batch import encode_call, decode_result
+from functions.cache import block_cache
+from functions.instrumentation import record_rpc
+
+# Maximum number of eth_call requests in flight at once
+MAX_CONCURRENT_READS = int(os.getenv("MAX_CONCURRENT_READS", "16"))
+
+# Seconds to wait for a page's reads before letting the panels fetch their own
+PREFETCH_TIMEOUT = float(os.getenv("PREFETCH_TIMEOUT", "30"))
+
+
+class AsyncPrefetcher:
+    """Reads every panel's contract data concurrently before the page renders.
+
+    The reads a page needs are collected up front and sent as concurrent
+    ``eth_call`` requests through web3's ``AsyncHTTPProvider``, so loading a
+    page takes about as long as its slowest read instead of the sum of all of
+    them. Results go into the shared block cache, where the panels find them
+    when they render. Reads that fail or time out are left out of the cache,
+    and the panel makes the call itself and reports the error.
+    """
+
+    def __init__(self, provider_uri=None, max_concurrent_reads=MAX_CONCURRENT_READS, timeout=PREFETCH_TIMEOUT):
+        self.provider_uri = provider_uri
+        self.max_concurrent_reads = max_concurrent_reads
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._loop = None
+        self._providers = {}
+
+    def prefetch(self, contract_functions):
+        """Fetch the reads missing from the block cache and return how many were cached."""
+        # Follow the shared client's failover to the endpoint it currently prefers
+        provider_uri = self.provider_uri or w3.provider.endpoint_uri
+
+        block_number = block_cache.block_number()
+        _, missing = block_cache.lookup(contract_functions, block_number)
+        if not missing:
+            return 0
+
+        block = "latest" if block_number is None else hex(block_number)
+        future = asyncio.run_coroutine_threadsafe(self._fetch_all(missing, block, provider_uri), self._event_loop())
+        try:
+            outcomes = future.result(self.timeout)
+        except Exception:
+            future.cancel()
+            return 0
+
+        fetched = []
+        for contract_function, (raw, seconds, request_bytes, response_bytes, error) in zip(missing, outcomes):
+            # Recorded from the calling thread so the page and panel tags apply
+            record_rpc("eth_call", seconds, request_bytes, response_bytes, error)
+            if error is None:
+                fetched.append((contract_function, decode_result(w3, contract_function, raw)))
+        block_cache.store(block_number, fetched)
+        return len(fetched)
+
+    def _event_loop(self):
+        # One long-lived loop shared by every session, so the providers'
+        # aiohttp sessions and their connections survive between reruns
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="prefetch-loop", daemon=True).start()
+            return self._loop
+
+    async def _fetch_all(self, contract_functions, block, provider_uri):
+        if provider_uri not in self._providers:
+            self._providers[provider_uri] = AsyncHTTPProvider(provider_uri)
+        provider = self._providers[provider_uri]
+
+        semaphore = asyncio.Semaphore(self.max_concurrent_reads)
+        return await asyncio.gather(*(self._fetch(provider, contract_function, block, semaphore) for contract_function in contract_functions))
+
+    async def _fetch(self, provider, contract_function, block, semaphore):
+        params = [encode_call(contract_function), block]
+        request_bytes = len(json.dumps(params))
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await provider.make_request("eth_call", params)
+            except Exception as e:
+                return None, time.perf_counter() - start, request_bytes, 0, f"{type(e).__name__}: {e}"
+        seconds = time.perf_counter() - start
+
+        if "error" in response:
+            return None, seconds, request_bytes, 0, json.dumps(response["error"])
+        result = response["result"]
+        return bytes.fromhex(result[2:]), seconds, request_bytes, len(result), None
+
+
+# Prefetcher shared by every session of the app
+prefetcher = AsyncPrefetcher()
+
+
+def prefetch_reads(contract_functions):
+    """Load a page's contract reads concurrently into the shared block cache."""
+    return prefetcher.prefetch(contract_functions)
@@ -0,0 +1,141 @@
+# Import libraries
+import os
+import json
+import threading
+from functools import lru_cache
+from web3 import Web3
+# Web3.keccak checks its argument types on every call; a tree hashes each of its claims twice or more
+from eth_hash.auto import keccak
+
+# Directory the NDIA's settlement trees are saved to, one JSON file per Merkle root
+SETTLEMENT_DIR = os.getenv("SETTLEMENT_DIR", "settlements")
+
+
+def claim_leaf(request_id, claimant, amount):
+    """Hash one claim the way the contract's ``claim`` does: ``keccak256(abi.encodePacked(requestId, claimant, amount))``."""
+    return keccak(bytes(request_id) + bytes.fromhex(claimant[2:]) + int(amount).to_bytes(32, "big"))
+
+
+def hash_pair(a, b):
+    # Pairs are hashed in sorted order, so a proof is just the list of sibling hashes
+    return keccak(a + b if a < b else b + a)
+
+
+@lru_cache(maxsize=65536)
+def _checksum_address(address):
+    # Checksumming costs a keccak; the same few claimants claim most requests
+    return Web3.toChecksumAddress(address)
+
+
+def verify_proof(proof, root, leaf):
+    """Check a Merkle proof the way the contract's ``verifySettlementProof`` does."""
+    node = leaf
+    for sibling in proof:
+        node = hash_pair(node, bytes(sibling))
+    return node == bytes(root)
+
+
+class SettlementTree:
+    """Merkle tree over the withdrawal claims approved in one settlement period.
+
+    Each claim is ``(request_id, claimant, amount)``: the request's 32 byte
+    id, the account that requested its withdrawal and the amount it claimed,
+    the same account and amount an approval would pay.
+    Claims are ordered by request id, so the same claims always give the same
+    root. A node without a sibling moves up a level unchanged, which keeps
+    proofs at most ``ceil(log2(len(claims)))`` hashes long.
+    """
+
+    def __init__(self, claims):
+        self.claims = sorted((bytes(request_id), _checksum_address(claimant), int(amount)) for request_id, claimant, amount in claims)
+        self.total = sum(amount for _, _, amount in self.claims)
+        self._positions = {}
+        self._by_claimant = {}
+        for position, (request_id, claimant, _) in enumerate(self.claims):
+            if request_id in self._positions:
+                raise ValueError(f"Request 0x{request_id.hex()} is claimed more than once.")
+            self._positions[request_id] = position
+            self._by_claimant.setdefault(claimant.lower(), []).append(position)
+
+        # Every level of the tree, leaves first
+        self.levels = [[claim_leaf(*claim) for claim in self.claims]]
+        while len(self.levels[-1]) > 1:
+            level = self.levels[-1]
+            self.levels.append([hash_pair(*level[i:i + 2]) if i + 1 < len(level) else level[i] for i in range(0, len(level), 2)])
+
+    @property
+    def root(self):
+        return self.levels[-1][0] if self.claims else bytes(32)
+
+    def __len__(self):
+        return len(self.claims)
+
+    def proof(self, request_id):
+        """Return the sibling hashes proving ``request_id``'s claim, from the leaf up."""
+        position = self._positions[bytes(request_id)]
+        proof = []
+        for level in self.levels[:-1]:
+            sibling = position ^ 1
+            if sibling < len(level):
+                proof.append(level[sibling])
+            position //= 2
+        return proof
+
+    def claimant_claims(self, claimant):
+        """Return the claims that pay ``claimant``."""
+        return [self.claims[position] for position in self._by_claimant.get(claimant.lower(), [])]
+
+    def to_json(self):
+        return json.dumps({
+            "root": "0x" + self.root.hex(),
+            "claims": [["0x" + request_id.hex(), claimant, amount] for request_id, claimant, amount in self.claims],
+        })
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        tree = cls((bytes.fromhex(request_id[2:]), claimant, amount) for request_id, claimant, amount in data["claims"])
+        if "0x" + tree.root.hex() != data["root"]:
+            raise ValueError(f"Settlement {data['root']} does not match its claims.")
+        return tree
+
+
+class SettlementStore:
+    """The NDIA's settlement trees, saved as ``<root>.json`` files so claimants can be given proofs later.
+
+    Trees never change once saved, so each file is read once per process.
+    Whether a tree was committed on-chain is up to the contract's
+    ``settlementPeriods``, not this store.
+    """
+
+    def __init__(self, directory=SETTLEMENT_DIR):
+        self.directory = directory
+        self._trees = {}
+        self._lock = threading.Lock()
+
+    def save(self, tree):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"0x{tree.root.hex()}.json")
+        # Write to a temporary file first, so a half-written tree is never read back
+        with open(path + ".partial", "w") as f:
+            f.write(tree.to_json())
+        os.replace(path + ".partial", path)
+        with self._lock:
+            self._trees[tree.root] = tree
+        return path
+
+    def trees(self):
+        """Return every saved tree, keyed by root."""
+        names = os.listdir(self.directory) if os.path.isdir(self.directory) else []
+        with self._lock:
+            for name in names:
+                if not name.endswith(".json"):
+                    continue
+                root = bytes.fromhex(name[2:-5])
+                if root not in self._trees:
+                    with open(os.path.join(self.directory, name)) as f:
+                        self._trees[root] = SettlementTree.from_json(f.read())
+            return dict(self._trees)
+
+
+settlement_store = SettlementStore()
@@ -1,6 +1,7 @@
 # Import libraries
 import os
 import streamlit as st
+import pandas as pd
 from web3 import Web3
 
 from dotenv import load_dotenv
@@ -8,17 +9,33 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Import function from contract
-from functions.contract import connect_to_contract
+from functions.contract import w3, connect_to_contract
+from functions.cache import cached_call, cached_batch_call
+from functions.accounts import parse_accounts_csv, register_accounts_in_chunks
+from functions.decoder import log_decoder
+from functions.submitter import submitter
+from functions.tracker import tracker, track_transaction
+from functions.utils import fetch_requests_page, requests_page_reads, display_requests_viewer, describe_request, settlement_reads, saved_settlements, WAITING_FOR_APPROVAL, SERVICE_CATEGORIES
+from functions.export import export_events, EXPORT_PATH
+from functions.analytics import cached_analytics
+from functions.risk import describe_risk
+from functions.subscriber import live_events
+from functions.merkle import SettlementTree, settlement_store
 
 contract = connect_to_contract()
 
 ndia_account_address = os.getenv("NDIA")
 
+# Reads made by display_contract_details, for the page prefetch
+def display_contract_details_reads():
+    return [contract.functions.ndia(), contract.functions.participantFunds()]
+
 # Function to display contract details
 def display_contract_details():
     st.subheader("Contract Details")
-    st.write(f"NDIA Address: {contract.functions.ndia().call()}")
-    st.write(f"Participant Funds: {contract.functions.participantFunds().call()} wei")
+    ndia, participant_funds = cached_batch_call(*display_contract_details_reads())
+    st.write(f"NDIA Address: {ndia}")
+    st.write(f"Participant Funds: {participant_funds} wei")
 
     st.write("----") 
 # Function to deposit funds by NDIA
@@ -34,13 +51,14 @@ def deposit_funds():
     
             if st.button("Deposit Funds"):
                 # Check if the entered address is the NDIA address
-                is_ndia = contract.functions.ndia().call() == ndia_account_address
+                is_ndia = cached_call(contract.functions.ndia()) == ndia_account_address
                 if not is_ndia:
                     st.error("Invalid NDIA address. Please provide the correct NDIA address.")
                     return
 
-                tx_hash = contract.functions.deposit().transact({'from': ndia_account_address, 'value': deposit_amount})
-                st.success(f"Deposit successful! Transaction Hash: {tx_hash.hex()}")
+                tx_hash = submitter.transact(contract.functions.deposit(), {'from': ndia_account_address, 'value': deposit_amount})
+                track_transaction(tx_hash, f"Deposit of {deposit_amount} wei")
+                st.info(f"Deposit submitted. Its status is shown in the sidebar. Transaction Hash: {tx_hash.hex()}")
                 # Refresh contract details after deposit
                 display_contract_details()
         except Exception as e:
@@ -62,85 +80,281 @@ def register_account():
             # Button to execute the function
             if st.button("Register Account"):
 
+                # Convert input values
+                address = Web3.toChecksumAddress(accounts_address)
+
+                # Fetch the NDIA address and the account's registration in one round trip
+                ndia, is_participant, is_service_provider = cached_batch_call(
+                    contract.functions.ndia(),
+                    contract.functions.ndisParticipant(address),
+                    contract.functions.ndisServiceProvider(address),
+                )
+
                 # Check if the entered address is the NDIA address
-                is_ndia = contract.functions.ndia().call() == ndia_account_address
+                is_ndia = ndia == ndia_account_address
                 if not is_ndia:
                     st.error("Invalid NDIA address. Please provide the correct NDIA address.")
                     return
 
-                # Convert input values
-                address = Web3.toChecksumAddress(accounts_address)
-
                 # Check if the account is already registered
-                if contract.functions.ndisParticipant(address).call() or \
-                        contract.functions.ndisServiceProvider(address).call():
+                if is_participant or is_service_provider:
                     st.error("Account already registered.")
                 else:
                     # Execute the Solidity function with onlyNDIA modifier
-                    contract.functions.registerAccount(address, is_participant_account).transact({'from': ndia_account_address})
+                    tx_hash = submitter.transact(contract.functions.registerAccount(address, is_participant_account), {'from': ndia_account_address})
+                    track_transaction(tx_hash, f"Register {address}")
 
-                    st.success("Account registered successfully.")
+                    st.info("Account registration submitted. Its status is shown in the sidebar.")
         except Exception as e:
             st.error(f"Error: {e}")
     st.write("----")       
 
+# Function to register many participant and service provider accounts from a CSV file
+def bulk_register_accounts():
+    st.subheader("Bulk Register Accounts")
+
+    # Input form
+    uploaded_file = st.file_uploader("Upload a CSV of address,is_participant rows:", type="csv")
+
+    if uploaded_file is not None:
+        accounts, is_participant_accounts, invalid_rows = parse_accounts_csv(uploaded_file.getvalue().decode("utf-8"))
+
+        for line_number, reason in invalid_rows:
+            st.warning(f"Line {line_number} skipped. {reason}")
+        st.write(f"{len(accounts)} accounts ready to register.")
+
+        if accounts and st.button("Register Accounts"):
+            try:
+                # Check if the entered address is the NDIA address
+                is_ndia = cached_call(contract.functions.ndia()) == ndia_account_address
+                if not is_ndia:
+                    st.error("Invalid NDIA address. Please provide the correct NDIA address.")
+                    return
+
+                results = []
+                progress = st.progress(0)
+                with st.spinner("Registering accounts..."):
+                    # Every chunk is followed in the sidebar like the app's other transactions
+                    track = lambda tx_hash, chunk: track_transaction(tx_hash, f"Register {len(chunk)} accounts")
+                    for address, result in register_accounts_in_chunks(contract, accounts, is_participant_accounts, ndia_account_address, submitter, track):
+                        results.append({"Address": address, "Result": result})
+                        progress.progress(len(results) / len(accounts))
+
+                registered = sum(1 for result in results if result["Result"] == "Registered")
+                st.success(f"{registered} of {len(accounts)} accounts registered.")
+                st.dataframe(results)
+            except Exception as e:
+                st.error(f"Error: {e}")
+    st.write("----")
+
+# Reads made by approve_withdrawal, for the page prefetch
+def approve_withdrawal_reads():
+    return requests_page_reads(WAITING_FOR_APPROVAL, "approve_withdrawals_page") + settlement_reads()
+
 def approve_withdrawal():
-        st.subheader("Approve Withdrawal Request")
-        
-        # Retrieve all withdrawal requests
-        withdrawal_request_filter = contract.events.WithdrawalRequestInitiated.createFilter(fromBlock=0)
-        all_withdrawal_requests = withdrawal_request_filter.get_all_entries()
-        
-        request_id = st.text_input("Select Request ID:")
-        
-        approve_button = st.button("Approve Withdrawal")
-
-        if approve_button:
+        st.subheader("Approve Withdrawal Requests")
+
+        # Offer the requests waiting for approval, one page at a time
+        total, request_ids, requests = fetch_requests_page(WAITING_FOR_APPROVAL, "approve_withdrawals_page")
+
+        # Requests in a committed settlement are paid by their claims instead
+        settled = settled_request_ids()
+
+        options = {}
+        for request_id, request in zip(request_ids, requests):
+            if bytes(request_id) in settled:
+                continue
+            job, address, amount, service_description, status = describe_request(request)
+            request_id = "0x" + request_id.hex()
+            risk = describe_risk(request_id)
+            options[request_id] = f"Job {job}: {service_description}, claimed {amount} wei by {request[6]}" + (f" [risk {risk}]" if risk else "")
+
+        # Select all leaves out the requests the risk scorer flagged
+        select_all = st.checkbox("Select all unflagged requests on this page")
+        selected_request_ids = st.multiselect(
+            "Select Request IDs:",
+            list(options),
+            default=[request_id for request_id in options if not describe_risk(request_id)] if select_all else [],
+            format_func=lambda request_id: options[request_id],
+        )
+        flagged = [request_id for request_id in selected_request_ids if describe_risk(request_id)]
+        if flagged:
+            st.warning(f"{len(flagged)} of the selected requests were flagged by the risk scorer.")
+
+        approve_button = st.button("Approve Selected Withdrawals")
+
+        if approve_button and selected_request_ids:
             try:
-                with st.spinner("Approving withdrawal..."):
-                    # Call the contract function to approve the withdrawal
-                    tx_hash = contract.functions.approveWithdrawal(request_id).transact({'from': ndia_account_address})
-                
-                st.success(f"Withdrawal request approved! Transaction Hash: {tx_hash.hex()}")
-                
-                # Trigger a rerun to update the UI
-                st.experimental_rerun()
+                # Approve the whole selection in one transaction; the tracker follows it from here
+                tx_hash = submitter.transact(contract.functions.approveWithdrawals(selected_request_ids), {'from': ndia_account_address})
+                track_transaction(tx_hash, f"Approve {len(selected_request_ids)} withdrawals")
+                st.session_state["approval"] = {"hash": tx_hash.hex(), "request_ids": selected_request_ids}
 
             except ValueError as ve:
-                st.error(f"Failed to approve withdrawal. Invalid input. Error: {ve}")
+                st.error(f"Failed to approve withdrawals. Invalid input. Error: {ve}")
             except TimeoutError as te:
-                st.error(f"Failed to approve withdrawal. Transaction timed out. Error: {te}")
+                st.error(f"Failed to approve withdrawals. Transaction timed out. Error: {te}")
             except Exception as e:
-                st.error(f"Failed to approve withdrawal. Unknown error. Error: {e}")   
+                st.error(f"Failed to approve withdrawals. Unknown error. Error: {e}")   
+
+        display_approval_outcomes()
         st.write("----")        
 
+# Function to return the ids of the requests in committed settlements
+def settled_request_ids(settlements=None):
+    settlements = saved_settlements() if settlements is None else settlements
+    return {request_id for period, tree in settlements if period for request_id, _, _ in tree.claims}
+
+# Reads made by settle_withdrawals, for the page prefetch
+def settle_withdrawals_reads():
+    return settlement_reads()
+
+# Function to approve every withdrawal request waiting for approval with one Merkle settlement
+def settle_withdrawals():
+    st.subheader("Settle Withdrawals")
+
+    store = live_events()
+    if not store.ready:
+        st.info("Settlements are built from the live event store, which is still catching up with the chain.")
+        st.write("----")
+        return
+
+    # Requests in a committed settlement are left for their claimants to claim
+    settlements = saved_settlements()
+    settled = settled_request_ids(settlements)
+
+    # Each claim pays the claimed amount to the claimant, as an approval would
+    leave_out_flagged = st.checkbox("Leave out requests flagged by the risk scorer", value=True, key="settle_unflagged")
+    _, page = store.query(WAITING_FOR_APPROVAL)
+    claims = [
+        (request_id, claimant, int(amount)) for request_id, claimant, amount in zip(page["request_id"], page["claimant"], page["amount"])
+        if request_id not in settled and not (leave_out_flagged and describe_risk(request_id))
+    ]
+    st.write(f"{len(claims)} withdrawal requests to settle, {sum(amount for _, _, amount in claims)} wei in all.")
+
+    if st.button("Commit Settlement") and claims:
+        try:
+            with st.spinner("Building settlement..."):
+                tree = SettlementTree(claims)
+
+                # Recipients need the tree for their proofs, so it is saved before the root is committed
+                settlement_store.save(tree)
+                tx_hash = submitter.transact(contract.functions.commitSettlement(tree.root, [request_id for request_id, _, _ in tree.claims]), {'from': ndia_account_address})
+                track_transaction(tx_hash, f"Commit settlement of {len(tree)} withdrawals")
+
+            st.info(f"Settlement of {len(tree)} withdrawals ({tree.total} wei) submitted with root 0x{tree.root.hex()}. Its status is shown in the sidebar. Transaction Hash: {tx_hash.hex()}")
+
+        except ValueError as ve:
+            st.error(f"Failed to commit settlement. Invalid input. Error: {ve}")
+        except TimeoutError as te:
+            st.error(f"Failed to commit settlement. Transaction timed out. Error: {te}")
+        except Exception as e:
+            st.error(f"Failed to commit settlement. Unknown error. Error: {e}")
+
+    if settlements:
+        # What committed settlements still hold back for claims not made yet
+        committed = [tree for period, tree in settlements if period]
+        unclaimed = dict(zip((tree.root for tree in committed), cached_batch_call(*[contract.functions.settlementUnclaimed(tree.root) for tree in committed]))) if committed else {}
+        st.dataframe(pd.DataFrame([
+            {"Period": period or "Not committed", "Merkle Root": "0x" + tree.root.hex(), "Claims": len(tree), "Total (wei)": tree.total, "Unclaimed (wei)": unclaimed.get(tree.root)}
+            for period, tree in settlements
+        ]), use_container_width=True)
+
+        # Closing a settlement stops its remaining claims and frees the funds they hold back
+        if committed:
+            root = st.selectbox("Settlement to close:", ["0x" + tree.root.hex() for tree in committed], key="close_settlement_root")
+            if st.button("Close Settlement"):
+                try:
+                    tx_hash = submitter.transact(contract.functions.closeSettlement(root), {'from': ndia_account_address})
+                    track_transaction(tx_hash, f"Close settlement {root[:10]}")
+                    st.info(f"Settlement close submitted. Its status is shown in the sidebar. Transaction Hash: {tx_hash.hex()}")
+                except Exception as e:
+                    st.error(f"Failed to close settlement. Error: {e}")
+    st.write("----")
+
+# Function to report the outcome of each request in the last batch approval once it is mined
+def display_approval_outcomes():
+    approval = st.session_state.get("approval")
+    if not approval:
+        return
+
+    receipt = tracker.receipt(approval["hash"])
+    if receipt is None:
+        status, detail = tracker.status(approval["hash"])
+        st.info(f"Approval {status.lower()}. Transaction Hash: {approval['hash']}")
+        return
+    if receipt["status"] == 0:
+        status, detail = tracker.status(approval["hash"])
+        st.error(f"Approval transaction reverted: {detail}. Transaction Hash: {approval['hash']}")
+        return
+
+    # Report the outcome of each request from the batch's events
+    outcomes = {request_id: "Not processed" for request_id in approval["request_ids"]}
+    for record in log_decoder.decode_logs(receipt["logs"], address=contract.address):
+        if record.event == "Withdrawal":
+            outcomes["0x" + record.requestId.hex()] = "Approved"
+        elif record.event == "WithdrawalApprovalSkipped":
+            outcomes["0x" + record.requestId.hex()] = "Skipped (not waiting for approval, in a committed settlement or insufficient funds)"
+
+    approved = sum(1 for outcome in outcomes.values() if outcome == "Approved")
+    st.success(f"{approved} of {len(outcomes)} withdrawal requests approved! Transaction Hash: {approval['hash']}")
+    st.table([{"Request ID": request_id, "Outcome": outcome} for request_id, outcome in outcomes.items()])
+
+# Reads made by display_withdrawal_requests, for the page prefetch
+def display_withdrawal_requests_reads():
+    return requests_page_reads(WAITING_FOR_APPROVAL, "withdrawal_requests_page")
+
 # Function to display withdrawal requests
 def display_withdrawal_requests():
-    st.subheader("Withdrawal Requests Viewer")
-    
-    requests = contract.functions.getBookingRequests().call()
-
-    pending_requests = []
-
-    for request in requests:
-        job, address, amount, participant_unique_id, service_description, status = request
-
-        # Only display requests with status 0
-        if status == 2:
-            pending_requests.append({
-                "Job Number": job,
-                "Recipient": address,
-                "Service Description": service_description,
-                "Amount": amount,
-                "Status:" : "Wating for Approval"
-            })      
-    
-    # Display the table if there are pending requests
-    if pending_requests:
-        st.table(pending_requests)
-    else:
-        st.write("No pending booking requests.")  
+    display_requests_viewer("Withdrawal Requests Viewer", WAITING_FOR_APPROVAL, "withdrawal_requests_page", "No withdrawal requests waiting for approval.", risk=True)
 
-    st.write("----")    
-    
-   
+# Function to display spend and approval analytics over the exported event history
+def display_analytics():
+    st.subheader("Analytics")
+
+    if st.button("Export Event History"):
+        try:
+            with st.spinner("Exporting event history..."):
+                rows = export_events()
+            st.success(f"Exported {rows} events to {EXPORT_PATH}.")
+        except Exception as e:
+            st.error(f"Failed to export event history. Error: {e}")
+
+    if not os.path.exists(EXPORT_PATH):
+        st.write("No event history exported yet.")
+        st.write("----")
+        return
+
+    # Worked out once per export, so reruns only redraw
+    analytics = cached_analytics(SERVICE_CATEGORIES, EXPORT_PATH)
+    requests = analytics["requests"]
+    if requests.empty:
+        st.write("No booking requests in the exported history.")
+        st.write("----")
+        return
+
+    st.write(f"{len(requests)} booking requests, {int(requests['approved_block'].count())} approved, {requests['paid_amount'].to_numpy().sum(dtype=object)} wei paid.")
+
+    # Spend per service category
+    spend = analytics["spend_by_category"]
+    st.bar_chart(spend[["booked", "paid"]])
+    st.dataframe(spend)
+
+    # Biggest participants and providers
+    st.write("Top participants:")
+    st.dataframe(analytics["participant_totals"].head(20))
+    st.write("Top service providers:")
+    st.dataframe(analytics["provider_totals"].head(20))
+
+    # Time from booking to approval
+    times = analytics["approval_times"]
+    if not times.empty:
+        hours = times["seconds"] / 3600
+        st.write(
+            f"Booking to approval: median {hours.median():.1f} h ({times['blocks'].median():.0f} blocks), "
+            f"90th percentile {hours.quantile(0.9):.1f} h, slowest {hours.max():.1f} h."
+        )
+
+    with open(EXPORT_PATH, "rb") as f:
+        st.download_button("Download Event History (Parquet)", f.read(), file_name=os.path.basename(EXPORT_PATH))
+    st.write("----")
@@ -4,6 +4,11 @@ from itertools import count
 
 # Import function from contract
 from functions.contract import connect_to_contract
+from functions.cache import cached_batch_call
+from functions.submitter import submitter
+from functions.tracker import track_transaction
+from functions.subscriber import live_events
+from functions.utils import requests_page_reads, display_requests_viewer, settlement_reads, saved_settlements, SERVICE_OFFERED, WAITING_FOR_APPROVAL
 
 counter_generator = count(start=1)
 
@@ -22,12 +27,13 @@ def offer_service():
         try:
             with st.spinner("Offering service..."):
                 # Call the contract function to offer the service
-                tx_hash = contract.functions.offerService(service_provider_address, request_id, service_description).transact({'from': service_provider_address})
+                tx_hash = submitter.transact(contract.functions.offerService(service_provider_address, request_id, service_description), {'from': service_provider_address})
+                track_transaction(tx_hash, f"Offer service for {request_id[:10]}")
             
-            st.success(f"Service offered! Transaction Hash: {tx_hash.hex()}")
+            st.info(f"Service offer submitted. Its status is shown in the sidebar. Transaction Hash: {tx_hash.hex()}")
             
             # Trigger a rerun to update the UI
-            st.experimental_rerun()
+            st.rerun()
 
         except ValueError as ve:
             st.error(f"Failed to offer service. Invalid input. Error: {ve}")
@@ -41,11 +47,16 @@ def initiate_withdrawal_request():
 
     address = st.text_input("Enter Withdrawer Account Address:")
     
-    # Retrieve all service requests
-    service_request_filter = contract.events.ServiceOffered.createFilter(fromBlock="latest")
-    service_requests = [entry['args'] for entry in service_request_filter.get_all_entries() if entry['args']['status'] == 1]  # 1 corresponds to RequestStatus.ServiceOffered
     amount = st.number_input("Enter amount in wei:", min_value=0, step=1)
-    request_id = st.selectbox("Select Request ID:", ["0x" + entry['requestId'].hex() for entry in service_requests], key=f"select_request_{address}")
+
+    # Every request with a service offered, from the live event store; until it has caught up the ID is typed in
+    store = live_events()
+    if store.ready:
+        _, offered = store.query(SERVICE_OFFERED)
+        labels = {"0x" + request_id.hex(): f"Job {job_number}: 0x{request_id.hex()}" for request_id, job_number in zip(offered["request_id"], offered["job_number"])}
+        request_id = st.selectbox("Select Request ID:", list(labels), format_func=labels.get, key=f"select_request_{address}")
+    else:
+        request_id = st.text_input("Enter Request ID:", key=f"enter_request_{address}")
     
     initiate_button = st.button("Initiate Withdrawal Request")
 
@@ -53,12 +64,13 @@ def initiate_withdrawal_request():
         try:
             with st.spinner("Initiating withdrawal request..."):
                 # Call the contract function to initiate the withdrawal request
-                tx_hash = contract.functions.initiateWithdrawalRequest(request_id, amount).transact({'from': address})
+                tx_hash = submitter.transact(contract.functions.initiateWithdrawalRequest(request_id, amount), {'from': address})
+                track_transaction(tx_hash, f"Withdrawal request of {amount} wei")
             
-            st.success(f"Withdrawal request initiated! Transaction Hash: {tx_hash.hex()}")
+            st.info(f"Withdrawal request submitted. Its status is shown in the sidebar. Transaction Hash: {tx_hash.hex()}")
             
             # Trigger a rerun to update the UI
-            st.experimental_rerun()
+            st.rerun()
 
         except ValueError as ve:
             st.error(f"Failed to initiate withdrawal request. Invalid input. Error: {ve}")
@@ -68,30 +80,74 @@ def initiate_withdrawal_request():
             st.error(f"Failed to initiate withdrawal request. Unknown error. Error: {e}")
 
 
-def display_service_offered():
-    st.subheader("Offer Requests Viewer")
+# Reads made by initiate_withdrawal_request, for the page prefetch; its requests come from the live event store
+def initiate_withdrawal_request_reads():
+    return []
 
-    requests = contract.functions.getBookingRequests().call()
+# Reads made by display_service_offered, for the page prefetch
+def display_service_offered_reads():
+    return requests_page_reads(SERVICE_OFFERED, "service_offered_page")
 
-    pending_requests = []
+def display_service_offered():
+    display_requests_viewer("Offer Requests Viewer", SERVICE_OFFERED, "service_offered_page", "No offered services.")
+
+# Reads made by claim_settlements, for the page prefetch
+def claim_settlements_reads():
+    return settlement_reads()
+
+# Function for claimants to pull the withdrawals approved in committed settlements
+def claim_settlements():
+    st.subheader("Claim Settled Withdrawals")
+
+    address = st.text_input("Enter Claimant Account Address:", key="claim_claimant")
+    if not address:
+        st.write("----")
+        return
+
+    # The claimant's claims in every committed settlement
+    claims = [
+        (period, tree, claim)
+        for period, tree in saved_settlements() if period
+        for claim in tree.claimant_claims(address)
+    ]
+
+    # Only requests still waiting for approval can be claimed; the rest were paid already
+    requests = cached_batch_call(*[contract.functions.requests(request_id) for _, _, (request_id, _, _) in claims]) if claims else []
+    options = {}
+    for (period, tree, (request_id, claimant, amount)), request in zip(claims, requests):
+        if request[3] == WAITING_FOR_APPROVAL:
+            options["0x" + request_id.hex()] = (tree, request_id, f"Period {period}: job {request[2]}, {amount} wei")
+
+    if not options:
+        st.write("No settled withdrawals to claim.")
+        st.write("----")
+        return
+
+    select_all = st.checkbox("Select all settled withdrawals", key="claim_all")
+    selected_request_ids = st.multiselect(
+        "Select Settled Withdrawals:",
+        list(options),
+        default=list(options) if select_all else [],
+        format_func=lambda request_id: options[request_id][2],
+    )
+
+    claim_button = st.button("Claim Selected Withdrawals")
+
+    if claim_button and selected_request_ids:
+        try:
+            with st.spinner("Claiming withdrawals..."):
+                # One claim per request, each checked against its settlement's root with its proof
+                for request_id in selected_request_ids:
+                    tree, raw_request_id, label = options[request_id]
+                    tx_hash = submitter.transact(contract.functions.claim(tree.root, raw_request_id, tree.proof(raw_request_id)), {'from': address})
+                    track_transaction(tx_hash, f"Claim {label}")
 
-    for request in requests:
-        job_number, participant_address, amount, participant_unique_id, service_description, status = request
+            st.info(f"{len(selected_request_ids)} claims submitted. Their status is shown in the sidebar.")
 
-        # Only display requests with status 0
-        if status == 1:
-            pending_requests.append({
-                "Job Number": job_number,
-                "Participant Address": participant_address,
-                "Service Description": service_description,
-                "Amount": amount,
-                "Status:" : "Service Offerred"
-            })      
-    
-    # Display the table if there are pending requests
-    if pending_requests:
-        st.table(pending_requests)
-    else:
-        st.write("No pending booking requests.")  
-
-    st.write("----")    
+        except ValueError as ve:
+            st.error(f"Failed to claim withdrawals. Invalid input. Error: {ve}")
+        except TimeoutError as te:
+            st.error(f"Failed to claim withdrawals. Transaction timed out. Error: {te}")
+        except Exception as e:
+            st.error(f"Failed to claim withdrawals. Unknown error. Error: {e}")
+    st.write("----")
@@ -0,0 +1,188 @@
+# Import libraries
+import numpy as np
+
+# Status of a row whose request was taken out again by a reorg
+REMOVED = -1
+
+# Account a request carries until a withdrawal is requested for it
+NO_CLAIMANT = "0x0000000000000000000000000000000000000000"
+
+# Columns kept per request and their types; amounts and job numbers fit the contract's uint64 and uint32.
+# Participants and claimants are codes into one table of the addresses seen.
+COLUMN_TYPES = {
+    "participant": np.int32,
+    "claimant": np.int32,
+    "amount": np.uint64,
+    "job_number": np.uint32,
+    "status": np.int8,
+    "service_category": np.uint8,
+}
+
+# Columns requests can be sorted by
+SORT_COLUMNS = ("job_number", "amount")
+
+# Rows added since the sorted id index was last merged before they are merged into it
+INDEX_MERGE_ROWS = 4096
+
+
+class RequestColumns:
+    """Booking requests stored column by column in growable numpy arrays.
+
+    Each request takes one row: its 32 byte id, codes for its participant
+    and claimant (addresses are kept once each), amount, job number, status
+    and service category, 54 bytes of columns. Rows are updated in place as
+    events arrive and never move. A request's row is found by binary search
+    over an index of the rows sorted by id, 8 bytes more per request; rows
+    added since the index was last merged are looked up in a small dict.
+    Measured with ``benchmarks/request_store.py``, 400,000 requests take
+    80 bytes each with 1,000 participants, against 278 in a dict of
+    ``Request`` tuples, and 143 against 300 with 100,000 participants,
+    where the address table is most of it. Filtering, sorting and paging
+    are vectorized over the columns, and only the rows of the page asked
+    for are turned back into Python values. Not thread-safe; the live event
+    store guards it with its lock.
+    """
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.count = 0
+        # Rows 0 up to len(self._order), sorted by request id
+        self._order = np.zeros(0, np.intp)
+        # request id -> row of the rows added since
+        self._recent = {}
+        self._participants = []
+        self._participant_codes = {}
+        self.request_id = np.zeros(capacity, "S32")
+        for name, dtype in COLUMN_TYPES.items():
+            setattr(self, name, np.zeros(capacity, dtype))
+
+    def upsert(self, request_id, request):
+        """Store a contract ``Request`` record under its id, adding a row for new requests."""
+        # Records read from the contract also carry their settlement period, which the store does not keep
+        requester, amount, job_number, status, service_category, _, claimant = request[:7]
+        row = self._row(request_id)
+        if row is None:
+            if self.size == len(self.status):
+                self._grow()
+            row = self._recent[request_id] = self.size
+            self.size += 1
+            self.request_id[row] = request_id
+            self.status[row] = REMOVED
+            if len(self._recent) >= INDEX_MERGE_ROWS:
+                self._merge_index()
+        if self.status[row] == REMOVED:
+            self.count += 1
+
+        self.participant[row] = self._participant_code(requester)
+        self.claimant[row] = self._participant_code(claimant)
+        self.amount[row] = amount
+        self.job_number[row] = job_number
+        self.status[row] = status
+        self.service_category[row] = service_category
+
+    def get(self, request_id):
+        """Return the request stored under ``request_id`` as a contract ``Request`` record, or None."""
+        row = self._row(request_id)
+        if row is None or self.status[row] == REMOVED:
+            return None
+        return page_requests(self._page(np.array([row])))[1][0]
+
+    def discard(self, request_id):
+        """Take a request out; its row is kept for when the request comes back."""
+        row = self._row(request_id)
+        if row is not None and self.status[row] != REMOVED:
+            self.status[row] = REMOVED
+            self.count -= 1
+
+    def query(self, status=None, participant=None, min_amount=None, max_amount=None, sort_by="job_number", descending=False, offset=0, limit=None):
+        """Return ``(total, page)`` of the requests matching every filter given.
+
+        ``page`` holds one list or array per column for the rows from
+        ``offset`` up to ``limit`` of them, in ``sort_by`` order.
+        """
+        if sort_by not in SORT_COLUMNS:
+            raise ValueError(f"Requests can only be sorted by {', '.join(SORT_COLUMNS)}")
+        statuses = self.status[:self.size]
+        mask = statuses != REMOVED if status is None else statuses == status
+        if participant is not None:
+            code = self._participant_codes.get(participant.lower())
+            if code is None:
+                return 0, self._page(np.zeros(0, np.intp))
+            mask &= self.participant[:self.size] == code
+        if min_amount is not None:
+            mask &= self.amount[:self.size] >= min_amount
+        if max_amount is not None:
+            mask &= self.amount[:self.size] <= max_amount
+
+        rows = np.flatnonzero(mask)
+        order = np.argsort(getattr(self, sort_by)[rows], kind="stable")
+        if descending:
+            order = order[::-1]
+        end = len(rows) if limit is None else offset + limit
+        return len(rows), self._page(rows[order[offset:end]])
+
+    def _page(self, rows):
+        # Reading ids through tobytes keeps their trailing zero bytes, which numpy strips from "S32" items
+        ids = self.request_id[rows].tobytes()
+        return {
+            "request_id": [ids[start:start + 32] for start in range(0, len(ids), 32)],
+            "participant": [self._participants[code] for code in self.participant[rows]],
+            "claimant": [self._participants[code] for code in self.claimant[rows]],
+            **{name: getattr(self, name)[rows] for name in COLUMN_TYPES if name not in ("participant", "claimant")},
+        }
+
+    def _row(self, request_id):
+        row = self._recent.get(request_id)
+        if row is not None or not len(self._order):
+            return row
+        key = np.array(request_id, "S32")
+        ids = self.request_id[:len(self._order)]
+        position = ids.searchsorted(key, sorter=self._order)
+        if position < len(self._order) and ids[self._order[position]] == key:
+            return int(self._order[position])
+        return None
+
+    def _merge_index(self):
+        # Insert the recent rows into the sorted index at their places, in one pass over it
+        rows = np.fromiter(self._recent.values(), np.intp, len(self._recent))
+        rows = rows[np.argsort(self.request_id[rows], kind="stable")]
+        positions = self.request_id[:len(self._order)].searchsorted(self.request_id[rows], sorter=self._order)
+        self._order = np.insert(self._order, positions, rows)
+        self._recent.clear()
+
+    def _participant_code(self, address):
+        key = address.lower()
+        code = self._participant_codes.get(key)
+        if code is None:
+            code = self._participant_codes[key] = len(self._participants)
+            self._participants.append(address)
+        return code
+
+    def _grow(self):
+        # Double every column, so appending stays amortized O(1)
+        for name in ("request_id", *COLUMN_TYPES):
+            column = getattr(self, name)
+            setattr(self, name, np.concatenate([column, np.zeros_like(column)]))
+
+
+def page_requests(page):
+    """Turn a page of columns back into ``(request_ids, requests)`` shaped like the contract's records."""
+    requests = [
+        (participant, int(amount), int(job_number), int(status), int(service_category), 0, claimant)
+        for participant, amount, job_number, status, service_category, claimant
+        in zip(page["participant"], page["amount"], page["job_number"], page["status"], page["service_category"], page["claimant"])
+    ]
+    return page["request_id"], requests
+
+
+def requests_page_columns(request_ids, requests):
+    """Lay out ``(request_ids, requests)`` read from the contract as a page of columns."""
+    return {
+        "request_id": [bytes(request_id) for request_id in request_ids],
+        "participant": [request[0] for request in requests],
+        "claimant": [request[6] for request in requests],
+        "amount": np.array([request[1] for request in requests], np.uint64),
+        "job_number": np.array([request[2] for request in requests], np.uint32),
+        "status": np.array([request[3] for request in requests], np.int8),
+        "service_category": np.array([request[4] for request in requests], np.uint8),
+    }
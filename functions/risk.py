@@ -0,0 +1,202 @@
+# Import libraries
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+# Blocks after which a claimant's recent claim count has halved
+VELOCITY_HALF_LIFE = int(os.getenv("RISK_VELOCITY_HALF_LIFE", "7200"))
+
+# A claimant is flagged once its recent claims exceed this multiple of the average claimant's
+VELOCITY_FACTOR = float(os.getenv("RISK_VELOCITY_FACTOR", "5"))
+
+# Recent claims below which no claimant is flagged for velocity
+VELOCITY_MIN_CLAIMS = float(os.getenv("RISK_VELOCITY_MIN_CLAIMS", "10"))
+
+# Blocks within which the same claimant claiming the same amount from the same participant is a repeat
+REPEAT_WINDOW = int(os.getenv("RISK_REPEAT_WINDOW", "7200"))
+
+# Blocks behind the newest claim a claim can still be removed by a reorg, as in the live event store
+REORG_DEPTH = int(os.getenv("SUBSCRIBER_REORG_DEPTH", "64"))
+
+# Requests and accounts whose state is kept; the least recently seen are dropped first
+MAX_TRACKED_REQUESTS = int(os.getenv("RISK_MAX_TRACKED_REQUESTS", "1000000"))
+MAX_TRACKED_ACCOUNTS = int(os.getenv("RISK_MAX_TRACKED_ACCOUNTS", "100000"))
+
+# Flags raised on a withdrawal request and how much each adds to its score
+OVER_BOOKED = "Claim above booked amount"
+HIGH_VELOCITY = "Unusual claim velocity"
+REPEATED_CLAIM = "Repeated claim"
+NOT_OFFERING_PROVIDER = "Claimant did not offer the service"
+FLAG_WEIGHTS = {OVER_BOOKED: 0.6, HIGH_VELOCITY: 0.3, REPEATED_CLAIM: 0.4, NOT_OFFERING_PROVIDER: 0.3}
+
+RiskAssessment = namedtuple("RiskAssessment", ["score", "flags"])
+
+
+def request_key(request_id):
+    """Key requests by their 0x-prefixed lowercase hex id, whichever form the event carried."""
+    if isinstance(request_id, str):
+        return request_id.lower()
+    return "0x" + bytes(request_id).hex()
+
+
+def _touch(table, key, limit, default):
+    # Least-recently-used bounded table: fetch or create ``key`` and evict the oldest entry past ``limit``
+    state = table.get(key)
+    if state is None:
+        state = table[key] = default
+        if len(table) > limit:
+            table.popitem(last=False)
+    else:
+        table.move_to_end(key)
+    return state
+
+
+def _remember(table, key, value, limit):
+    # Replace ``key``'s value in a least-recently-used bounded table
+    table[key] = value
+    table.move_to_end(key)
+    if len(table) > limit:
+        table.popitem(last=False)
+
+
+class RiskScorer:
+    """Scores withdrawal requests as the contract events stream past, in bounded memory.
+
+    ``ServiceBooked`` and ``ServiceOffered`` record what each request was
+    booked for and who offered it. Each ``WithdrawalRequestInitiated`` is
+    then checked against that, against its claimant's recent claim rate
+    (an exponentially decayed count, compared with the decayed average over
+    all claimants) and against the last claim on the same participant.
+    Every check touches a fixed amount of state per request, claimant and
+    participant, and each table drops its least recently seen entries past
+    its limit. Block numbers serve as the clock. Claims within
+    ``reorg_depth`` blocks of the newest one keep what they changed, so
+    ``forget`` can take a claim a reorg removed back out of every table, and
+    the same claim mined again is not counted twice.
+    """
+
+    def __init__(self, velocity_half_life=VELOCITY_HALF_LIFE, velocity_factor=VELOCITY_FACTOR, velocity_min_claims=VELOCITY_MIN_CLAIMS,
+                 repeat_window=REPEAT_WINDOW, max_requests=MAX_TRACKED_REQUESTS, max_accounts=MAX_TRACKED_ACCOUNTS, reorg_depth=REORG_DEPTH):
+        self.velocity_half_life = velocity_half_life
+        self.velocity_factor = velocity_factor
+        self.velocity_min_claims = velocity_min_claims
+        self.repeat_window = repeat_window
+        self.max_requests = max_requests
+        self.max_accounts = max_accounts
+        self.reorg_depth = reorg_depth
+        self._lock = threading.Lock()
+
+        # request -> [participant, booked amount, offering provider, claims, assessment]
+        self._requests = OrderedDict()
+        # claimant -> [decayed claim count, block of last claim]
+        self._claimants = OrderedDict()
+        # participant -> (claimant, amount, block) of the last claim against them
+        self._participants = OrderedDict()
+        # Decayed claim count over every claimant, for the average rate
+        self._all_claims = [0.0, 0]
+        # log key -> what a recent claim changed, oldest first, so a reorg can undo it
+        self._recent_claims = OrderedDict()
+
+    def observe(self, event, args, block_number, key=None):
+        """Feed one decoded contract event; returns the new assessment for withdrawal requests.
+
+        ``key`` identifies the event's log, for ``forget``.
+        """
+        with self._lock:
+            if event == "ServiceBooked":
+                request = _touch(self._requests, request_key(args["requestId"]), self.max_requests, [None, 0, None, 0, None])
+                request[0], request[1] = args["participant"].lower(), args["amount"]
+            elif event == "ServiceOffered":
+                request = _touch(self._requests, request_key(args["requestId"]), self.max_requests, [None, 0, None, 0, None])
+                request[2] = args["serviceProvider"].lower()
+            elif event == "WithdrawalRequestInitiated":
+                return self._score_claim(request_key(args["requestId"]), args["recipient"].lower(), args["amount"], block_number, key)
+            return None
+
+    def forget(self, key):
+        """Undo the claim logged under ``key``, which a reorg removed from the chain."""
+        with self._lock:
+            undo = self._recent_claims.pop(key, None)
+            if undo is None:
+                return
+            request_id, assessment, participant, last_claim, claim, new_claimant = undo
+            claimant, _, block_number = claim
+
+            request = self._requests.get(request_id)
+            if request is not None:
+                request[3] = max(request[3] - 1, 0)
+                request[4] = assessment
+            if participant is not None and self._participants.get(participant) == claim:
+                if last_claim is None:
+                    del self._participants[participant]
+                else:
+                    self._participants[participant] = last_claim
+
+            # Decayed counts are sums, so the claim's own decayed contribution comes straight back off
+            velocity = self._claimants.get(claimant)
+            if velocity is not None:
+                velocity[0] -= self._decay(1, velocity[1] - block_number)
+                if new_claimant and velocity[0] < 1e-9:
+                    del self._claimants[claimant]
+            self._all_claims[0] = max(self._all_claims[0] - self._decay(1, self._all_claims[1] - block_number), 0.0)
+
+    def assessment(self, request_id):
+        """Return the latest ``RiskAssessment`` of a withdrawal request, or None if it has none."""
+        with self._lock:
+            request = self._requests.get(request_key(request_id))
+        return request[4] if request is not None else None
+
+    def _score_claim(self, request_id, claimant, amount, block_number, key):
+        request = _touch(self._requests, request_id, self.max_requests, [None, 0, None, 0, None])
+        participant, booked_amount, provider, claims = request[:4]
+        flags = []
+        if key is not None:
+            self._recent_claims[key] = (request_id, request[4], participant, self._participants.get(participant),
+                                        (claimant, amount, block_number), claimant not in self._claimants)
+            # Claims too deep for a reorg can no longer be undone
+            while next(iter(self._recent_claims.values()))[4][2] < block_number - self.reorg_depth:
+                self._recent_claims.popitem(last=False)
+
+        if participant is not None and amount > booked_amount:
+            flags.append(OVER_BOOKED)
+        if provider is not None and claimant not in (provider, participant):
+            flags.append(NOT_OFFERING_PROVIDER)
+        if claims:
+            flags.append(REPEATED_CLAIM)
+        request[3] = claims + 1
+
+        # Claims against the same participant by the same claimant for the same amount
+        if participant is not None:
+            last_claim = self._participants.get(participant)
+            if (last_claim is not None and last_claim[:2] == (claimant, amount)
+                    and block_number - last_claim[2] <= self.repeat_window and REPEATED_CLAIM not in flags):
+                flags.append(REPEATED_CLAIM)
+            _remember(self._participants, participant, (claimant, amount, block_number), self.max_accounts)
+
+        # The claimant's decayed claim count against the decayed average per claimant
+        velocity = _touch(self._claimants, claimant, self.max_accounts, [0.0, block_number])
+        velocity[0] = self._decay(velocity[0], block_number - velocity[1]) + 1
+        velocity[1] = block_number
+        self._all_claims[0] = self._decay(self._all_claims[0], block_number - self._all_claims[1]) + 1
+        self._all_claims[1] = block_number
+        average = self._all_claims[0] / len(self._claimants)
+        if velocity[0] >= self.velocity_min_claims and velocity[0] > self.velocity_factor * average:
+            flags.append(HIGH_VELOCITY)
+
+        request[4] = RiskAssessment(min(1.0, sum(FLAG_WEIGHTS[flag] for flag in flags)), tuple(flags))
+        return request[4]
+
+    def _decay(self, count, blocks):
+        return count * 0.5 ** (max(blocks, 0) / self.velocity_half_life)
+
+
+# Scorer fed by the live event subscriber, shared by every session of the app
+risk_scorer = RiskScorer()
+
+
+# Function to describe a withdrawal request's risk for the viewers
+def describe_risk(request_id):
+    assessment = risk_scorer.assessment(request_id)
+    if assessment is None or not assessment.flags:
+        return ""
+    return f"{assessment.score:.0%}: " + ", ".join(assessment.flags)
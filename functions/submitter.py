@@ -0,0 +1,221 @@
+# Import libraries
+import os
+import time
+import threading
+
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+
+# Import function from contract
+from functions.contract import w3
+from functions.gas import gas_oracle_for
+
+# Headroom added on top of cached gas estimates
+GAS_MARGIN = float(os.getenv("GAS_MARGIN", "1.2"))
+
+# Times a send is retried after the node rejects its nonce
+NONCE_RETRIES = 3
+
+# Node error messages meaning our local nonce no longer matches the node's
+NONCE_ERRORS = ("nonce too low", "nonce too high", "already known", "replacement transaction underpriced", "invalid nonce", "invalid transaction nonce")
+
+
+class NonceManager:
+    """Hands out nonces per sender locally, so transactions can be sent back to back.
+
+    The first nonce of each sender comes from the node's pending transaction
+    count; after that nonces are counted up locally without asking the node.
+    ``resync`` goes back to the node when a send fails or a transaction is
+    dropped or replaced.
+    """
+
+    def __init__(self, web3=None):
+        self.w3 = web3 or w3
+        self._lock = threading.Lock()
+        self._next = {}
+
+    def reserve(self, sender):
+        # The same account may arrive lowercased or checksummed; both must share one counter
+        sender = Web3.toChecksumAddress(sender)
+        with self._lock:
+            if sender not in self._next:
+                self._next[sender] = self.w3.eth.get_transaction_count(sender, "pending")
+            nonce = self._next[sender]
+            self._next[sender] = nonce + 1
+            return nonce
+
+    def resync(self, sender):
+        sender = Web3.toChecksumAddress(sender)
+        with self._lock:
+            self._next[sender] = self.w3.eth.get_transaction_count(sender, "pending")
+            return self._next[sender]
+
+
+class PendingTransaction:
+    """A transaction we sent and have not seen mined yet."""
+
+    def __init__(self, sender, nonce, transaction, raw_transaction=None):
+        self.sender = sender
+        self.nonce = nonce
+        self.transaction = transaction
+        self.raw_transaction = raw_transaction
+        self.sent_at = time.monotonic()
+
+
+class TransactionSubmitter:
+    """Signs and sends many transactions back to back without waiting on the node in between.
+
+    Nonces come from a local ``NonceManager``, fees from the gas oracle's
+    in-memory quotes and, for bulk sends, gas estimates are cached per
+    contract function (selector and calldata length), so after the first
+    transaction of a kind a send is a single request. Single sends estimate
+    gas every time, which also surfaces revert reasons before sending.
+    Transactions from ``account`` are signed locally and sent raw; others are
+    signed by the node through ``eth_sendTransaction``. ``wait_for_receipts``
+    re-sends transactions the node dropped and reports those whose nonce was
+    taken by another one.
+    """
+
+    def __init__(self, web3=None, gas_margin=GAS_MARGIN):
+        self.w3 = web3 or w3
+        self.gas_margin = gas_margin
+        self.nonces = NonceManager(self.w3)
+        self.pending = {}
+        self._lock = threading.Lock()
+        self._gas_estimates = {}
+        self.gas_oracle = gas_oracle_for(self.w3)
+        self._chain_id = None
+
+    def transact(self, contract_function, transaction, account=None, cache_gas=False):
+        """Send a contract call like ``contract_function.transact(transaction)`` and return its hash."""
+        transaction = dict(transaction)
+        transaction["to"] = contract_function.address
+        transaction["data"] = contract_function._encode_transaction_data()
+        return self.send(transaction, account, cache_gas)
+
+    def send(self, transaction, account=None, cache_gas=False, speed="medium"):
+        """Fill in nonce, gas and fees locally, send the transaction and return its hash."""
+        transaction = dict(transaction)
+        sender = account.address if account is not None else transaction["from"]
+        transaction["from"] = sender
+        transaction.setdefault("value", 0)
+        if "gas" not in transaction:
+            transaction["gas"] = self.estimate_gas(transaction, cache_gas)
+        if "gasPrice" not in transaction and "maxFeePerGas" not in transaction:
+            transaction.update(self.gas_oracle.suggest(speed))
+
+        for attempt in range(NONCE_RETRIES + 1):
+            transaction["nonce"] = self.nonces.reserve(sender)
+            try:
+                return self._send_with_nonce(transaction, account)
+            except Exception as e:
+                # Nodes report RPC errors as ValueError and dev chains as their own
+                # exception types; the nonce is only spent if the node accepted it
+                self.nonces.resync(sender)
+                if attempt == NONCE_RETRIES or not any(message in str(e).lower() for message in NONCE_ERRORS):
+                    raise
+
+    def submit_many(self, calls, account=None):
+        """Send ``(contract_function, transaction)`` pairs back to back and return their hashes."""
+        return [self.transact(contract_function, transaction, account, cache_gas=True) for contract_function, transaction in calls]
+
+    def estimate_gas(self, transaction, cached=True):
+        """Return a gas estimate, shared by transactions calling the same function when ``cached``."""
+        data = transaction.get("data") or "0x"
+        key = (transaction.get("to"), data[:10], len(data))
+        if not cached or key not in self._gas_estimates:
+            estimate = self.w3.eth.estimate_gas({
+                field: transaction[field] for field in ("from", "to", "value", "data") if field in transaction
+            })
+            if not cached:
+                return estimate
+            self._gas_estimates[key] = int(estimate * self.gas_margin)
+        return self._gas_estimates[key]
+
+    def wait_for_receipts(self, tx_hashes, timeout=120, poll_interval=0.5, resend_after=30):
+        """Wait for the transactions to be mined, recovering dropped ones.
+
+        Returns a dict of tx hash to receipt. Transactions whose nonce was
+        mined by a different transaction map to ``None``.
+        """
+        remaining = [Web3.toHex(tx_hash) for tx_hash in tx_hashes]
+        receipts = {}
+        deadline = time.monotonic() + timeout
+
+        while remaining:
+            still_pending = []
+            for tx_hash in remaining:
+                try:
+                    receipts[tx_hash] = self.w3.eth.get_transaction_receipt(tx_hash)
+                except TransactionNotFound:
+                    if not self._recover(tx_hash, resend_after):
+                        receipts[tx_hash] = None
+                        continue
+                    still_pending.append(tx_hash)
+                    continue
+                with self._lock:
+                    self.pending.pop(tx_hash, None)
+            remaining = still_pending
+
+            if remaining:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"{len(remaining)} transactions not mined after {timeout} seconds")
+                time.sleep(poll_interval)
+        return receipts
+
+    def _send_with_nonce(self, transaction, account):
+        if account is not None:
+            signable = {key: value for key, value in transaction.items() if key != "from"}
+            signable["chainId"] = self._chain_id_cached()
+            signed = account.sign_transaction(signable)
+            tx_hash = self.w3.eth.send_raw_transaction(signed.rawTransaction)
+            raw_transaction = signed.rawTransaction
+        else:
+            tx_hash = self.w3.eth.send_transaction(transaction)
+            raw_transaction = None
+
+        with self._lock:
+            self.pending[Web3.toHex(tx_hash)] = PendingTransaction(transaction["from"], transaction["nonce"], transaction, raw_transaction)
+        return tx_hash
+
+    def _recover(self, tx_hash, resend_after):
+        # Returns False once another transaction has taken this one's nonce, True while it may still be mined
+        with self._lock:
+            pending = self.pending.get(tx_hash)
+        if pending is None or time.monotonic() - pending.sent_at < resend_after:
+            return True
+        if self.w3.eth.get_transaction_count(pending.sender, "latest") > pending.nonce:
+            try:
+                # Mined since the caller looked for its receipt; the next poll returns it
+                self.w3.eth.get_transaction_receipt(tx_hash)
+                return True
+            except TransactionNotFound:
+                pass
+            # The nonce was mined by a replacement; later local nonces are still valid
+            with self._lock:
+                self.pending.pop(tx_hash, None)
+            return False
+
+        try:
+            self.w3.eth.get_transaction(tx_hash)
+            pending.sent_at = time.monotonic()
+            return True
+        except TransactionNotFound:
+            pass
+
+        # Dropped from the mempool: send the same transaction again with its nonce
+        if pending.raw_transaction is not None:
+            self.w3.eth.send_raw_transaction(pending.raw_transaction)
+        else:
+            self.w3.eth.send_transaction(pending.transaction)
+        pending.sent_at = time.monotonic()
+        return True
+
+    def _chain_id_cached(self):
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+        return self._chain_id
+
+
+# Submitter shared by every session of the app, so nonces stay consistent
+submitter = TransactionSubmitter()
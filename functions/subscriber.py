@@ -0,0 +1,357 @@
+# Import libraries
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+
+import websockets
+import streamlit as st
+from hexbytes import HexBytes
+
+# Import function from contract
+from functions.contract import w3, connect_to_contract
+from functions.indexer import INDEXED_EVENTS, get_indexer
+from functions.decoder import log_decoder, get_raw_logs
+from functions.instrumentation import record_event_latency, record_subscriber_state
+from functions.risk import risk_scorer
+from functions.request_store import RequestColumns, page_requests, NO_CLAIMANT
+
+# Websocket endpoint for eth_subscribe; without one the subscriber polls a log filter
+WEB3_WS_PROVIDER_URI = os.getenv("WEB3_WS_PROVIDER_URI")
+
+# Seconds between eth_getFilterChanges polls when there is no websocket endpoint
+SUBSCRIBER_POLL_INTERVAL = float(os.getenv("SUBSCRIBER_POLL_INTERVAL", "1.0"))
+
+# Seconds before a lost subscription or filter is set up again
+SUBSCRIBER_RETRY_INTERVAL = 5.0
+
+# Seconds between a page's checks for new contract events
+LIVE_UPDATE_INTERVAL = float(os.getenv("LIVE_UPDATE_INTERVAL", "1.0"))
+
+# Number of live events whose arrival time is kept for the event-to-screen latency
+RECENT_EVENTS = 1000
+
+# Blocks behind the newest event a log can still be removed by a reorg; older events are kept only in the requests they built
+SUBSCRIBER_REORG_DEPTH = int(os.getenv("SUBSCRIBER_REORG_DEPTH", "64"))
+
+logger = logging.getLogger(__name__)
+
+
+class LiveEventStore:
+    """In-memory view of every booking request, kept current from contract events.
+
+    Each request is built from its events: ``ServiceBooked`` creates it,
+    ``WithdrawalRequestInitiated`` sets its claimant and claimed amount, and
+    every later event moves it to the status it carries. The requests
+    themselves live in a columnar ``RequestColumns`` table, which serves
+    filtered, sorted pages; ``requests_page`` hands them out in the same
+    shape as the contract's ``Request`` records, so viewers render them
+    with ``describe_request`` either way. Logs removed by a reorg are taken
+    out again, as long as they are within ``reorg_depth`` blocks of the
+    newest event: only those events are kept, with the record of each
+    request they touch from before them, so memory does not grow with the
+    chain's history. Every new event is also handed to ``listeners``, e.g.
+    the risk scorer, as ``listener(name, args, block_number, key)``, and the
+    key of every log a reorg removes to ``removal_listeners``.
+    """
+
+    def __init__(self, listeners=(), reorg_depth=SUBSCRIBER_REORG_DEPTH, removal_listeners=()):
+        self.ready = False
+        self.version = 0
+        self.reorg_depth = reorg_depth
+        # Last block whose logs are all in the store
+        self.last_block = -1
+        self._changed = threading.Condition()
+        self._columns = RequestColumns()
+        # Newest block of any event applied
+        self._head = -1
+        # (block number, log key, request id, status, booked Request record, or (claimant, amount) of a claim,
+        # or None) of every event within reorg_depth blocks of the head, in the order they were applied
+        self._recent = deque()
+        # request id -> its recent events, and its Request record (or None) from before them
+        self._pending = {}
+        self._base = {}
+        # log key -> recent event, so repeated logs are ignored and reorged ones found
+        self._seen = {}
+        self._received = deque(maxlen=RECENT_EVENTS)
+        self._listeners = list(listeners)
+        self._removal_listeners = list(removal_listeners)
+
+    def apply(self, name, args, block_number, key=None, live=False):
+        """Add one decoded event; ``key`` identifies a log so repeats are ignored and a reorg can remove it."""
+        with self._changed:
+            if key is not None and key in self._seen:
+                return
+            request_id = bytes(HexBytes(args["requestId"])) if "requestId" in args else None
+            change = None
+            if name == "ServiceBooked":
+                change = (args["participant"], args["amount"], args["jobNumber"], args["status"], args["serviceCategory"], 0, NO_CLAIMANT)
+            elif name == "WithdrawalRequestInitiated":
+                change = (args["recipient"], args["amount"])
+            event = (block_number, key, request_id, args.get("status"), change)
+            self._recent.append(event)
+            if key is not None:
+                self._seen[key] = event
+            if request_id is not None:
+                if request_id not in self._pending:
+                    self._base[request_id] = self._columns.get(request_id)
+                    self._pending[request_id] = []
+                self._pending[request_id].append(event)
+                self._rebuild(request_id)
+            self._head = max(self._head, block_number)
+            self._forget_settled_events()
+            for listener in self._listeners:
+                listener(name, args, block_number, key)
+            self._bump(live)
+
+    def remove(self, key):
+        """Take out a log the chain no longer contains."""
+        with self._changed:
+            event = self._seen.pop(key, None)
+            if event is None:
+                return
+            request_id = event[2]
+            if request_id is not None:
+                self._pending[request_id].remove(event)
+                self._rebuild(request_id)
+                if not self._pending[request_id]:
+                    del self._pending[request_id], self._base[request_id]
+            for listener in self._removal_listeners:
+                listener(key)
+            self._bump(True)
+
+    def mark_ready(self, block_number):
+        with self._changed:
+            self.last_block = max(self.last_block, block_number)
+            self.ready = True
+            self._bump(False)
+
+    def query(self, status=None, participant=None, min_amount=None, max_amount=None, sort_by="job_number", descending=False, offset=0, limit=None):
+        """Return ``(total, page)`` of the matching requests as columns; see ``RequestColumns.query``."""
+        with self._changed:
+            return self._columns.query(status, participant, min_amount, max_amount, sort_by, descending, offset, limit)
+
+    def requests_page(self, status, offset=0, limit=None):
+        """Return ``(total, request_ids, requests)`` for one page of the requests in ``status``, by job number."""
+        total, page = self.query(status, offset=offset, limit=limit)
+        request_ids, requests = page_requests(page)
+        return total, request_ids, requests
+
+    def wait_for_change(self, version, timeout):
+        """Block until the store moves past ``version``; returns whether it did."""
+        with self._changed:
+            return self._changed.wait_for(lambda: self.version > version, timeout)
+
+    def received_between(self, after, until):
+        """Arrival times of the live events applied after version ``after`` up to ``until``."""
+        with self._changed:
+            return [received_at for event_version, received_at in self._received if after < event_version <= until]
+
+    def _rebuild(self, request_id):
+        request = fold_events(self._base[request_id], self._pending[request_id])
+        if request is None:
+            self._columns.discard(request_id)
+        else:
+            self._columns.upsert(request_id, request)
+
+    def _forget_settled_events(self):
+        # Fold events too deep for a reorg into their requests' base records and drop them
+        while self._recent and self._recent[0][0] < self._head - self.reorg_depth:
+            event = self._recent.popleft()
+            block_number, key, request_id = event[:3]
+            if key is not None:
+                if self._seen.get(key) is not event:
+                    # Already removed by a reorg
+                    continue
+                del self._seen[key]
+            if request_id is not None:
+                pending = self._pending[request_id]
+                pending.pop(0)
+                self._base[request_id] = fold_events(self._base[request_id], [event])
+                if not pending:
+                    del self._pending[request_id], self._base[request_id]
+
+    def _bump(self, live):
+        self.version += 1
+        if live:
+            self._received.append((self.version, time.monotonic()))
+        self._changed.notify_all()
+
+
+def fold_events(request, events):
+    """Apply ``(block number, key, request id, status, change)`` events in order to a ``Request`` record or None."""
+    for _, _, _, status, change in events:
+        if change is not None and len(change) > 2:
+            request = change
+        elif request is not None:
+            if change is not None:
+                # A claim replaces the booked amount, as it does on-chain
+                claimant, amount = change
+                request = request[:1] + (amount,) + request[2:6] + (claimant,)
+            if status is not None:
+                request = request[:3] + (status,) + request[4:]
+    return request
+
+
+class EventSubscriber:
+    """Streams new NDIS contract logs into a ``LiveEventStore`` on a background thread.
+
+    The store is first filled from the local event index. New logs then come
+    from a websocket ``eth_subscribe`` subscription, or, without a websocket
+    endpoint, from a log filter polled with ``eth_getFilterChanges``. Each
+    time the subscription or filter is (re)created, the blocks since the last
+    one seen are caught up with ``eth_getLogs``, so nothing is missed while
+    it was down.
+    """
+
+    def __init__(self, store, web3=None, contract=None, ws_uri=WEB3_WS_PROVIDER_URI, poll_interval=SUBSCRIBER_POLL_INTERVAL):
+        self.store = store
+        self.w3 = web3 or w3
+        self.contract = contract or connect_to_contract()
+        self.ws_uri = ws_uri
+        self.poll_interval = poll_interval
+        self._thread = None
+        self._topics = log_decoder.topics(INDEXED_EVENTS)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="event-subscriber", daemon=True)
+            self._thread.start()
+
+    def backfill(self, indexer):
+        """Fill the store from the event index up to its latest checkpoint."""
+        head = indexer.sync()
+        events = []
+        for name in INDEXED_EVENTS:
+            events += [(name, args) for args in indexer.events(name)]
+        # Replay in chain order so every request ends in its latest status; the keys match the streamed
+        # logs', so the catch-up skips logs the index already had and a reorg can remove them
+        for name, args in sorted(events, key=lambda event: (event[1]["blockNumber"], event[1]["logIndex"])):
+            self.store.apply(name, args, args["blockNumber"], (args["blockHash"], args["logIndex"]))
+        self.store.mark_ready(head)
+
+    def catch_up(self):
+        """Fetch the logs of every block since the last one in the store."""
+        head = self.w3.eth.block_number
+        if head > self.store.last_block:
+            for log in get_raw_logs(self.w3, self._log_filter(self.store.last_block + 1, head)):
+                self._apply_log(log)
+            self.store.mark_ready(head)
+
+    def _log_filter(self, from_block, to_block=None):
+        log_filter = {"address": self.contract.address, "fromBlock": from_block, "topics": [self._topics]}
+        if to_block is not None:
+            log_filter["toBlock"] = to_block
+        return log_filter
+
+    def _apply_log(self, log):
+        record = log_decoder.decode(log)
+        if record is None or record.event not in INDEXED_EVENTS:
+            return
+        key = (record.blockHash, record.logIndex)
+        if log.get("removed"):
+            self.store.remove(key)
+            return
+        self.store.apply(record.event, record.args, record.blockNumber, key, live=True)
+
+    def _run(self):
+        while True:
+            try:
+                if not self.store.ready:
+                    record_subscriber_state("backfilling from the event index")
+                    self.backfill(get_indexer())
+                if self.ws_uri:
+                    record_subscriber_state("subscribing")
+                    asyncio.run(self._subscribe())
+                else:
+                    record_subscriber_state("polling a log filter")
+                    self._poll_filter()
+            except Exception as e:
+                # Set the subscription up again; the catch-up covers the gap
+                logger.exception("Live event subscriber failed; retrying in %s s", SUBSCRIBER_RETRY_INTERVAL)
+                record_subscriber_state("retrying", e)
+                time.sleep(SUBSCRIBER_RETRY_INTERVAL)
+
+    def _poll_filter(self):
+        log_filter = self.w3.eth.filter(self._log_filter(self.store.last_block + 1))
+        try:
+            self.catch_up()
+            while True:
+                for log in self.w3.eth.get_filter_changes(log_filter.filter_id):
+                    self._apply_log(log)
+                time.sleep(self.poll_interval)
+        finally:
+            try:
+                self.w3.eth.uninstall_filter(log_filter.filter_id)
+            except Exception:
+                pass
+
+    async def _subscribe(self):
+        async with websockets.connect(self.ws_uri) as websocket:
+            await websocket.send(json.dumps({
+                "jsonrpc": "2.0",
+                "id": 1,
+                "method": "eth_subscribe",
+                "params": ["logs", {"address": self.contract.address, "topics": [self._topics]}],
+            }))
+            reply = json.loads(await websocket.recv())
+            if "error" in reply:
+                raise ValueError(reply["error"])
+            subscription = reply["result"]
+            record_subscriber_state("subscribed over websocket")
+
+            # Logs mined before the subscription started come from eth_getLogs
+            await asyncio.get_running_loop().run_in_executor(None, self.catch_up)
+            async for message in websocket:
+                params = json.loads(message).get("params", {})
+                if params.get("subscription") == subscription:
+                    self._apply_log(params["result"])
+
+
+_live_events = None
+_live_events_lock = threading.Lock()
+
+
+def live_events():
+    """Return the process-wide live event store, starting its subscriber on first use."""
+    global _live_events
+    with _live_events_lock:
+        if _live_events is None:
+            _live_events = LiveEventStore(listeners=[risk_scorer.observe], removal_listeners=[risk_scorer.forget])
+            EventSubscriber(_live_events).start()
+        return _live_events
+
+
+# Function to remember which store version this rerun renders
+def begin_live_render():
+    st.session_state["live_version"] = live_events().version
+
+
+# Function to rerun the page once new contract events arrive
+def follow_live_updates():
+    store = live_events()
+    version = st.session_state.get("live_version", 0)
+
+    # Time from each event's arrival to the rerun that put it on screen
+    rendered = st.session_state.get("live_rendered_version", version)
+    now = time.monotonic()
+    for received_at in store.received_between(rendered, version):
+        record_event_latency(now - received_at)
+    st.session_state["live_rendered_version"] = version
+
+    if not st.sidebar.checkbox("Live updates", value=True, key="live_updates"):
+        return
+
+    with st.sidebar:
+        check_live_updates()
+
+
+# Fragment checking the store on its own timer, so the script thread is free between checks
+@st.fragment(run_every=LIVE_UPDATE_INTERVAL)
+def check_live_updates():
+    if live_events().version > st.session_state.get("live_version", 0):
+        st.rerun()
+    st.caption("Waiting for new contract events...")
@@ -0,0 +1,211 @@
+# Import libraries
+import os
+import time
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+from hexbytes import HexBytes
+from web3 import HTTPProvider
+from web3.datastructures import AttributeDict
+from web3.exceptions import ContractLogicError, TransactionNotFound
+from web3._utils.method_formatters import receipt_formatter
+
+# Import function from contract
+from functions.contract import w3
+from functions.batch import batch_request
+from functions.cache import BlockCache, block_cache
+
+# Seconds between checks for a new block while transactions are pending
+TRACKER_POLL_INTERVAL = float(os.getenv("TRACKER_POLL_INTERVAL", "1.0"))
+
+# Seconds without a receipt before checking whether the node still knows a transaction
+DROPPED_AFTER = float(os.getenv("DROPPED_AFTER", "120"))
+
+# Number of finished transactions whose status is remembered
+FINISHED_HISTORY = 10000
+
+# Transaction statuses shown to the user
+PENDING_STATUS, MINED_STATUS, REVERTED_STATUS, DROPPED_STATUS = "Pending", "Mined", "Reverted", "Dropped"
+
+
+class TransactionTracker:
+    """Follows submitted transactions in a background thread until they are mined or dropped.
+
+    Once per new block, every pending hash is looked up in a single batched
+    JSON-RPC request of ``eth_getTransactionReceipt`` calls, together with an
+    ``eth_getTransactionByHash`` for transactions old enough to have been
+    dropped. Reverted transactions are replayed with ``eth_call`` to recover
+    the revert reason. Rendering only reads the statuses kept in memory.
+    """
+
+    def __init__(self, web3=None, poll_interval=TRACKER_POLL_INTERVAL):
+        self.w3 = web3 or w3
+        self.poll_interval = poll_interval
+        # The app's clients share the app's head; other chains (e.g. in benchmarks) follow their own
+        self.block_cache = block_cache if self.w3 is w3 else BlockCache(self.w3)
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._finished = OrderedDict()
+        self._last_polled_block = None
+        self._last_polled_at = 0.0
+        self._thread = None
+
+    def track(self, tx_hash):
+        """Start following a transaction; returns its hex hash."""
+        tx_hash = HexBytes(tx_hash).hex()
+        with self._lock:
+            if tx_hash not in self._finished:
+                self._pending[tx_hash] = time.monotonic()
+        self._start()
+        return tx_hash
+
+    def status(self, tx_hash):
+        """Return ``(status, detail)`` for a tracked transaction, without touching the node."""
+        tx_hash = HexBytes(tx_hash).hex()
+        with self._lock:
+            if tx_hash in self._finished:
+                status, detail, receipt = self._finished[tx_hash]
+                return status, detail
+        return PENDING_STATUS, ""
+
+    def receipt(self, tx_hash):
+        """Return the receipt of a mined (or reverted) transaction, or None while pending."""
+        with self._lock:
+            finished = self._finished.get(HexBytes(tx_hash).hex())
+        return finished[2] if finished else None
+
+    def poll(self):
+        """Look up every pending transaction in one batched request."""
+        with self._lock:
+            pending = dict(self._pending)
+        if not pending:
+            return
+
+        now = time.monotonic()
+        check_known = [tx_hash for tx_hash, tracked_at in pending.items() if now - tracked_at > DROPPED_AFTER]
+        receipts, known = self._lookup(list(pending), check_known)
+
+        for tx_hash, receipt in receipts.items():
+            if receipt is not None:
+                if receipt["status"] == 1:
+                    self._finish(tx_hash, MINED_STATUS, f"block {receipt['blockNumber']}", receipt)
+                else:
+                    self._finish(tx_hash, REVERTED_STATUS, self._revert_reason(tx_hash, receipt), receipt)
+            elif tx_hash in known and not known[tx_hash]:
+                self._finish(tx_hash, DROPPED_STATUS, "no longer known to the node", None)
+
+    def _lookup(self, tx_hashes, check_known):
+        if not isinstance(self.w3.provider, HTTPProvider):
+            # Providers without batching (e.g. eth-tester) get one request per hash
+            receipts = {}
+            for tx_hash in tx_hashes:
+                try:
+                    receipts[tx_hash] = self.w3.eth.get_transaction_receipt(tx_hash)
+                except TransactionNotFound:
+                    receipts[tx_hash] = None
+            known = {}
+            for tx_hash in check_known:
+                try:
+                    known[tx_hash] = self.w3.eth.get_transaction(tx_hash) is not None
+                except TransactionNotFound:
+                    known[tx_hash] = False
+            return receipts, known
+
+        responses = batch_request(
+            self.w3,
+            [("eth_getTransactionReceipt", [tx_hash]) for tx_hash in tx_hashes]
+            + [("eth_getTransactionByHash", [tx_hash]) for tx_hash in check_known],
+        )
+        receipts = {
+            tx_hash: AttributeDict.recursive(receipt_formatter(item["result"])) if item.get("result") else None
+            for tx_hash, item in zip(tx_hashes, responses)
+        }
+        known = {
+            tx_hash: item.get("result") is not None or "error" in item
+            for tx_hash, item in zip(check_known, responses[len(tx_hashes):])
+        }
+        return receipts, known
+
+    def _revert_reason(self, tx_hash, receipt):
+        # Replay the transaction against the state before its block
+        try:
+            transaction = self.w3.eth.get_transaction(tx_hash)
+            self.w3.eth.call({
+                "from": transaction["from"],
+                "to": transaction["to"],
+                "data": transaction.get("input", transaction.get("data")),
+                "value": transaction["value"],
+                "gas": transaction["gas"],
+            }, receipt["blockNumber"] - 1)
+        except ContractLogicError as e:
+            return str(e)
+        except Exception as e:
+            # Dev chains raise their own exception types for reverts
+            if "revert" in str(e).lower():
+                return str(e)
+        return "reason unavailable (e.g. out of gas)"
+
+    def _finish(self, tx_hash, status, detail, receipt):
+        with self._lock:
+            self._pending.pop(tx_hash, None)
+            self._finished[tx_hash] = (status, detail, receipt)
+            while len(self._finished) > FINISHED_HISTORY:
+                self._finished.popitem(last=False)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="transaction-tracker", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            with self._lock:
+                if not self._pending:
+                    continue
+            # Poll once per new block, and now and then on a stalled chain to spot dropped transactions
+            block_number = self.block_cache.block_number()
+            stalled = time.monotonic() - self._last_polled_at > DROPPED_AFTER
+            if block_number is not None and block_number == self._last_polled_block and not stalled:
+                continue
+            try:
+                self.poll()
+                self._last_polled_block = block_number
+                self._last_polled_at = time.monotonic()
+            except Exception:
+                # Try again on the next tick; the node may be briefly unavailable
+                pass
+
+
+# Tracker shared by every session of the app
+tracker = TransactionTracker()
+
+
+# Function to follow a transaction submitted from this session
+def track_transaction(tx_hash, label):
+    tx_hash = tracker.track(tx_hash)
+    st.session_state.setdefault("tracked_transactions", []).append({"hash": tx_hash, "label": label})
+    return tx_hash
+
+
+# Function to display the status of this session's transactions in the sidebar
+def display_transaction_status(limit=10):
+    tracked = st.session_state.get("tracked_transactions", [])
+    if not tracked:
+        return
+
+    statuses = {}
+    with st.sidebar.expander("Transactions", expanded=True):
+        for entry in reversed(tracked[-limit:]):
+            status, detail = tracker.status(entry["hash"])
+            statuses[entry["hash"]] = status
+            message = f"{entry['label']}: {status}" + (f" ({detail})" if detail else "") + f" {entry['hash'][:10]}…"
+            if status == MINED_STATUS:
+                st.success(message)
+            elif status == PENDING_STATUS:
+                st.info(message)
+            else:
+                st.error(message)
+    st.session_state["transaction_status"] = statuses
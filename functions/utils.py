@@ -1,60 +1,233 @@
 # Import libraries
 import streamlit as st
-from itertools import count
+import pandas as pd
+from web3 import Web3
 
 # Import function from contract
 from functions.contract import connect_to_contract
-
-counter_generator = count(start=1)
+from functions.cache import cached_call, cached_batch_call
+from functions.submitter import submitter
+from functions.tracker import track_transaction
+from functions.subscriber import live_events
+from functions.request_store import requests_page_columns
+from functions.risk import describe_risk
+from functions.merkle import settlement_store
 
 contract = connect_to_contract()
 
-def display_booking_requests():
-    st.subheader("Booking Requests Viewer")
-
-    requests = contract.functions.getBookingRequests().call()
-
-    pending_requests = []
-
-    for request in requests:
-        job_number, participant_address, amount, participant_unique_id, service_description, status = request
-
-        # Only display requests with status 0
-        if status == 0:
-            pending_requests.append({
-                "Job Number": job_number,
-                "Participant Address": participant_address,
-                "Service Description": service_description,
-                "Amount": amount,
-                "Status:" : "Pending"
-            })      
-    
-    # Display the table if there are pending requests
-    if pending_requests:
-        st.table(pending_requests)
+# RequestStatus values from the smart contract
+PENDING, SERVICE_OFFERED, WAITING_FOR_APPROVAL, APPROVED = range(4)
+
+# Number of requests shown per page in the viewers
+REQUESTS_PAGE_SIZE = 50
+
+# Rows per page of the request viewers once they are served from the live event store
+VIEWER_PAGE_SIZE = 500
+
+# Sort orders offered by the request viewers
+VIEWER_SORTS = {"Job number": "job_number", "Amount": "amount"}
+
+# Service options and their amounts in wei. The position of each option is
+# the service category code stored on-chain, so only append new options.
+SERVICE_OPTIONS = {
+    "Support Coordination": 2000,
+    "Core Supports": 3000,
+    "Capacity Building Supports": 4000,
+    "Assistive Technology": 1000,
+    "Home Modifications": 10000,
+    "Therapeutic Supports": 2000,
+    "Transport Supports": 2500,
+    "Specialist Disability Accommodation (SDA)": 30000,
+    "Early Childhood Early Intervention (ECEI)": 15000,
+    "Reasonable and Necessary Supports": 20000
+}
+SERVICE_CATEGORIES = list(SERVICE_OPTIONS)
+
+# Labels of the request statuses in the viewers
+STATUS_LABELS = {PENDING: "Pending", SERVICE_OFFERED: "Service Offered", WAITING_FOR_APPROVAL: "Waiting for Approval", APPROVED: "Approved"}
+
+# Function to name a service category code stored on-chain
+def service_description(service_category):
+    if service_category < len(SERVICE_CATEGORIES):
+        return SERVICE_CATEGORIES[service_category]
+    return f"Service category {service_category}"
+
+# Function to unpack a Request record returned by the contract
+def describe_request(request):
+    requester, amount, job_number, status, service_category, status_index, claimant = request[:7]
+    return job_number, requester, amount, service_description(service_category), status
+
+# Value returned by the contract for an unknown request id
+EMPTY_REQUEST_ID = bytes(32)
+
+# Function to return the offset of the page currently selected under a widget key
+def selected_page_offset(key, page_size=REQUESTS_PAGE_SIZE):
+    return (st.session_state.get(key, 1) - 1) * page_size
+
+# Function to render the page selector once the total is known
+def select_page(total, key, page_size=REQUESTS_PAGE_SIZE):
+    page_count = max(1, -(-total // page_size))
+
+    # Keep the selection in range if the number of requests shrank
+    if st.session_state.get(key, 1) > page_count:
+        st.session_state[key] = page_count
+    if page_count > 1:
+        st.number_input(f"Page (1-{page_count}):", min_value=1, max_value=page_count, step=1, key=key)
+
+# Function to list the reads behind one page of the requests in a given status
+def requests_page_reads(status, key):
+    # Nothing to read once the live event store has caught up with the chain
+    if live_events().ready:
+        return []
+    return [
+        contract.functions.getBookingRequestCount(status),
+        contract.functions.getBookingRequestsByStatus(status, selected_page_offset(key), REQUESTS_PAGE_SIZE),
+    ]
+
+# Function to read one page of the requests in a given status, outside any widget
+def read_requests_page(status, offset, limit=REQUESTS_PAGE_SIZE):
+    store = live_events()
+    if store.ready:
+        # Kept current from contract events, so no RPC calls at all
+        return store.requests_page(status, offset, limit)
+    # The count and the page are fetched together in one round trip,
+    # and served from the read cache until a new block lands
+    total, (request_ids, requests) = cached_batch_call(
+        contract.functions.getBookingRequestCount(status),
+        contract.functions.getBookingRequestsByStatus(status, offset, limit),
+    )
+    return total, request_ids, requests
+
+# Function to fetch one page of the requests in a given status
+def fetch_requests_page(status, key):
+    total, request_ids, requests = read_requests_page(status, selected_page_offset(key))
+    select_page(total, key)
+    return total, request_ids, requests
+
+# Function to list the reads behind one page of the requests booked by a participant
+def participant_requests_page_reads(participant_address, key):
+    return [
+        contract.functions.getParticipantRequestCount(participant_address),
+        contract.functions.getParticipantRequests(participant_address, selected_page_offset(key), REQUESTS_PAGE_SIZE),
+    ]
+
+# Function to read one page of the requests booked by a participant, outside any widget
+def read_participant_requests_page(participant_address, offset, limit=REQUESTS_PAGE_SIZE):
+    total, (request_ids, requests) = cached_batch_call(
+        contract.functions.getParticipantRequestCount(participant_address),
+        contract.functions.getParticipantRequests(participant_address, offset, limit),
+    )
+    return total, request_ids, requests
+
+# Function to fetch one page of the requests booked by a participant
+def fetch_participant_requests_page(participant_address, key):
+    total, request_ids, requests = read_participant_requests_page(participant_address, selected_page_offset(key))
+    select_page(total, key)
+    return total, request_ids, requests
+
+# Reads behind the settlement panels: the on-chain period of every saved settlement tree
+def settlement_reads():
+    return [contract.functions.settlementPeriods(root) for root in settlement_store.trees()]
+
+# Function to return every saved settlement tree with its period, 0 if it was never committed or was closed
+def saved_settlements():
+    trees = settlement_store.trees()
+    periods = cached_batch_call(*[contract.functions.settlementPeriods(root) for root in trees]) if trees else []
+    # Closed settlements keep their period on-chain, but their requests are no longer held by them
+    committed = sorted({period for period in periods if period})
+    closed = dict(zip(committed, cached_batch_call(*[contract.functions.settlementClosed(period) for period in committed]))) if committed else {}
+    periods = [0 if closed.get(period) else period for period in periods]
+    return sorted(zip(periods, trees.values()), key=lambda settlement: settlement[0])
+
+# Function to display one page of the requests in a given status, filtered and sorted in the live event store
+def display_requests_viewer(title, status, key, empty_message, risk=False):
+    st.subheader(title)
+
+    store = live_events()
+    if store.ready:
+        with st.expander("Filter and sort"):
+            left, middle, right = st.columns(3)
+            participant = left.text_input("Participant address:", key=f"{key}_participant").strip()
+            min_amount = middle.number_input("Minimum amount in wei:", min_value=0, step=1, key=f"{key}_min_amount")
+            max_amount = right.number_input("Maximum amount in wei (0 for any):", min_value=0, step=1, key=f"{key}_max_amount")
+            sort_by = left.selectbox("Sort by:", list(VIEWER_SORTS), key=f"{key}_sort")
+            descending = middle.checkbox("Descending", key=f"{key}_descending")
+
+        if participant and not Web3.isAddress(participant):
+            st.error("Invalid participant address.")
+            return
+
+        # Only the selected page leaves the columnar store
+        total, page = store.query(
+            status,
+            participant=participant or None,
+            min_amount=min_amount or None,
+            max_amount=max_amount or None,
+            sort_by=VIEWER_SORTS[sort_by],
+            descending=descending,
+            offset=selected_page_offset(key, VIEWER_PAGE_SIZE),
+            limit=VIEWER_PAGE_SIZE,
+        )
+        select_page(total, key, VIEWER_PAGE_SIZE)
     else:
-        st.write("No pending booking requests.")  
+        # Until the store has caught up with the chain, pages come from the contract, unfiltered
+        total, request_ids, requests = fetch_requests_page(status, key)
+        page = requests_page_columns(request_ids, requests)
+
+    if not total:
+        st.write(empty_message)
+        st.write("----")
+        return
+
+    table = pd.DataFrame({
+        "Job Number": page["job_number"],
+        "Participant Address": page["participant"],
+        "Service Description": [service_description(service_category) for service_category in page["service_category"]],
+        "Amount": page["amount"],
+        "Status": STATUS_LABELS.get(status, status),
+    })
+    if status in (WAITING_FOR_APPROVAL, APPROVED):
+        # The amount is then the one claimed, and the claimant is who gets paid
+        table["Claimant"] = page["claimant"]
+    if risk:
+        table["Risk"] = [describe_risk(request_id) for request_id in page["request_id"]]
+
+    # A virtualized grid: the browser only draws the rows in view
+    st.write(f"{total} matching requests.")
+    st.dataframe(table.set_index("Job Number"), use_container_width=True)
+    st.write("----")
+
+# Reads made by display_booking_requests, for the page prefetch
+def display_booking_requests_reads():
+    return requests_page_reads(PENDING, "booking_requests_page")
+
+def display_booking_requests():
+    display_requests_viewer("Booking Requests Viewer", PENDING, "booking_requests_page", "No pending booking requests.")
 
-    st.write("----")    
 
+# Reads made by service_request_lookup, for the page prefetch
+def service_request_lookup_reads():
+    job = st.session_state.get("job_number_lookup", "")
+    return [contract.functions.getBookingRequestByJobNumber(int(job))] if job.isdigit() else []
 
 def service_request_lookup():
     st.subheader("Request ID look up")
-    # Retrieve all service requests 
-    service_request_filter = contract.events.ServiceBooked.createFilter(
-        fromBlock=0
-    )
    
-    all_booking_requests = service_request_filter.get_all_entries()
-   
-    job = st.text_input("Job Number*:")
-   
-    for request_entry in all_booking_requests:
-        if job == request_entry['args']['jobNumber']:
-            participant_address =request_entry['args']['participant']
-            request_id = "0x" + request_entry['args']['requestId'].hex()
-            service_description = request_entry['args']['serviceDescription']
-            amount = request_entry['args']['amount']
+    job = st.text_input("Job Number*:", key="job_number_lookup")
+
+    if job:
+        if not job.isdigit():
+            st.error("Job numbers are whole numbers.")
+            return
+
+        # Look the job up through the contract's job number index
+        request_id, request = cached_call(contract.functions.getBookingRequestByJobNumber(int(job)))
+
+        if request_id == EMPTY_REQUEST_ID:
+            st.write("No booking request found for this job number.")
+        else:
+            job_number, participant_address, amount, service_description, status = describe_request(request)
+            request_id = "0x" + request_id.hex()
             st.write(f"Job Number: {job}")
             st.write(f"Request ID: {request_id}")
             st.write(f"Participant Address: {participant_address}")
@@ -63,23 +236,30 @@ def service_request_lookup():
             st.write("------------")   
     st.write("----")
 
+# Reads made by my_booking_requests_lookup, for the page prefetch
+def my_booking_requests_lookup_reads():
+    participant_address = st.session_state.get("my_requests_address", "")
+    if not Web3.isAddress(participant_address):
+        return []
+    return participant_requests_page_reads(Web3.toChecksumAddress(participant_address), "my_requests_page")
+
 def my_booking_requests_lookup():
     st.subheader("My booking requests look up")
-    # Retrieve all service requests 
-    service_request_filter = contract.events.ServiceBooked.createFilter(
-        fromBlock=0
-    )
-   
-    all_booking_requests = service_request_filter.get_all_entries()
    
-    participant_address = st.text_input("Account Address*:")
+    participant_address = st.text_input("Account Address*:", key="my_requests_address")
+
+    if participant_address:
+        if not Web3.isAddress(participant_address):
+            st.error("Invalid account address.")
+            return
+
+        # Read one page of the participant's bookings through the contract's participant index
+        participant_address = Web3.toChecksumAddress(participant_address)
+        total, request_ids, my_requests = fetch_participant_requests_page(participant_address, "my_requests_page")
    
-    for request_entry in all_booking_requests:
-        if  participant_address == request_entry['args']['participant']:
-            job = request_entry['args']['jobNumber']
-            request_id = "0x" + request_entry['args']['requestId'].hex()
-            service_description = request_entry['args']['serviceDescription']
-            amount = request_entry['args']['amount']
+        for request_id, request in zip(request_ids, my_requests):
+            job, requester, amount, service_description, status = describe_request(request)
+            request_id = "0x" + request_id.hex()
             st.write(f"Job Number: {job}")
             st.write(f"Request ID: {request_id}")
             st.write(f"Participant Address: {participant_address}")
@@ -93,23 +273,11 @@ def booking_requests():
 
     # Input form
     account_address = st.text_input("Enter Account Address:")
-     # Define the list of service options
-    service_options = {
-        "Support Coordination": 2000,
-        "Core Supports": 3000,
-        "Capacity Building Supports": 4000,
-        "Assistive Technology": 1000,
-        "Home Modifications": 10000,
-        "Therapeutic Supports": 2000,
-        "Transport Supports": 2500,
-        "Specialist Disability Accommodation (SDA)": 30000,
-        "Early Childhood Early Intervention (ECEI)": 15000,
-        "Reasonable and Necessary Supports": 20000
-    }
         
      # Dropdown to select a service option
-    selected_option_name = st.selectbox("Select a Service Option", list(service_options.keys()))
-    selected_option_value = service_options[selected_option_name]
+    selected_option_name = st.selectbox("Select a Service Option", SERVICE_CATEGORIES)
+    selected_option_value = SERVICE_OPTIONS[selected_option_name]
+    selected_option_category = SERVICE_CATEGORIES.index(selected_option_name)
 
     if account_address: 
         try:
@@ -118,18 +286,15 @@ def booking_requests():
 
             if st.button("Book"):
                 try:
-                    tx_hash = contract.functions.bookService(generate_job_number(), selected_option_name, selected_option_value, account_address).transact({'from': requester_address})
-                    st.success(f"Sevice booked successfully! Transaction Hash: {tx_hash.hex()}")
-                    # Refresh withdrawal requests after initiation
+                    # The contract assigns the job number, keeping it unique across every client
+                    tx_hash = submitter.transact(contract.functions.bookService(selected_option_category, selected_option_name, selected_option_value, account_address), {'from': requester_address})
+                    track_transaction(tx_hash, f"Book {selected_option_name}")
+                    st.info(f"Service booking submitted. Its status is shown in the sidebar. Transaction Hash: {tx_hash.hex()}")
+                    # Refresh booking requests after booking
                     display_booking_requests()
                 except Exception as e:
-                    st.error(f"Failed to initiate withdrawal request. Error: {e}")
+                    st.error(f"Failed to book the service. Error: {e}")
 
         except ValueError:
             st.error("Invalid input. Please enter a valid integer for the Ethereum account index.") 
     st.write("----")
-
-def generate_job_number():
-    global last_job_number
-    last_job_number = last_job_number + 1 if 'last_job_number' in globals() else 100
-    return str(last_job_number)
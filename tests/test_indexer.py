@@ -0,0 +1,101 @@
+"""Sync, reorg rollback and checkpoint tests for the event indexer on an in-process eth-tester chain."""
+# Import libraries
+import pytest
+from web3 import Web3, EthereumTesterProvider
+
+# Import functions
+from benchmarks.chain import deploy_contract
+from functions.indexer import EventIndexer
+
+
+@pytest.fixture
+def chain():
+    web3 = Web3(EthereumTesterProvider())
+    try:
+        contract = deploy_contract(web3)
+    except Exception as error:
+        # Compiling needs solc, which py-solc-x downloads on first use
+        pytest.skip(f"Could not compile the contract: {error}")
+    return web3, contract
+
+
+def register(web3, contract, account):
+    tx_hash = contract.functions.registerAccount(account, True).transact({"from": web3.eth.accounts[0]})
+    web3.eth.wait_for_transaction_receipt(tx_hash)
+
+
+def registered(indexer):
+    return [event["account"] for event in indexer.events("AccountRegistered")]
+
+
+def checkpoint_hash(indexer, block_number):
+    row = indexer._db.execute("SELECT block_hash FROM checkpoints WHERE block_number = ?", (block_number,)).fetchone()
+    return row and row[0]
+
+
+def test_sync_indexes_events_and_checkpoints_the_head(chain):
+    web3, contract = chain
+    accounts = web3.eth.accounts[1:5]
+    for account in accounts[:3]:
+        register(web3, contract, account)
+
+    indexer = EventIndexer(web3, contract, chunk_size=2)
+    head = indexer.sync()
+    assert head == web3.eth.block_number
+    assert registered(indexer) == accounts[:3]
+    assert checkpoint_hash(indexer, head) == Web3.toHex(web3.eth.get_block(head)["hash"])
+
+    # The next sync only fetches blocks mined since the checkpoint
+    fetched = []
+    fetch_logs = indexer._fetch_logs
+    indexer._fetch_logs = lambda from_block, to_block: fetched.append(from_block) or fetch_logs(from_block, to_block)
+    register(web3, contract, accounts[3])
+    assert indexer.sync() == head + 1
+    assert fetched == [head + 1]
+    assert registered(indexer) == accounts
+
+
+def test_sync_rolls_back_reorged_blocks(chain):
+    web3, contract = chain
+    kept, orphaned, replacement = web3.eth.accounts[1:4]
+    register(web3, contract, kept)
+    fork_point = web3.testing.snapshot()
+    register(web3, contract, orphaned)
+
+    indexer = EventIndexer(web3, contract, chunk_size=1)
+    indexer.sync()
+    assert registered(indexer) == [kept, orphaned]
+
+    # Replace the last block with one registering a different account
+    web3.testing.revert(fork_point)
+    register(web3, contract, replacement)
+    head = indexer.sync()
+    assert registered(indexer) == [kept, replacement]
+    assert checkpoint_hash(indexer, head) == Web3.toHex(web3.eth.get_block(head)["hash"])
+
+
+def test_sync_refetches_a_range_reorged_during_the_fetch(chain):
+    web3, contract = chain
+    orphaned, replacement = web3.eth.accounts[1:3]
+    fork_point = web3.testing.snapshot()
+    register(web3, contract, orphaned)
+
+    indexer = EventIndexer(web3, contract)
+    fetch_logs = indexer._fetch_logs
+
+    reorged = []
+
+    def fetch_during_reorg(from_block, to_block):
+        logs = fetch_logs(from_block, to_block)
+        if not reorged:
+            # The head is replaced after its logs were read but before they are stored
+            web3.testing.revert(fork_point)
+            register(web3, contract, replacement)
+            reorged.append(to_block)
+        return logs
+
+    indexer._fetch_logs = fetch_during_reorg
+    head = indexer.sync()
+    assert reorged == [head]
+    assert registered(indexer) == [replacement]
+    assert checkpoint_hash(indexer, head) == Web3.toHex(web3.eth.get_block(head)["hash"])
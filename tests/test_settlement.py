@@ -0,0 +1,118 @@
+"""Merkle settlement tests for the NDIS contract on an in-process eth-tester chain."""
+# Import libraries
+import pytest
+from eth_tester.exceptions import TransactionFailed
+from web3 import Web3, EthereumTesterProvider
+
+# Import functions
+from benchmarks.chain import deploy_contract
+from benchmarks.settlement_gas import seed_withdrawals
+from functions.merkle import SettlementTree
+
+WAITING_FOR_APPROVAL, APPROVED = 2, 3
+
+
+@pytest.fixture
+def chain():
+    web3 = Web3(EthereumTesterProvider())
+    try:
+        contract = deploy_contract(web3)
+    except Exception as error:
+        # Compiling needs solc, which py-solc-x downloads on first use
+        pytest.skip(f"Could not compile the contract: {error}")
+    ndia, participant, *providers = web3.eth.accounts[:5]
+    withdrawals = seed_withdrawals(contract, ndia, participant, providers[:2], 3)
+    return web3, contract, ndia, withdrawals
+
+
+def transact(web3, contract_function, sender):
+    tx_hash = contract_function.transact({"from": sender})
+    return web3.eth.wait_for_transaction_receipt(tx_hash)
+
+
+def commit(web3, contract, ndia, tree, request_ids=None):
+    request_ids = [request_id for request_id, _, _ in tree.claims] if request_ids is None else request_ids
+    return transact(web3, contract.functions.commitSettlement(tree.root, request_ids), ndia)
+
+
+def claim(web3, contract, tree, request_id, sender):
+    return transact(web3, contract.functions.claim(tree.root, request_id, tree.proof(request_id)), sender)
+
+
+def status(contract, request_id):
+    return contract.functions.requests(request_id).call()[3]
+
+
+def test_claim_pays_the_claimant_once(chain):
+    web3, contract, ndia, withdrawals = chain
+    tree = SettlementTree(withdrawals)
+    commit(web3, contract, ndia, tree)
+    assert contract.functions.settlementUnclaimed(tree.root).call() == tree.total
+
+    request_id, provider, amount = withdrawals[0]
+    balance = web3.eth.get_balance(provider)
+    # Anyone may send a claim, but it always pays the request's claimant
+    claim(web3, contract, tree, request_id, ndia)
+    assert web3.eth.get_balance(provider) == balance + amount
+    assert status(contract, request_id) == APPROVED
+    assert contract.functions.settlementUnclaimed(tree.root).call() == tree.total - amount
+    assert contract.functions.committedUnclaimed().call() == tree.total - amount
+
+    with pytest.raises(TransactionFailed, match="Request is not waiting for approval"):
+        claim(web3, contract, tree, request_id, provider)
+
+
+def test_claim_rejects_a_leaf_for_another_claimant(chain):
+    web3, contract, ndia, withdrawals = chain
+    (request_id, _, amount), (_, other_provider, _) = withdrawals[0], withdrawals[1]
+    # The NDIA's tree names the wrong claimant, so its proof does not match what the contract hashes
+    tree = SettlementTree([(request_id, other_provider, amount)] + withdrawals[1:])
+    commit(web3, contract, ndia, tree)
+
+    with pytest.raises(TransactionFailed, match="Invalid settlement proof"):
+        claim(web3, contract, tree, request_id, other_provider)
+    assert status(contract, request_id) == WAITING_FOR_APPROVAL
+
+
+def test_total_counts_only_the_committed_requests(chain):
+    web3, contract, ndia, withdrawals = chain
+    tree = SettlementTree(withdrawals)
+    # The root proves three claims but only two requests are committed with it
+    commit(web3, contract, ndia, tree, [request_id for request_id, _, _ in withdrawals[:2]])
+    assert contract.functions.settlementUnclaimed(tree.root).call() == sum(amount for _, _, amount in withdrawals[:2])
+
+    with pytest.raises(TransactionFailed, match="Request is not in this settlement"):
+        claim(web3, contract, tree, withdrawals[2][0], ndia)
+    for request_id, _, _ in withdrawals[:2]:
+        claim(web3, contract, tree, request_id, ndia)
+    assert contract.functions.settlementUnclaimed(tree.root).call() == 0
+    assert contract.functions.committedUnclaimed().call() == 0
+
+
+def test_closing_releases_requests_missing_from_the_tree(chain):
+    web3, contract, ndia, withdrawals = chain
+    # A request committed with the root but left out of its tree can never be claimed
+    tree = SettlementTree(withdrawals[:2])
+    commit(web3, contract, ndia, tree, [request_id for request_id, _, _ in withdrawals])
+    missing_id, _, missing_amount = withdrawals[2]
+    assert contract.functions.settlementUnclaimed(tree.root).call() == tree.total + missing_amount
+
+    # While the settlement is open the request can only be paid by its claim
+    with pytest.raises(TransactionFailed, match="Request is in a committed settlement"):
+        transact(web3, contract.functions.approveWithdrawal(missing_id), ndia)
+    receipt = transact(web3, contract.functions.approveWithdrawals([missing_id]), ndia)
+    assert contract.events.WithdrawalApprovalSkipped().processReceipt(receipt)[0]["args"]["requestId"] == missing_id
+
+    claim(web3, contract, tree, withdrawals[0][0], ndia)
+    transact(web3, contract.functions.closeSettlement(tree.root), ndia)
+    assert contract.functions.committedUnclaimed().call() == 0
+    with pytest.raises(TransactionFailed, match="Settlement closed"):
+        claim(web3, contract, tree, withdrawals[1][0], ndia)
+
+    # Once closed, its requests can be approved again and its root stays spent
+    transact(web3, contract.functions.approveWithdrawal(missing_id), ndia)
+    assert status(contract, missing_id) == APPROVED
+    with pytest.raises(TransactionFailed, match="Settlement already committed"):
+        commit(web3, contract, ndia, tree, [withdrawals[1][0]])
+    with pytest.raises(TransactionFailed, match="Settlement already closed"):
+        transact(web3, contract.functions.closeSettlement(tree.root), ndia)